@@ -15,8 +15,11 @@ TYPE_NAME = "溫升風險"
 RISK_TYPES = ['升溫1.5°C情境', '升溫2°C以上情境']
 
 
-def create_table(csv_lines, industry="企業", filename=None):
-    """從 CSV 生成 TCFD PPTX"""
+def create_table(csv_lines, industry="企業", filename=None, financial_notes=None):
+    """
+    從 CSV 生成 TCFD PPTX
+    financial_notes：溫升情境試算摘要 {氣候風險列名: [字串, ...]}，附加在該列的潛在影響欄
+    """
     
     prs = Presentation()
     prs.slide_width = Inches(13.333)
@@ -104,6 +107,9 @@ def create_table(csv_lines, industry="企業", filename=None):
             _set_bullet_text(tbl.cell(r, 4), parts[1])
         if len(parts) >= 3:
             _set_bullet_text(tbl.cell(r, 5), parts[2])
+        
+        if financial_notes and financial_notes.get(risk):
+            _append_bullets(tbl.cell(r, 4), financial_notes[risk])
     
     # 儲存
     if filename is None:
@@ -129,3 +135,15 @@ def _set_bullet_text(cell, text):
         p.font.size = Pt(11)
         p.alignment = PP_ALIGN.LEFT
 
+
+def _append_bullets(cell, points):
+    """在既有內容後面加上項目（空儲存格則從第一段開始）"""
+    tf = cell.text_frame
+    for point in points:
+        if tf.paragraphs[0].text:
+            p = tf.add_paragraph()
+        else:
+            p = tf.paragraphs[0]
+        p.text = f"• {point}"
+        p.font.size = Pt(11)
+        p.alignment = PP_ALIGN.LEFT
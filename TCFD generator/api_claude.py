@@ -1,9 +1,18 @@
 import streamlit as st
-import anthropic
+from datetime import datetime
 from pathlib import Path
 import sys
-import zipfile
-import io
+
+import blob_store
+import carbon_fee
+import csv_ingest
+import llm_client
+import llm_telemetry
+import macc
+import physical_hazard
+import rate_limiter
+import singleflight
+import temperature_scenarios
 
 # 加入 TCFD_Table 路徑
 sys.path.append(str(Path(__file__).parent / "TCFD_Table"))
@@ -17,6 +26,10 @@ from tcfd_05_resource import create_table as create_05
 OUTPUT_DIR = Path(__file__).parent / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 1024
+TELEMETRY_PAGE = "一鍵生成 5 表"
+
 # 專家角色
 EXPERT_ROLE = "你是 ESG 的 GRI 和 TCFD 專家。"
 
@@ -25,6 +38,7 @@ TABLES = [
     {
         "name": "01 轉型風險",
         "create": create_01,
+        "notes": "carbon_fee",      # 有碳費試算時寫入「政策與法規」的潛在影響欄
         "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 轉型風險分析，用繁體中文回答。
 請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
 輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
@@ -47,6 +61,7 @@ TABLES = [
     {
         "name": "03 實體風險",
         "create": create_03,
+        "notes": "hazard",          # 有據點清單時，各災害的高暴露據點與資產寫入兩列的潛在影響欄
         "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 實體風險分析，用繁體中文回答。
 請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
 輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
@@ -58,6 +73,7 @@ TABLES = [
     {
         "name": "04 溫升風險",
         "create": create_04,
+        "notes": "temperature",     # 有溫升情境試算時寫入兩列的潛在影響欄
         "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 溫升情境風險分析，用繁體中文回答。
 請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
 輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
@@ -69,6 +85,7 @@ TABLES = [
     {
         "name": "05 資源效率",
         "create": create_05,
+        "notes": "macc",            # 有減碳措施清單時，成本最低的措施寫入兩列的潛在效益欄
         "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 資源效率機會分析，用繁體中文回答。
 請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
 輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
@@ -79,6 +96,85 @@ TABLES = [
     },
 ]
 
+
+def ask_llm(api_key, prompt, industry, retries=0, on_wait=None):
+    """排隊取得 API 額度後呼叫一次 LLM，回傳 (原始輸出, 有 ||| 的行)；retries 為格式不符的重試次數"""
+    client = llm_client.get_client(api_key)
+
+    def ask_once():
+        with llm_telemetry.track(TELEMETRY_PAGE, MODEL, industry,
+                                 retries=retries + rate_limiter.current_attempt()) as call:
+            response = client.messages.create(
+                model=MODEL,
+                max_tokens=MAX_TOKENS,
+                messages=[{"role": "user", "content": prompt}],
+                timeout=llm_client.CREATE_TIMEOUT,
+            )
+            call.set_response(response)
+            llm_output = response.content[0].text.strip()
+            lines = [line.strip() for line in llm_output.split('\n') if line.strip() and '|||' in line]
+            call.parse_ok = len(lines) > 0
+        return llm_output, lines
+
+    return rate_limiter.call(api_key, MODEL, ask_once, on_wait=on_wait)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def carbon_fee_notes(data, scenario, start_year, years):
+    """排放盤查 CSV -> 碳費試算摘要（依檔案內容、情境與起始年快取，跨年後不會沿用舊結果）"""
+    facilities = csv_ingest.load(csv_ingest.ingest(data))
+    result = carbon_fee.project(facilities, start_year=start_year, years=years)
+    return carbon_fee.financial_notes(result, scenario)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def temperature_notes(data, start_year, years):
+    """事業單位財務 CSV -> 溫升情境試算摘要 {列名: [摘要, ...]}"""
+    units = csv_ingest.load(csv_ingest.ingest(data))
+    result = temperature_scenarios.project(units, start_year=start_year, years=years)
+    return temperature_scenarios.financial_notes(result)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def macc_notes(data, rate):
+    """減碳措施 CSV -> 減碳成本曲線摘要 {機會項目: [摘要, ...]}"""
+    curve = macc.MACCurve(csv_ingest.load(csv_ingest.ingest(data)), rate=rate / 100)
+    return macc.financial_notes(curve)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def hazard_notes(data):
+    """據點 CSV -> 災害暴露摘要 {列名: [摘要, ...]}"""
+    scored = physical_hazard.score(csv_ingest.load(csv_ingest.ingest(data)))
+    return physical_hazard.financial_notes(scored)
+
+
+def generate_table(api_key, table, industry, prompt, on_wait=None, financial_notes=None):
+    """
+    產生一張表：LLM（格式異常重試一次）-> PPTX -> blob store。
+    在 singleflight 的背景執行緒執行、結果可能被其他 session 共用，不可呼叫 st.*；
+    on_wait 只用來回報排隊狀態
+    financial_notes 也要反映在 prompt 裡，共用結果的 key 才會區分不同試算
+    """
+    llm_output, lines = ask_llm(api_key, prompt, industry, on_wait=on_wait)
+    bad_output = None
+    if len(lines) == 0:
+        bad_output = llm_output
+        llm_output, lines = ask_llm(api_key, prompt, industry, retries=1, on_wait=on_wait)
+    
+    # 生成 PPTX，檔案內容存入 blob store，session_state 只留 digest
+    extra = {"financial_notes": financial_notes} if financial_notes else {}
+    filepath = table["create"](lines, industry, **extra)
+    return {
+        "name": table["name"],
+        "path": filepath,
+        "filename": filepath.name,
+        "blob": blob_store.put_file(filepath),
+        "lines": len(lines),
+        "bad_output": bad_output,
+    }
+
+
 # ============ UI ============
 st.set_page_config(page_title="TCFD 生成器", page_icon="📊", layout="centered")
 st.title("📊 TCFD 氣候風險分析")
@@ -88,6 +184,79 @@ API_KEY = st.sidebar.text_input("🔑 請輸入 Claude API Key", type="password"
 
 industry = st.text_input("請輸入您的產業", placeholder="例如：鋁建材業")
 
+# 碳費試算（選填）：上傳各廠區排放盤查，試算結果寫進轉型風險表
+with st.expander("💰 碳費試算（選填）"):
+    inventory_file = st.file_uploader(
+        "排放盤查 CSV：facility、scope1、scope2（tCO2e）欄位，reduction（年減量率）為選填",
+        type=["csv"], key="carbon_inventory"
+    )
+    fee_scenario = st.selectbox("碳費情境", carbon_fee.SCENARIO_NAMES)
+    fee_years = st.slider("試算年數", 5, 30, 10)
+    carbon_notes = None
+    if inventory_file is not None:
+        try:
+            carbon_notes = carbon_fee_notes(inventory_file.getvalue(), fee_scenario, datetime.now().year, fee_years)
+            st.caption("  \n".join(carbon_notes))
+        except ValueError as e:
+            st.error(f"❌ 無法讀取排放盤查：{e}")
+
+# 據點災害暴露（選填）：上傳營運據點座標，對照淹水 / 高溫 / 乾旱圖層後寫進實體風險表
+with st.expander("🗺️ 據點災害暴露（選填）"):
+    sites_file = st.file_uploader(
+        "據點 CSV：lat、lon 欄位，site、asset_value（百萬元）為選填",
+        type=["csv"], key="hazard_sites"
+    )
+    exposure_notes = None
+    if sites_file is not None:
+        try:
+            exposure_notes = hazard_notes(sites_file.getvalue())
+            st.caption("  \n".join(sum(exposure_notes.values(), [])))
+        except ValueError as e:
+            st.error(f"❌ 無法讀取據點：{e}")
+
+# 溫升情境（選填）：上傳事業單位財務，冷卻負載 / 生產力 / 能源價格衝擊寫進溫升風險表
+with st.expander("🌡️ 溫升情境財務影響（選填）"):
+    units_file = st.file_uploader(
+        "事業單位財務 CSV：unit、revenue、energy_cost、labor_cost（百萬元）欄位，"
+        "cooling_share、outdoor_share 為選填",
+        type=["csv"], key="temperature_units"
+    )
+    temperature_years = st.slider("試算年數", 10, 30, 25, key="temperature_years")
+    warming_notes = None
+    if units_file is not None:
+        try:
+            warming_notes = temperature_notes(units_file.getvalue(), datetime.now().year, temperature_years)
+            st.caption("  \n".join(sum(warming_notes.values(), [])))
+        except ValueError as e:
+            st.error(f"❌ 無法讀取事業單位財務：{e}")
+
+# 減碳措施（選填）：上傳措施清單，依減碳成本排序後把成本最低的措施寫進資源效率表
+with st.expander("📉 減碳措施成本曲線（選填）"):
+    measures_file = st.file_uploader(
+        "減碳措施 CSV：capex（百萬元）、opex_delta（百萬元/年）、lifetime（年）、abatement（噸/年）欄位，"
+        "measure、category（能源效率提升 / 資源循環利用）為選填",
+        type=["csv"], key="macc_measures"
+    )
+    macc_rate = st.number_input("折現率 (%)", 0.0, 30.0, 5.0, 0.5, key="macc_rate")
+    abatement_notes = None
+    if measures_file is not None:
+        try:
+            abatement_notes = macc_notes(measures_file.getvalue(), macc_rate)
+            st.caption("  \n".join(sum(abatement_notes.values(), [])))
+        except ValueError as e:
+            st.error(f"❌ 無法讀取減碳措施：{e}")
+
+# 各表可附加的量化試算：(寫入表格的摘要, 附加到 prompt 的文字)
+table_notes = {}
+if carbon_notes:
+    table_notes["carbon_fee"] = (carbon_notes, "；".join(carbon_notes))
+if exposure_notes:
+    table_notes["hazard"] = (exposure_notes, "；".join(sum(exposure_notes.values(), [])))
+if warming_notes:
+    table_notes["temperature"] = (warming_notes, "；".join(sum(warming_notes.values(), [])))
+if abatement_notes:
+    table_notes["macc"] = (abatement_notes, "；".join(sum(abatement_notes.values(), [])))
+
 if st.button("生成 5 個 TCFD 表格", type="primary", use_container_width=True):
     
     if not API_KEY:
@@ -98,76 +267,78 @@ if st.button("生成 5 個 TCFD 表格", type="primary", use_container_width=Tru
         st.error("請輸入產業")
         st.stop()
     
-    client = anthropic.Anthropic(api_key=API_KEY)
     results = []
+    failed = []
     
     progress_bar = st.progress(0)
     
     for idx, table in enumerate(TABLES):
-        st.info(f"⏳ {table['name']}...")
+        status = st.empty()
+        status.info(f"⏳ {table['name']}...")
         
-        # LLM
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1024,
-            messages=[{"role": "user", "content": table["prompt"].format(industry=industry)}]
-        )
-        llm_output = response.content[0].text.strip()
-        lines = [line.strip() for line in llm_output.split('\n') if line.strip() and '|||' in line]
+        def show_queue(position, eta):
+            status.info(f"{rate_limiter.describe_wait(position, eta)}（{table['name']}）")
         
-        # 偵錯：如果沒有解析到資料
-        if len(lines) == 0:
-            st.warning(f"⚠️ {table['name']} LLM 回傳格式異常，重試中...")
-            with st.expander(f"LLM 原始回應 - {table['name']}"):
-                st.code(llm_output)
-            # 重試一次
-            response = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
-                messages=[{"role": "user", "content": table["prompt"].format(industry=industry)}]
+        # 其他 session 同時在產同一產業同一張表時，直接共用那一次的結果
+        prompt = table["prompt"].format(industry=industry)
+        notes, notes_text = table_notes.get(table.get("notes"), (None, None))
+        if notes:
+            prompt += "\n以下為本公司量化試算結果，財務數字請與此一致：" + notes_text
+        key = singleflight.make_key(TELEMETRY_PAGE, MODEL, prompt, max_tokens=MAX_TOKENS)
+        try:
+            result, shared = singleflight.do(
+                key, lambda report: generate_table(API_KEY, table, industry, prompt, on_wait=report,
+                                                   financial_notes=notes),
+                on_wait=show_queue
             )
-            llm_output = response.content[0].text.strip()
-            lines = [line.strip() for line in llm_output.split('\n') if line.strip() and '|||' in line]
-        
-        # 生成 PPTX
-        filepath = table["create"](lines, industry)
+        except Exception as e:
+            # 單張表失敗不影響其他表
+            status.error(f"❌ {table['name']} 失敗：{e}")
+            failed.append(table["name"])
+            progress_bar.progress((idx + 1) / len(TABLES))
+            continue
+        status.info(f"⏳ {table['name']}...")
         
-        # 讀取檔案內容存入 session_state
-        with open(filepath, "rb") as f:
-            file_data = f.read()
+        # 偵錯：第一次沒有解析到資料
+        if result["bad_output"] is not None:
+            st.warning(f"⚠️ {table['name']} LLM 回傳格式異常，已重試一次")
+            with st.expander(f"LLM 原始回應 - {table['name']}"):
+                st.code(result["bad_output"])
         
-        results.append({
-            "name": table["name"], 
-            "path": filepath,
-            "filename": filepath.name,
-            "data": file_data
-        })
-        st.success(f"✅ {table['name']} 完成（{len(lines)} 行資料）")
+        results.append({k: result[k] for k in ("name", "path", "filename", "blob")})
+        st.success(f"✅ {table['name']} 完成（{result['lines']} 行資料）"
+                   + ("｜與同時送出的相同請求共用結果" if shared else ""))
         
         progress_bar.progress((idx + 1) / len(TABLES))
     
     # 儲存結果到 session_state
     st.session_state.results = results
     st.session_state.industry = industry
-    st.balloons()
+    if failed:
+        st.warning(f"⚠️ {len(failed)} 張表未完成：{'、'.join(failed)}，可稍後重新生成")
+    if results and not failed:
+        st.balloons()
 
 # ============ 下載區（在按鈕外面，使用 session_state）============
+if st.session_state.get("results"):
+    # 太久沒下載的檔案可能已被清理
+    kept = [r for r in st.session_state.results if blob_store.exists(r["blob"])]
+    if len(kept) < len(st.session_state.results):
+        st.warning("⚠️ 部分報告檔案已過期，請重新生成")
+        st.session_state.results = kept
+
 if "results" in st.session_state and st.session_state.results:
     st.subheader("📁 下載報告")
     
     results = st.session_state.results
     industry = st.session_state.get("industry", "TCFD")
     
-    # 打包全部下載 (ZIP)
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for r in results:
-            zip_file.writestr(r["filename"], r["data"])
-    zip_buffer.seek(0)
+    # 打包全部下載 (ZIP)，同一組結果只打包一次
+    zip_blob = blob_store.zip_blobs([(r["filename"], r["blob"]) for r in results])
     
     st.download_button(
         label="📦 一次下載全部 (ZIP)",
-        data=zip_buffer.getvalue(),
+        data=blob_store.get(zip_blob),
         file_name=f"TCFD_{industry}_全部報告.zip",
         mime="application/zip",
         use_container_width=True,
@@ -183,7 +354,7 @@ if "results" in st.session_state and st.session_state.results:
         with cols[idx % 2]:
             st.download_button(
                 label=f"⬇️ {r['name']}", 
-                data=r["data"], 
+                data=blob_store.get(r["blob"]), 
                 file_name=r["filename"], 
                 key=f"download_{idx}",
                 use_container_width=True
@@ -0,0 +1,229 @@
+"""
+附件解析 - txt / docx / pdf 轉文字並切塊，以內容雜湊快取（記憶體 + 磁碟）
+PDF 頁面分批交給 process pool 平行擷取
+磁碟快取超過 DISK_CACHE_BYTES 時從最久沒用的刪起；損壞的快取檔刪掉重新解析
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import PyPDF2
+from docx import Document
+
+CACHE_DIR = Path(__file__).parent / "cache" / "attachments"
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+TEXT_TYPES = ("txt", "docx", "pdf")
+CHUNK_CHARS = 1500       # 每塊字數上限
+CHUNK_OVERLAP = 150      # 相鄰塊重疊字數
+PAGES_PER_TASK = 16      # 每個 worker 一次處理的頁數
+PARALLEL_MIN_PAGES = 32  # 頁數少於此值時直接在本程序擷取
+MEMORY_CACHE_SIZE = 32   # 記憶體中保留的解析結果數
+FAILURE_CACHE_SIZE = 64  # 記住解析失敗的附件數（附件留在畫面上時每次重跑不再重試）
+DISK_CACHE_BYTES = 256 << 20  # 磁碟快取總大小上限
+GC_INTERVAL = 60         # 兩次清理之間至少間隔（秒）
+
+_memory_cache = OrderedDict()
+_failures = OrderedDict()     # digest -> 錯誤訊息
+_cache_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _get_pool():
+    """
+    共用的 process pool（第一次用到才建立）。
+    用 spawn 啟動 worker：Streamlit 是多執行緒程序，fork 可能複製到其他執行緒持有中的鎖而卡死
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=min(8, os.cpu_count() or 2),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_pdf_pages(data, start, end):
+    """worker：擷取 [start, end) 頁的文字"""
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def extract_pdf(data):
+    """回傳每頁文字的 list"""
+    n_pages = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+    if n_pages < PARALLEL_MIN_PAGES:
+        return _extract_pdf_pages(data, 0, n_pages)
+
+    pool = _get_pool()
+    ranges = [(i, min(i + PAGES_PER_TASK, n_pages)) for i in range(0, n_pages, PAGES_PER_TASK)]
+    try:
+        futures = [pool.submit(_extract_pdf_pages, data, start, end) for start, end in ranges]
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+        return pages
+    except BrokenProcessPool:
+        # worker 異常結束：丟掉壞掉的 pool（下次重建），這次改在本程序擷取
+        _reset_pool(pool)
+        return _extract_pdf_pages(data, 0, n_pages)
+
+
+def extract_text(name, data):
+    """依副檔名擷取文字，回傳 (文字, 頁數)；不支援的格式回傳 (None, 0)"""
+    file_type = name.rsplit('.', 1)[-1].lower()
+    if file_type == 'txt':
+        return data.decode('utf-8', errors='replace'), 1
+    elif file_type == 'docx':
+        doc = Document(io.BytesIO(data))
+        return '\n'.join(para.text for para in doc.paragraphs), 1
+    elif file_type == 'pdf':
+        pages = extract_pdf(data)
+        return '\n'.join(pages), len(pages)
+    return None, 0
+
+
+def chunk_text(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """切成約 size 字的塊，盡量在段落或句號處斷開"""
+    chunks = []
+    start = 0
+    n = len(text)
+    while start < n:
+        end = min(start + size, n)
+        if end < n:
+            window = text[start + size // 2:end]
+            for sep in ("\n\n", "\n", "。", ". "):
+                cut = window.rfind(sep)
+                if cut != -1:
+                    end = start + size // 2 + cut + len(sep)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= n:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _cache_path(digest):
+    return CACHE_DIR / f"{digest}.json"
+
+
+def _read_cache(path):
+    """讀取磁碟快取；檔案不存在或損壞（寫到一半、被截斷）回傳 None，損壞的順便刪掉"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        # json.JSONDecodeError 與 UnicodeDecodeError 都是 ValueError
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def collect(force=False):
+    """磁碟快取超過上限時，從最久沒用（mtime 最舊）的刪起；回傳刪除的檔案數"""
+    global _last_gc
+    now = time.time()
+    with _gc_lock:
+        if not force and now - _last_gc < GC_INTERVAL:
+            return 0
+        _last_gc = now
+        files = []
+        for path in CACHE_DIR.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if total <= DISK_CACHE_BYTES:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def ingest(name, data):
+    """
+    解析附件並快取：回傳 {"digest", "name", "text", "chunks", "n_pages"}。
+    相同內容（不論檔名）只解析一次；不支援的格式回傳 None。
+    解析失敗（加密、損壞的檔案）拋出 ValueError，失敗結果也記在記憶體，同一檔案不再重新解析
+    """
+    digest = content_digest(data)
+    with _cache_lock:
+        cached = _memory_cache.get(digest)
+        if cached is not None:
+            _memory_cache.move_to_end(digest)
+        error = _failures.get(digest)
+    if cached is not None:
+        return {**cached, "name": name}
+    if error is not None:
+        raise ValueError(error)
+
+    path = _cache_path(digest)
+    result = _read_cache(path)
+    if result is None:
+        try:
+            text, n_pages = extract_text(name, data)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            with _cache_lock:
+                _failures[digest] = error
+                while len(_failures) > FAILURE_CACHE_SIZE:
+                    _failures.popitem(last=False)
+            raise ValueError(error) from e
+        if text is None:
+            return None
+        result = {"digest": digest, "text": text, "chunks": chunk_text(text), "n_pages": n_pages}
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        collect()
+
+    with _cache_lock:
+        _memory_cache[digest] = result
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    return {**result, "name": name}
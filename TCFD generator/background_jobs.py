@@ -0,0 +1,63 @@
+"""
+背景工作 - 把耗時的檔案產生丟到共用 thread pool，session_state 只留工作 id
+工作函數內不可呼叫 st.*（背景執行緒沒有 Streamlit context）
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 2
+JOB_TTL = 3600           # 完成後沒人取的結果保留秒數
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}               # 工作 id -> (送出時間, Future)
+_jobs_lock = threading.Lock()
+
+
+def _get_executor():
+    """共用的 thread pool（第一次用到才建立）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="bg-job")
+        return _executor
+
+
+def _prune(now):
+    """清掉早已完成、但 session 已離開沒來取的工作"""
+    expired = [job_id for job_id, (submitted, future) in _jobs.items()
+               if future.done() and now - submitted > JOB_TTL]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def submit(fn, *args, **kwargs):
+    """送出背景工作，回傳工作 id"""
+    job_id = uuid.uuid4().hex
+    future = _get_executor().submit(fn, *args, **kwargs)
+    now = time.time()
+    with _jobs_lock:
+        _prune(now)
+        _jobs[job_id] = (now, future)
+    return job_id
+
+
+def poll(job_id):
+    """
+    回傳 (狀態, 結果)：running / done / error / missing。
+    done 與 error 只會回傳一次，之後該工作即被移除。
+    """
+    with _jobs_lock:
+        entry = _jobs.get(job_id)
+        if entry is None:
+            return "missing", None
+        future = entry[1]
+        if not future.done():
+            return "running", None
+        del _jobs[job_id]
+    error = future.exception()
+    if error is not None:
+        return "error", error
+    return "done", future.result()
@@ -0,0 +1,142 @@
+"""
+內容定址 Blob 儲存 - 生成的簡報存磁碟，session_state 只留 digest
+磁碟用量有上限：超過 MAX_AGE 沒被讀取的 blob 先刪，總量仍超過 MAX_BYTES 就從最久沒用的刪起
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+
+BLOB_DIR = Path(__file__).parent / "cache" / "blobs"
+BLOB_DIR.mkdir(parents=True, exist_ok=True)
+
+MAX_BYTES = 512 << 20         # blob 目錄總大小上限
+MAX_AGE = 7 * 24 * 3600       # 超過 7 天沒被讀取就刪除
+GC_INTERVAL = 60              # 兩次清理之間至少間隔（秒）
+ZIP_INDEX_SIZE = 256          # 記住最近幾組結果的 ZIP
+
+# 結果集 key -> ZIP digest（同一組檔案只打包一次，只保留最近 ZIP_INDEX_SIZE 組）
+_zip_index = OrderedDict()
+_zip_lock = threading.Lock()
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+
+
+def _blob_path(digest):
+    return BLOB_DIR / digest[:2] / digest
+
+
+def put(data):
+    """存入 bytes / BytesIO，回傳 sha256 digest（相同內容只寫一次）"""
+    if isinstance(data, io.BytesIO):
+        data = data.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if not path.exists():
+        path.parent.mkdir(exist_ok=True)
+        # 先寫暫存檔再改名，避免其他 session 讀到寫一半的檔案
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        collect()
+    else:
+        _touch(path)
+    return digest
+
+
+def put_file(filepath):
+    """存入既有檔案"""
+    with open(filepath, "rb") as f:
+        return put(f.read())
+
+
+def get(digest):
+    """讀取 blob 內容（已被清掉時拋出 FileNotFoundError，呼叫端先用 exists 檢查）"""
+    path = _blob_path(digest)
+    with open(path, "rb") as f:
+        data = f.read()
+    _touch(path)
+    return data
+
+
+def exists(digest):
+    return bool(digest) and _blob_path(digest).exists()
+
+
+def save_as(digest, filepath):
+    """把 blob 複製成指定檔案（例如存到 output）"""
+    with open(_blob_path(digest), "rb") as src, open(filepath, "wb") as dst:
+        dst.write(src.read())
+    return filepath
+
+
+def zip_blobs(entries):
+    """把 [(檔名, digest), ...] 打包成 ZIP，回傳 ZIP 的 digest；同一組結果只打包一次"""
+    key = tuple(entries)
+    with _zip_lock:
+        digest = _zip_index.get(key)
+        if digest:
+            _zip_index.move_to_end(key)
+    if digest and exists(digest):
+        return digest
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for filename, blob in entries:
+            zip_file.writestr(filename, get(blob))
+    digest = put(zip_buffer)
+
+    with _zip_lock:
+        _zip_index[key] = digest
+        _zip_index.move_to_end(key)
+        while len(_zip_index) > ZIP_INDEX_SIZE:
+            _zip_index.popitem(last=False)
+    return digest
+
+
+# ============ 清理 ============
+def _touch(path):
+    """以 mtime 記錄最後使用時間（清理時依此判斷新舊）"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def collect(force=False):
+    """刪除過期 blob，總量超過上限時從最久沒用的刪起；回傳刪除的檔案數"""
+    global _last_gc
+    now = time.time()
+    with _gc_lock:
+        if not force and now - _last_gc < GC_INTERVAL:
+            return 0
+        _last_gc = now
+        files = []
+        for path in BLOB_DIR.glob("*/*"):
+            # 寫入中的暫存檔不算
+            if len(path.name) != 64:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if now - mtime <= MAX_AGE and total <= MAX_BYTES:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,156 @@
+"""
+對話上下文管理 - 依 token 預算保留最近對話，較舊的對話壓縮成滾動摘要
+"""
+import re
+from functools import lru_cache
+
+DEFAULT_BUDGET = 8000          # 送出的對話 tokens 上限
+DEFAULT_SUMMARY_BUDGET = 800   # 滾動摘要 tokens 上限
+IMAGE_TOKENS = 1600            # 圖片估計 tokens（約 1568px 長邊上限）
+SNIPPET_CHARS = 120            # 每則舊訊息在摘要中保留的字數
+TRUNCATED_MARK = "\n…（內容過長，超過對話上下文預算，以下已截斷）"
+
+_CJK = re.compile(r'[\u3000-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+
+def _count_tokens(text):
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@lru_cache(maxsize=4096)
+def estimate_text_tokens(text):
+    """估算文字 tokens：中日韓字元約 1 token/字，其他約 4 字元/token"""
+    return _count_tokens(text)
+
+
+def estimate_tokens(content):
+    """估算單則訊息內容（字串或 content blocks）的 tokens"""
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+    total = 0
+    for block in content:
+        if block.get("type") == "text":
+            total += estimate_text_tokens(block.get("text", ""))
+        elif block.get("type") == "image":
+            total += IMAGE_TOKENS
+    return total
+
+
+def message_text(content):
+    """取出訊息中的文字部分"""
+    if isinstance(content, str):
+        return content
+    return " ".join(b.get("text", "") for b in content if b.get("type") == "text")
+
+
+def _snippet(message):
+    role = "使用者" if message["role"] == "user" else "助手"
+    text = " ".join(message_text(message["content"]).split())
+    if len(text) > SNIPPET_CHARS:
+        text = text[:SNIPPET_CHARS] + "…"
+    return f"- {role}：{text}"
+
+
+def _trim_summary(summary, budget):
+    """保留最新的摘要行，直到符合預算"""
+    lines = summary.split("\n")
+    while len(lines) > 1 and estimate_text_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def _truncate_text(text, budget):
+    """截掉文字尾端直到符合預算（二分搜尋保留的字數）"""
+    budget -= _count_tokens(TRUNCATED_MARK)
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _count_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + TRUNCATED_MARK
+
+
+def truncate_message(message, budget):
+    """
+    單則訊息超過預算時截斷文字部分（圖片保留），回傳新的 message，不修改原本的。
+    圖片本身就超過預算時文字全部截掉
+    """
+    content = message["content"]
+    if isinstance(content, str):
+        return {**message, "content": _truncate_text(content, max(budget, 0))}
+    images = sum(IMAGE_TOKENS for b in content if b.get("type") == "image")
+    remaining = max(budget - images, 0)
+    blocks = []
+    for block in content:
+        if block.get("type") == "text":
+            tokens = estimate_text_tokens(block.get("text", ""))
+            if tokens > remaining:
+                block = {**block, "text": _truncate_text(block.get("text", ""), remaining)}
+                tokens = _count_tokens(block["text"])
+            remaining = max(remaining - tokens, 0)
+        blocks.append(block)
+    return {**message, "content": blocks}
+
+
+def new_state():
+    return {"summary": "", "summarized_upto": 0}
+
+
+def build_context(messages, state, budget=DEFAULT_BUDGET, summary_budget=DEFAULT_SUMMARY_BUDGET):
+    """
+    回傳 (送出的 messages, 摘要, 統計)。
+    從最新一則往回保留原文直到超過預算；視窗必須以 user 開頭。
+    被擠出視窗的訊息只壓縮一次，附加到 state["summary"]。
+    最新一則單獨就超過預算時截斷其文字，統計中 truncated 為 True。
+    """
+    if state["summarized_upto"] > len(messages):
+        state.update(new_state())
+    counts = [estimate_tokens(m["content"]) for m in messages]
+
+    # 最新一則一定保留
+    start = len(messages) - 1
+    used = counts[start] if messages else 0
+    while start > 0 and used + counts[start - 1] <= budget:
+        start -= 1
+        used += counts[start]
+    # 已摘要的部分不再重複送原文
+    while start < state["summarized_upto"]:
+        used -= counts[start]
+        start += 1
+    while start < len(messages) - 1 and messages[start]["role"] != "user":
+        used -= counts[start]
+        start += 1
+
+    # 新擠出的訊息加入滾動摘要
+    if start > state["summarized_upto"]:
+        new_lines = [_snippet(m) for m in messages[state["summarized_upto"]:start]]
+        summary = "\n".join(filter(None, [state["summary"]] + new_lines))
+        state["summary"] = _trim_summary(summary, summary_budget)
+        state["summarized_upto"] = start
+
+    window = messages[start:]
+    truncated = bool(messages) and counts[-1] > budget
+    if truncated:
+        window = window[:-1] + [truncate_message(messages[-1], budget)]
+        used = estimate_tokens(window[-1]["content"])
+
+    summary_tokens = estimate_text_tokens(state["summary"]) if state["summary"] else 0
+    stats = {
+        "kept": len(messages) - start,
+        "summarized": start,
+        "context_tokens": used,
+        "summary_tokens": summary_tokens,
+        "total_tokens": used + summary_tokens,
+        "truncated": truncated,
+    }
+    return window, state["summary"], stats
+
+
+def with_summary(system_prompt, summary):
+    """把滾動摘要附加到 system prompt"""
+    if not summary:
+        return system_prompt
+    return f"{system_prompt}\n\n以下是先前對話的摘要（較早的內容已壓縮）：\n{summary}"
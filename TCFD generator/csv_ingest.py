@@ -0,0 +1,113 @@
+"""
+CSV 匯入 - 上傳的 CSV 以 Arrow 分塊讀取後轉存 Parquet，依內容雜湊快取
+之後換軸、重新分析都直接讀 Parquet 的欄位，不再解析 CSV
+"""
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+PARQUET_DIR = Path(__file__).parent / "cache" / "parquet"
+PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+
+BLOCK_SIZE = 8 << 20          # 每次讀 8 MB
+FALLBACK_ENCODINGS = ["utf-8-sig", "cp950"]   # Excel 匯出的中文 CSV 常是 Big5
+
+
+def digest_of(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def parquet_path(digest):
+    return PARQUET_DIR / f"{digest}.parquet"
+
+
+def _write_arrow(data, tmp):
+    """Arrow 串流讀取：一次一個區塊寫入 Parquet，記憶體只放一個區塊"""
+    # Arrow 只認 UTF-8：標題列解不開、或文字欄被推斷成 binary，就是其他編碼
+    newline = data.find(b"\n")
+    data[:newline if newline >= 0 else len(data)].decode("utf-8")
+    reader = pv.open_csv(io.BytesIO(data), read_options=pv.ReadOptions(block_size=BLOCK_SIZE))
+    if any(pa.types.is_binary(field.type) for field in reader.schema):
+        raise pa.ArrowInvalid("CSV 不是 UTF-8 編碼")
+    with pq.ParquetWriter(tmp, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def _write_pandas(data, tmp):
+    """
+    備援：Arrow 讀不了時（非 UTF-8 編碼、後段欄位型態與開頭推斷的不同）改用 pandas 整份讀取，
+    pandas 會看過整欄再決定型態
+    """
+    import pandas as pd
+
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            frame = pd.read_csv(io.BytesIO(data), encoding=encoding, low_memory=False)
+        except UnicodeDecodeError:
+            continue
+        # 混合型態的欄位（object）一律存成字串
+        for col in frame.columns[frame.dtypes == object]:
+            frame[col] = frame[col].astype("string")
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp)
+        return
+    raise ValueError("無法辨識 CSV 編碼（支援 UTF-8、Big5）")
+
+
+def ingest(data):
+    """CSV bytes 轉存 Parquet（同內容只轉一次），回傳 digest"""
+    digest = digest_of(data)
+    path = parquet_path(digest)
+    if path.exists():
+        return digest
+    # 先寫暫存檔再改名，其他 session 不會讀到寫一半的檔案
+    fd, tmp = tempfile.mkstemp(dir=PARQUET_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        try:
+            _write_arrow(data, tmp)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, UnicodeDecodeError):
+            _write_pandas(data, tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return digest
+
+
+def info(digest):
+    """筆數、欄位與數值欄位（只讀 Parquet metadata，不載入資料）"""
+    parquet = pq.ParquetFile(parquet_path(digest))
+    schema = parquet.schema_arrow
+    numeric = [field.name for field in schema
+               if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)]
+    return {
+        "rows": parquet.metadata.num_rows,
+        "columns": schema.names,
+        "numeric_columns": numeric,
+        "size": parquet_path(digest).stat().st_size,
+    }
+
+
+def load(digest, columns=None, limit=None):
+    """讀出 DataFrame；columns 只讀指定欄位，limit 只讀前幾筆"""
+    path = parquet_path(digest)
+    if limit is None:
+        return pq.read_table(path, columns=columns).to_pandas()
+    parquet = pq.ParquetFile(path)
+    batches = []
+    remaining = limit
+    for batch in parquet.iter_batches(batch_size=min(limit, 65_536), columns=columns):
+        batches.append(batch.slice(0, remaining))
+        remaining -= len(batches[-1])
+        if remaining <= 0:
+            break
+    if not batches:
+        return pq.read_schema(path).empty_table().select(columns or pq.read_schema(path).names).to_pandas()
+    return pa.Table.from_batches(batches).to_pandas()
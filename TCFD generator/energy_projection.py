@@ -0,0 +1,65 @@
+"""
+能源成本趨勢預測 - 確定性預測與蒙地卡羅模擬，全部以 NumPy 陣列運算
+第 0 年為基準年；成本單位與輸入相同（萬元）
+"""
+import numpy as np
+
+PERCENTILES = (10, 50, 90)
+
+
+def project(base_cost, growth_rate, tech_saving, years):
+    """
+    單一成長率的預測。growth_rate / tech_saving 為百分比。
+    回傳 baseline（不導入技術）、with_tech（導入技術）、cumulative_saving（累積節省），長度 years + 1
+    """
+    baseline = base_cost * (1 + growth_rate / 100) ** np.arange(years + 1)
+    with_tech = baseline * (1 - tech_saving / 100)
+    return {
+        "baseline": baseline,
+        "with_tech": with_tech,
+        "cumulative_saving": np.cumsum(baseline - with_tech),
+    }
+
+
+def simulate(base_cost, growth_rate, growth_volatility, tech_saving, saving_uncertainty,
+             years, n_paths=10_000, seed=0):
+    """
+    蒙地卡羅模擬：每條路徑每年的能源價格成長率 ~ N(growth_rate, growth_volatility)，
+    節能率每條路徑抽一次 ~ N(tech_saving, saving_uncertainty)，截在 0~100%。
+    回傳各序列的 P10 / P50 / P90（dict：名稱 -> {百分位: 陣列}），以及最終年度累積節省的全部樣本。
+    """
+    rng = np.random.default_rng(seed)
+    # 陣列以「年 x 路徑」排列，取百分位時沿連續記憶體計算
+    growth = rng.normal(growth_rate / 100, growth_volatility / 100, size=(years, n_paths))
+    # 成長率低於 -100% 沒有意義
+    np.maximum(growth, -0.99, out=growth)
+
+    # 價格指數：第 0 年為 1，之後逐年連乘（log 空間累加）
+    index = np.empty((years + 1, n_paths))
+    index[0] = 0.0
+    np.cumsum(np.log1p(growth, out=growth), axis=0, out=index[1:])
+    baseline = base_cost * np.exp(index, out=index)
+
+    saving = np.clip(rng.normal(tech_saving / 100, saving_uncertainty / 100, size=n_paths), 0.0, 1.0)
+    saved = baseline * saving
+    with_tech = baseline - saved
+    cumulative_saving = np.cumsum(saved, axis=0, out=saved)
+
+    bands = {}
+    for name, paths in (("baseline", baseline), ("with_tech", with_tech),
+                        ("cumulative_saving", cumulative_saving)):
+        values = np.percentile(paths, PERCENTILES, axis=1)
+        bands[name] = dict(zip(PERCENTILES, values))
+    return bands, cumulative_saving[-1]
+
+
+if __name__ == "__main__":
+    import time
+
+    for n_paths in (10_000, 100_000):
+        start = time.perf_counter()
+        bands, final = simulate(1000, 5, 3, 25, 5, 30, n_paths=n_paths)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{n_paths:>7,} 條路徑 x 30 年：{elapsed:.0f} ms，"
+              f"30 年累積節省 P10/P50/P90 = "
+              + " / ".join(f"{bands['cumulative_saving'][p][-1]:,.0f}" for p in PERCENTILES))
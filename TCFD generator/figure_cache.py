@@ -0,0 +1,126 @@
+"""
+圖表快取 - Plotly 圖依「輸入資料雜湊 + 繪圖參數」快取，重繪時只重建有變動的圖
+快取內容是壓縮過的 Plotly JSON（數值陣列為 base64），取出時略過驗證直接還原成 Figure，
+每次取得的都是新物件，呼叫端之後再 update_layout 也不會改到快取
+"""
+import hashlib
+import json
+import pickle
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import pyarrow as pa
+
+MAX_BYTES = 64 << 20          # 快取總大小上限（壓縮後），超過就淘汰最久沒用的
+COMPRESS_LEVEL = 1            # 圖表 JSON 壓縮比已經很高，用最快的等級
+
+_cache = OrderedDict()        # key -> 壓縮後的 JSON bytes
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+_size = 0
+
+
+# ============ 資料雜湊 ============
+def _update_frame(h, df):
+    """DataFrame 轉成 Arrow 後直接雜湊欄位緩衝區（數值欄零複製，不逐列轉字串）"""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+    except (pa.ArrowException, TypeError, ValueError):
+        # 混雜無法轉成 Arrow 的物件時退回 pickle
+        h.update(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+        return
+    h.update(str(table.schema).encode())
+    for column in table.columns:
+        for chunk in column.chunks:
+            # 切片共用同一塊緩衝區，長度與起點也要算進去
+            h.update(f"{chunk.offset}:{len(chunk)}".encode())
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    h.update(buffer)
+
+
+def _update(h, value):
+    """依型別把輸入資料加進雜湊（dict / list 逐項遞迴）"""
+    h.update(type(value).__name__.encode())
+    if isinstance(value, pd.DataFrame):
+        _update_frame(h, value)
+    elif isinstance(value, pd.Series):
+        _update_frame(h, value.to_frame())
+    elif isinstance(value, np.ndarray):
+        h.update(f"{value.dtype}{value.shape}".encode())
+        if value.dtype.hasobject:
+            h.update(pickle.dumps(value.tolist(), protocol=pickle.HIGHEST_PROTOCOL))
+        else:
+            h.update(np.ascontiguousarray(value).view(np.uint8))
+    elif isinstance(value, dict):
+        for k in sorted(value, key=repr):
+            _update(h, k)
+            _update(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(str(len(value)).encode())
+        for item in value:
+            _update(h, item)
+    else:
+        h.update(repr(value).encode())
+
+
+def fingerprint(*values):
+    h = hashlib.blake2b(digest_size=16)
+    for value in values:
+        _update(h, value)
+    return h.hexdigest()
+
+
+# ============ 快取 ============
+def _pack(fig):
+    return zlib.compress(pio.to_json(fig, validate=False).encode(), COMPRESS_LEVEL)
+
+
+def _unpack(blob):
+    # 存進來的圖已經驗證過，還原時略過驗證（大型圖的主要成本）
+    return go.Figure(json.loads(zlib.decompress(blob)), _validate=False)
+
+
+def get(name, builder, *data, **params):
+    """
+    取得圖表：name 區分不同的圖，data 為輸入資料（參與雜湊），params 為繪圖參數。
+    快取沒有時呼叫 builder(*data, **params) 建圖並存入
+    """
+    global _size
+    key = (name, fingerprint(data, params))
+    with _lock:
+        blob = _cache.get(key)
+        if blob is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+    if blob is not None:
+        return _unpack(blob)
+
+    fig = builder(*data, **params)
+    blob = _pack(fig)
+    with _lock:
+        _stats["misses"] += 1
+        if key not in _cache:
+            _cache[key] = blob
+            _size += len(blob)
+        while _size > MAX_BYTES and len(_cache) > 1:
+            _, old = _cache.popitem(last=False)
+            _size -= len(old)
+    return fig
+
+
+def clear():
+    global _size
+    with _lock:
+        _cache.clear()
+        _size = 0
+
+
+def stats():
+    with _lock:
+        return {**_stats, "entries": len(_cache), "bytes": _size}
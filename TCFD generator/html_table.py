@@ -0,0 +1,97 @@
+"""
+HTML 表格渲染器 - 預編譯模板、預設跳脫、分頁輸出
+"""
+import html
+import math
+from functools import lru_cache
+from string import Formatter
+
+import streamlit as st
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class Markup(str):
+    """已信任的 HTML 片段（不跳脫），僅用於程式內建的常數內容"""
+
+
+def escape(value):
+    """跳脫 HTML，Markup 原樣保留"""
+    if isinstance(value, Markup):
+        return value
+    if value is None:
+        return ""
+    return html.escape(str(value), quote=True)
+
+
+def nl2br(value):
+    """跳脫後把換行轉成 <br>（LLM 文字用）"""
+    return Markup(escape(value).replace("\n", "<br>"))
+
+
+def _attrs(attrs):
+    return f" {attrs}" if attrs else ""
+
+
+class TableTemplate:
+    """預編譯的表格模板：表頭與列格式只組一次，渲染時只做欄位代換"""
+
+    def __init__(self, headers, cells, table_attrs="", th_attrs="", td_attrs="", row_styles=("",), footer=""):
+        self.fields = []
+        for cell in cells:
+            for _, name, _, _ in Formatter().parse(cell):
+                if name and name not in self.fields:
+                    self.fields.append(name)
+
+        # th_attrs 可為單一字串或逐欄 tuple
+        if isinstance(th_attrs, str):
+            th_attrs = (th_attrs,) * len(headers)
+        head = "".join(f"<th{_attrs(a)}>{escape(h)}</th>" for h, a in zip(headers, th_attrs))
+        self.head = f"<table{_attrs(table_attrs)}><thead><tr>{head}</tr></thead><tbody>"
+        self.tail = "</tbody></table>" + footer
+        self.row_styles = row_styles
+        self.row_fmt = "<tr{_style}>" + "".join(f"<td{_attrs(td_attrs)}>{cell}</td>" for cell in cells) + "</tr>"
+
+    def render_rows(self, rows, start=0):
+        """渲染資料列；rows 為 dict 序列，值一律先跳脫"""
+        n_styles = len(self.row_styles)
+        out = []
+        for i, row in enumerate(rows, start):
+            values = {name: escape(row.get(name, "")) for name in self.fields}
+            style = self.row_styles[i % n_styles]
+            values["_style"] = f' style="{style}"' if style else ""
+            out.append(self.row_fmt.format_map(values))
+        return "".join(out)
+
+    def render(self, rows, start=0):
+        return self.head + self.render_rows(rows, start) + self.tail
+
+
+@lru_cache(maxsize=32)
+def get_template(headers, cells, table_attrs="", th_attrs="", td_attrs="", row_styles=("",), footer=""):
+    """取得（快取的）表格模板；參數須為可雜湊的 tuple / str"""
+    return TableTemplate(headers, cells, table_attrs, th_attrs, td_attrs, row_styles, footer)
+
+
+def page_bounds(n_rows, page, page_size=DEFAULT_PAGE_SIZE):
+    """回傳 (start, end, n_pages)，page 從 1 起算"""
+    n_pages = max(1, math.ceil(n_rows / page_size))
+    page = min(max(1, page), n_pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, n_rows), n_pages
+
+
+def render_paged_table(template, rows, key, page_size=DEFAULT_PAGE_SIZE):
+    """只把目前頁面的資料列送到瀏覽器；超過一頁時顯示頁碼選擇"""
+    n_rows = len(rows)
+    page = 1
+    if n_rows > page_size:
+        n_pages = math.ceil(n_rows / page_size)
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            page = st.number_input("頁碼", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}_page")
+        start, end, n_pages = page_bounds(n_rows, page, page_size)
+        with col2:
+            st.caption(f"第 {start + 1}-{end} 筆，共 {n_rows} 筆（{n_pages} 頁）")
+    start, end, _ = page_bounds(n_rows, page, page_size)
+    st.markdown(template.render(rows[start:end], start), unsafe_allow_html=True)
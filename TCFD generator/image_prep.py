@@ -0,0 +1,89 @@
+"""
+圖片前處理 - 縮到模型實際使用的尺寸、挑較小的編碼、去除中繼資料，結果以內容雜湊快取
+"""
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+MAX_LONG_EDGE = 1568       # 超過此長邊模型端也會縮圖
+MAX_PIXELS = 1_150_000     # 約 1.15 百萬像素
+JPEG_QUALITY = 85
+PALETTE_COLORS = 256       # 色數不超過此值（圖表、截圖）改用 PNG
+CACHE_SIZE = 64
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _target_size(width, height):
+    scale = min(1.0, MAX_LONG_EDGE / max(width, height), (MAX_PIXELS / (width * height)) ** 0.5)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def preprocess(data):
+    """回傳 (media_type, 編碼後 bytes, (寬, 高))"""
+    image = Image.open(io.BytesIO(data))
+    image.seek(0)  # 動畫 GIF 只取第一格
+    if image.format == "JPEG":
+        # JPEG 直接以較小倍率解碼，大張手機照片省下大部分解碼時間
+        image.draft("RGB", _target_size(*image.size))
+    image = ImageOps.exif_transpose(image)  # 套用相機方向後才丟掉 EXIF
+
+    size = _target_size(*image.size)
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+
+    buffered = io.BytesIO()
+    if _has_alpha(image):
+        image = image.convert("RGBA")
+        image.info = {}
+        image.save(buffered, format="PNG", optimize=True)
+        return "image/png", buffered.getvalue(), image.size
+
+    image = image.convert("RGB")
+    image.info = {}
+    if image.getcolors(PALETTE_COLORS) is not None:
+        # 色數少：調色盤 PNG 通常比 JPEG 小且文字不糊
+        image.quantize(PALETTE_COLORS).save(buffered, format="PNG", optimize=True)
+        return "image/png", buffered.getvalue(), image.size
+
+    image.save(buffered, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return "image/jpeg", buffered.getvalue(), image.size
+
+
+def encode_image_block(data):
+    """
+    回傳 (Claude image content block, 統計)；相同內容只處理一次。
+    統計包含原始 / 輸出 bytes 與輸出尺寸。
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    with _cache_lock:
+        cached = _cache.get(digest)
+        if cached is not None:
+            _cache.move_to_end(digest)
+            return cached
+
+    media_type, encoded, size = preprocess(data)
+    block = {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": media_type,
+            "data": base64.b64encode(encoded).decode('utf-8')
+        }
+    }
+    stats = {"original_bytes": len(data), "encoded_bytes": len(encoded), "size": size}
+
+    with _cache_lock:
+        _cache[digest] = (block, stats)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return block, stats
@@ -0,0 +1,268 @@
+"""
+產業辭典 - 台灣常見產業名稱與別名，編譯成多模式比對自動機（Aho-Corasick）
+一次掃描訊息即可找出產業，與辭典大小無關；normalize_industry 的結果可當快取 key
+"""
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+
+DEFAULT_INDUSTRY = "企業"
+
+# 標準名稱 -> 字根（別名）；比對時會自動加上「業、產業、工業、廠商…」等字尾
+INDUSTRY_TAXONOMY = {
+    # 金屬 / 建材
+    "鋁建材業": ("鋁建材", "鋁門窗", "鋁窗", "鋁擠型", "鋁型材", "鋁帷幕", "帷幕牆", "鋁製品", "鋁業", "鋁材", "鋁合金門窗", "鋁門", "氣密窗", "隔音窗", "鋁百葉", "鋁格柵", "鋁板", "鋁捲", "鋁箔", "鋁錠", "鋁合金", "鋁加工", "aluminium", "aluminum"),
+    "鋼鐵業": ("鋼鐵", "煉鋼", "鋼品", "鋼材", "鋼構", "不鏽鋼", "特殊鋼", "鋼筋", "鋼板", "鋼管", "鋼胚", "鋼捲", "熱軋", "冷軋", "線材", "型鋼", "h型鋼", "鍍鋅鋼板", "電爐煉鋼", "高爐", "steel"),
+    "金屬製品業": ("金屬製品", "金屬加工", "五金", "螺絲螺帽", "螺絲", "扣件", "模具", "鑄造", "鍛造", "壓鑄", "金屬表面處理", "電鍍", "金屬零件", "鈑金", "沖壓", "粉末冶金", "熱處理", "焊接", "彈簧", "鏈條", "手工具", "刀具", "閥門", "水龍頭", "金屬門窗"),
+    "非鐵金屬業": ("非鐵金屬", "銅材", "銅箔", "鋅", "鎳", "稀土", "貴金屬", "金屬回收", "銅線", "銅管", "鈦金屬", "錫", "鉛", "鋰礦", "稀有金屬", "有色金屬"),
+    "建材業": ("建材", "建築材料", "磁磚", "瓷磚", "衛浴設備", "衛浴", "石材", "木門", "防火建材", "隔熱建材", "系統櫥櫃", "塗料", "地板", "木地板", "石膏板", "矽酸鈣板", "隔間板", "防水材料", "油漆", "乳膠漆", "門窗", "窗簾", "壁紙", "天花板"),
+    "水泥業": ("水泥", "預拌混凝土", "混凝土", "骨材", "砂石", "水泥製品", "預鑄", "預鑄構件", "爐石粉", "石灰"),
+    "玻璃陶瓷業": ("玻璃", "平板玻璃", "玻璃陶瓷", "陶瓷", "耐火材料", "窯業", "玻璃纖維", "強化玻璃", "安全玻璃", "低輻射玻璃", "精密陶瓷", "衛生陶瓷", "琺瑯"),
+    "營建業": ("營建", "營造", "建築", "建設", "土木", "土木工程", "工程承攬", "室內裝修", "統包工程", "機電工程", "營造廠", "建築工程", "公共工程", "橋梁工程", "隧道工程", "道路工程", "鋼構工程", "水電工程", "空調工程", "帷幕工程", "拆除工程", "營建工程"),
+    "不動產業": ("不動產", "房地產", "建案開發", "不動產開發", "物業管理", "商辦", "租賃住宅", "房屋仲介", "建商", "建設公司", "地產開發", "不動產經紀", "不動產投資", "reits", "物業", "社宅", "商場開發"),
+    # 機電 / 設備
+    "空調業": ("空調", "空調設備", "暖通空調", "冷氣", "冷氣機", "冷凍空調", "冰水主機", "hvac", "冷凍設備", "熱泵", "通風設備", "中央空調", "箱型冷氣", "分離式冷氣", "空調箱", "冷卻水塔", "除濕機", "空氣清淨機", "冷媒", "冷凍櫃", "製冰機"),
+    "機械業": ("機械", "工具機", "產業機械", "機械設備", "工業機械", "自動化設備", "工業機器人", "機器人", "精密機械", "塑膠機械", "包裝機械", "木工機械", "cnc", "cnc工具機", "綜合加工機", "車床", "銑床", "磨床", "射出成型機", "沖床", "雷射加工機", "傳動元件", "線性滑軌", "滾珠螺桿", "減速機", "泵浦", "幫浦", "壓縮機", "空壓機", "鍋爐", "起重機", "堆高機", "農業機械", "紡織機械", "食品機械"),
+    "電機業": ("電機", "馬達", "電動機", "發電機", "變壓器", "配電盤", "電線電纜", "電纜", "開關設備", "重電", "電力設備", "配電設備", "不斷電系統", "電源供應器", "充電樁", "電動車充電", "智慧電表", "開關", "斷路器"),
+    "家電業": ("家電", "家用電器", "小家電", "白色家電", "廚具", "照明", "燈具", "led照明", "洗衣機", "冰箱", "電冰箱", "電視機", "吸塵器", "電風扇", "電鍋", "熱水器", "淨水器", "廚房家電"),
+    "汽車業": ("汽車", "汽車製造", "整車", "車輛", "汽車零組件", "汽車零件", "車用零件", "車燈", "輪胎", "電動車", "電動車零組件", "汽車維修", "汽車銷售", "車廠", "汽車組裝", "商用車", "卡車製造", "巴士製造", "汽車電子", "車用電子", "汽車板金", "汽車美容", "車用電池", "automotive"),
+    "機車業": ("機車", "電動機車", "機車零件", "自行車", "腳踏車", "電動自行車", "二輪車", "機車製造", "自行車零件", "電動二輪車"),
+    "航太業": ("航太", "航空零組件", "飛機零件", "無人機", "衛星", "航空器", "航空發動機", "飛機維修", "太空產業", "aerospace"),
+    "船舶業": ("船舶", "造船", "遊艇", "船舶修造", "船廠", "船舶製造", "船舶維修", "造艇"),
+    "軌道運輸設備業": ("軌道車輛", "鐵道車輛", "軌道運輸設備", "捷運車輛", "軌道設備", "鐵路設備", "號誌系統"),
+    # 電子 / 資通訊
+    "半導體業": ("半導體", "晶圓", "晶圓代工", "晶圓製造", "ic設計", "ic製造", "封裝測試", "封測", "半導體設備", "半導體材料", "矽晶圓", "記憶體", "dram", "ic", "晶片", "晶片設計", "先進封裝", "封裝", "測試", "光罩", "晶圓廠", "ic封測", "ic測試", "半導體製造", "化合物半導體", "第三類半導體", "碳化矽", "氮化鎵", "foundry", "semiconductor"),
+    "電子業": ("電子", "電子零組件", "電子製造", "電子代工", "ems", "被動元件", "連接器", "電子材料", "電子零件", "電子元件", "電阻", "電容", "電感", "石英元件", "電源管理", "散熱模組", "機殼", "電子組裝", "smt", "代工廠", "oem", "odm"),
+    "印刷電路板業": ("印刷電路板", "電路板", "pcb", "載板", "ic載板", "銅箔基板", "軟板", "硬板", "軟硬結合板", "hdi", "pcb組裝", "pcba", "電路板組裝"),
+    "光電業": ("光電", "面板", "顯示器", "液晶面板", "led", "光學元件", "鏡頭", "觸控面板", "光通訊", "led晶粒", "背光模組", "oled", "micro led", "光學鏡片", "雷射", "光纖", "光學膜", "偏光板"),
+    "電腦及週邊設備業": ("電腦", "電腦週邊", "伺服器", "筆電", "筆記型電腦", "主機板", "電腦及週邊設備", "資料儲存設備", "網通設備", "個人電腦", "桌上型電腦", "平板電腦", "鍵盤", "滑鼠", "印表機", "顯示卡", "硬碟", "固態硬碟", "ssd", "工業電腦", "ipc", "伺服器代工"),
+    "通訊業": ("通訊", "電信", "通信", "網通", "行動通訊", "寬頻", "5g", "通訊設備", "衛星通訊", "電信業者", "電信服務", "手機", "智慧型手機", "基地台", "網路設備", "交換器", "路由器", "telecom"),
+    "資訊服務業": ("資訊服務", "軟體", "軟體開發", "系統整合", "雲端服務", "雲端", "資料中心", "機房", "資安", "資訊安全", "it服務", "saas", "電子商務", "電商", "網路服務", "數位服務", "人工智慧", "ai", "軟體公司", "系統開發", "app開發", "網站開發", "資料分析", "大數據", "物聯網", "iot", "雲端運算", "託管服務", "idc", "數位轉型服務", "平台經濟", "網路平台", "data center"),
+    "太陽能業": ("太陽能", "太陽光電", "光電板", "太陽能板", "太陽能電池", "太陽能模組", "pv", "太陽能電廠", "太陽光電系統", "矽晶太陽能", "薄膜太陽能", "逆變器", "solar"),
+    "電池業": ("電池", "鋰電池", "儲能", "儲能系統", "電池材料", "電池模組", "燃料電池", "鋰離子電池", "動力電池", "電芯", "正極材料", "負極材料", "電解液", "隔離膜", "鉛酸電池", "battery"),
+    # 能源 / 公用事業
+    "電力業": ("電力", "發電", "火力發電", "燃煤發電", "燃氣發電", "輸配電", "售電", "電廠", "發電廠", "核能發電", "汽電共生", "電網", "台電", "utilities"),
+    "再生能源業": ("再生能源", "綠能", "綠電", "風力發電", "風電", "離岸風電", "地熱發電", "水力發電", "生質能", "氫能", "能源服務", "esco", "節能服務", "風機", "風力機", "離岸風場", "陸域風電", "生質燃料", "沼氣發電", "小水力", "綠氫", "儲能案場", "再生能源開發", "renewable energy"),
+    "石油及天然氣業": ("石油", "石油煉製", "煉油", "天然氣", "液化天然氣", "油氣", "加油站", "燃料油", "瓦斯", "煉油廠", "油品", "潤滑油", "天然氣供應", "液化石油氣", "lpg", "lng", "中油", "oil and gas"),
+    "自來水業": ("自來水", "供水", "水務", "水資源", "水廠", "淨水廠", "海水淡化", "供水系統", "水處理設備"),
+    "廢棄物處理業": ("廢棄物處理", "廢棄物清理", "資源回收", "回收處理", "焚化", "廢水處理", "污水處理", "環保工程", "環境工程", "環保服務", "廢棄物", "垃圾處理", "掩埋場", "焚化廠", "回收業", "廢塑膠回收", "廢電子回收", "有害廢棄物", "土壤整治", "循環經濟"),
+    # 化學 / 材料
+    "石化業": ("石化", "石油化學", "石化原料", "塑膠原料", "乙烯", "輕油裂解", "芳香烴", "丙烯", "苯乙烯", "pvc", "聚乙烯", "聚丙烯", "petrochemical"),
+    "化工業": ("化工", "化學", "化學品", "特用化學品", "化學材料", "工業氣體", "肥料", "農藥", "染料", "顏料", "接著劑", "油墨", "清潔用品", "界面活性劑", "化學工業", "精密化學", "電子化學品", "溶劑", "樹脂", "觸媒", "矽膠", "化學原料", "工業用化學品", "塗料化工", "chemicals"),
+    "塑膠製品業": ("塑膠", "塑膠製品", "塑膠加工", "塑膠射出", "塑膠包材", "塑膠膜", "發泡材料", "塑膠管", "塑膠容器", "塑膠袋", "塑膠零件", "工程塑膠", "塑膠皮", "塑膠布", "保麗龍", "生質塑膠"),
+    "橡膠製品業": ("橡膠", "橡膠製品", "合成橡膠", "乳膠", "橡膠零件", "橡膠管", "輸送帶", "矽橡膠", "乳膠手套", "手套"),
+    "紡織業": ("紡織", "紡紗", "織布", "成衣", "服飾", "機能布料", "人造纖維", "化纖", "不織布", "染整", "紡織品", "製鞋", "鞋業", "皮革", "皮件", "紡織廠", "針織", "梭織", "紗線", "布料", "成衣廠", "運動服飾", "機能服飾", "鞋材", "運動鞋", "聚酯纖維", "尼龍", "textile", "apparel"),
+    "造紙業": ("造紙", "紙業", "紙漿", "紙器", "紙箱", "紙製品", "包裝材料", "包材", "印刷", "紙廠", "工業用紙", "文化用紙", "家庭用紙", "衛生紙", "紙板", "瓦楞紙", "紙容器"),
+    "木材及家具業": ("木材", "木製品", "家具", "傢俱", "辦公家具", "合板", "實木家具", "系統家具", "床墊", "沙發", "木工", "木作", "櫥櫃", "furniture"),
+    # 民生
+    "食品業": ("食品", "食品加工", "食品製造", "飲料", "飲料製造", "乳品", "烘焙", "冷凍食品", "調味品", "肉品加工", "水產加工", "茶飲", "手搖飲", "製糖", "製麵", "食用油", "保健食品", "菸酒", "酒類", "食品廠", "罐頭", "零食", "休閒食品", "麵包", "糕餅", "醬油", "冷凍調理食品", "即食食品", "營養品", "嬰兒食品", "啤酒", "釀酒", "酒廠", "咖啡豆", "茶葉加工", "food and beverage"),
+    "農業": ("農業", "農產", "農產品", "畜牧", "養豬", "養雞", "家禽", "漁業", "水產養殖", "養殖", "林業", "茶葉", "花卉", "農企業", "休閒農業", "農場", "果園", "稻米", "蔬菜", "水果", "養牛", "乳牛", "蛋雞", "養蝦", "漁撈", "遠洋漁業", "種苗", "飼料", "農會", "agriculture"),
+    "餐飲業": ("餐飲", "餐廳", "連鎖餐飲", "外燴", "團膳", "咖啡", "咖啡廳", "速食", "餐館", "小吃", "火鍋", "烘焙坊", "餐飲連鎖", "中央廚房", "飲料店", "酒吧", "restaurant"),
+    "零售業": ("零售", "百貨", "百貨公司", "量販", "量販店", "超市", "超級市場", "便利商店", "超商", "購物中心", "通路", "藥妝", "連鎖零售", "零售通路", "實體零售", "電視購物", "直銷", "專賣店", "加盟店", "藥局", "家居用品", "五金百貨", "3c賣場", "retail"),
+    "批發業": ("批發", "貿易", "進出口貿易", "經銷", "代理商", "物料批發", "批發商", "貿易商", "代理經銷", "進口商", "出口商", "盤商", "中盤商"),
+    "觀光旅宿業": ("觀光", "旅館", "飯店", "酒店", "民宿", "旅宿", "旅遊", "旅行社", "休閒娛樂", "遊樂園", "主題樂園", "渡假村", "度假村", "旅館業", "觀光飯店", "溫泉", "露營區", "會展", "hotel"),
+    "物流業": ("物流", "倉儲", "倉儲物流", "冷鏈", "冷鏈物流", "宅配", "快遞", "貨運", "貨運代理", "報關", "物流中心", "倉庫", "配送", "最後一哩", "第三方物流", "3pl", "供應鏈管理", "貨櫃場", "logistics"),
+    "運輸業": ("運輸", "交通運輸", "陸運", "公路運輸", "客運", "公車", "卡車運輸", "鐵路運輸", "捷運", "高鐵", "貨車運輸", "車隊", "計程車", "遊覽車", "公路客運", "鐵路", "台鐵", "交通事業"),
+    "航運業": ("航運", "海運", "貨櫃航運", "散裝航運", "港埠", "港口", "船務", "貨櫃輪", "散裝船", "油輪", "郵輪", "航商", "船公司", "港務", "shipping"),
+    "航空業": ("航空", "航空運輸", "航空公司", "機場", "航空貨運", "航空客運", "空運", "機場服務", "地勤", "airline"),
+    # 醫療 / 生技
+    "生技醫藥業": ("生技", "生物科技", "製藥", "藥品", "西藥", "中藥", "學名藥", "新藥", "疫苗", "原料藥", "生醫", "醫藥", "藥廠", "製藥廠", "生物製劑", "細胞治療", "基因檢測", "cro", "cdmo", "api原料藥", "保健品", "pharma", "biotech"),
+    "醫療器材業": ("醫療器材", "醫材", "醫療設備", "醫療耗材", "體外診斷", "牙材", "醫療儀器", "手術器械", "隱形眼鏡", "助聽器", "輪椅", "醫療耗材製造", "medical device"),
+    "醫療服務業": ("醫療服務", "醫院", "診所", "醫療院所", "長照", "長期照顧", "護理之家", "健檢", "醫療機構", "醫學中心", "區域醫院", "地區醫院", "牙醫", "醫美", "安養中心", "照護機構", "hospital"),
+    # 金融 / 服務
+    "金融業": ("金融", "銀行", "金控", "金融控股", "證券", "券商", "投信", "資產管理", "期貨", "融資租賃", "票券", "信用卡", "金融科技", "fintech", "商業銀行", "民營銀行", "公股銀行", "信用合作社", "農會信用部", "投資銀行", "創投", "私募基金", "基金公司", "支付", "電子支付", "pe基金", "bank", "banking"),
+    "保險業": ("保險", "壽險", "產險", "人壽保險", "產物保險", "再保險", "保險經紀", "保險公司", "壽險公司", "產險公司", "保經", "保代", "insurance"),
+    "專業服務業": ("顧問", "管理顧問", "會計師事務所", "會計", "法律服務", "律師事務所", "工程顧問", "設計服務", "建築師事務所", "人力資源", "人力派遣", "廣告", "行銷", "公關", "市場研究", "顧問公司", "諮詢", "研發服務", "檢驗認證", "驗證機構", "測試實驗室", "翻譯", "徵才", "永續顧問", "esg顧問", "consulting"),
+    "媒體及娛樂業": ("媒體", "傳媒", "出版", "電視", "廣播", "影視", "電影", "遊戲", "電競", "數位內容", "文創", "音樂", "藝文", "報社", "雜誌", "電視台", "廣播電台", "影音串流", "串流平台", "網紅", "演唱會", "展演", "戲院", "電影院", "遊戲開發"),
+    "教育業": ("教育", "學校", "大學", "補習班", "教育訓練", "線上教育", "幼兒園", "中小學", "高中", "技職教育", "大專院校", "幼教", "才藝班", "語言學校", "職業訓練", "教育機構"),
+    "公共行政": ("政府機關", "公部門", "地方政府", "公營事業", "非營利組織", "基金會", "政府", "縣市政府", "公所", "公營機構", "國營事業", "財團法人", "社團法人", "ngo", "npo"),
+    "運動休閒業": ("運動用品", "運動器材", "健身", "健身房", "高爾夫", "運動休閒", "運動中心", "健身中心", "瑜珈", "游泳池", "球場", "運動賽事", "自行車休閒"),
+    "保全及清潔服務業": ("保全", "清潔服務", "環境清潔", "大樓管理", "保全公司", "物業保全", "清潔公司", "除蟲", "消毒"),
+    "租賃業": ("租賃", "設備租賃", "汽車租賃", "租車", "租賃公司", "機具租賃", "辦公設備租賃", "融資性租賃"),
+    # 其他製造
+    "精密儀器業": ("精密儀器", "量測儀器", "檢測儀器", "光學儀器", "儀器設備", "鐘錶", "眼鏡", "測量儀器", "分析儀器", "計量設備", "光學檢測", "半導體檢測設備", "量測設備"),
+    "印刷及包裝業": ("包裝", "印刷包裝", "軟包裝", "標籤", "容器", "玻璃容器", "金屬罐", "包裝容器", "寶特瓶", "鋁罐", "紙杯", "餐盒", "包裝設計", "商業印刷"),
+    "化妝品業": ("化妝品", "保養品", "美妝", "香水", "個人護理", "彩妝", "洗髮精", "沐浴乳", "香氛", "美容", "cosmetics"),
+    "玩具及文具業": ("玩具", "文具", "禮品", "樂器", "公仔", "桌遊", "辦公文具", "筆類", "樂器製造"),
+    "珠寶及飾品業": ("珠寶", "飾品", "金飾", "銀樓", "鑽石", "黃金", "k金", "手錶"),
+    "3C通路業": ("3c通路", "3c零售", "電子通路", "ic通路", "電子零件通路", "手機通路", "電腦通路", "電子產品通路"),
+}
+
+# 字根後面可接的字尾；兩個字的字根必須接字尾才算（避免「電子郵件」被當成電子業）
+SUFFIXES = ("業", "產業", "工業", "製造業", "業者", "廠", "廠商", "公司", "行業", "相關產業", "供應鏈", "集團")
+MIN_BARE_CHARS = 3
+# 技術 / 解決方案用語：常出現在減碳措施（導入 AI 能耗監控、LED 照明…），不代表公司所屬產業，
+# 只有接上字尾（AI 公司、LED 廠…）才算
+SOLUTION_TERMS = frozenset((
+    "ai", "人工智慧", "iot", "物聯網", "資料分析", "大數據", "雲端", "雲端服務", "雲端運算", "saas",
+    "資安", "資訊安全", "軟體", "系統整合", "數位服務", "網路服務", "數位轉型服務", "it服務",
+    "led", "led照明", "照明", "燈具", "pv", "太陽能板", "光電板", "太陽能模組", "逆變器",
+    "oem", "odm", "ems", "smt", "ic", "測試", "封裝", "5g",
+    "esco", "節能服務", "能源服務", "儲能", "儲能系統", "熱泵", "變頻",
+    "充電樁", "電動車充電", "智慧電表", "不斷電系統", "ups", "機器人", "工業機器人", "自動化設備",
+))
+CACHE_MAX_CHARS = 500         # 只快取短訊息；貼上附件的長文字每次重掃（單次掃描本來就是線性時間）
+
+# 找不到辭典產業時的備援：「我是XX業」之類的自述
+_CUES = ("我是", "我們是", "屬於", "從事", "經營", "身為", "我在")
+_FALLBACK = re.compile(
+    r'(?:我是|我們是|屬於|從事|經營|身為|我在)?\s*[「『]?'
+    r'([^\s「」『』，。、,.;；:：!?！？()（）]{2,10}(?:產業|工業|業|公司|廠商|製造))[」』]?'
+)
+_SPACES = re.compile(r'\s+')
+
+
+def _normalize_text(text):
+    """全形轉半形、英文轉小寫、臺→台"""
+    return unicodedata.normalize("NFKC", text).lower().replace("臺", "台")
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+def _patterns():
+    """(模式, 標準名稱, 是否明確指產業)；接上字尾的模式與標準名稱本身為明確"""
+    for canonical, roots in INDUSTRY_TAXONOMY.items():
+        for root in roots:
+            root = _normalize_text(root)
+            bare_ok = (len(root) >= MIN_BARE_CHARS or root.isascii()) and root not in SOLUTION_TERMS
+            if bare_ok:
+                yield root, canonical, root.endswith(SUFFIXES)
+            for suffix in SUFFIXES:
+                if not root.endswith(suffix):
+                    yield root + suffix, canonical, True
+        yield _normalize_text(canonical), canonical, True
+
+
+@lru_cache(maxsize=1)
+def _aliases():
+    """別名 -> 標準名稱，整段輸入就是產業名稱時（normalize_industry）使用，技術用語也算"""
+    aliases = {}
+    for canonical, roots in INDUSTRY_TAXONOMY.items():
+        for root in roots:
+            aliases.setdefault(_normalize_text(root), canonical)
+    return aliases
+
+
+class IndustryMatcher:
+    """Aho-Corasick 自動機；每個節點只記錄結尾在此的最長模式"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]      # (模式長度, 標準名稱, 是否以英數開頭, 是否明確指產業)
+        self.size = 0
+        for pattern, canonical, explicit in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                node = nxt
+            if self.output[node] is None:
+                self.size += 1
+                self.output[node] = (len(pattern), canonical, pattern[0].isascii(), explicit)
+
+        # BFS 建立失敗連結，並把較短的後綴模式往下繼承
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def find_all(self, text):
+        """回傳 [(起點, 終點, 標準名稱, 是否明確指產業), ...]；text 需先經 _normalize_text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node] is not None:
+                length, canonical, ascii_start, explicit = output[node]
+                start = i + 1 - length
+                # 英文縮寫（ic、ai…）前面不能緊接英數字，避免比對到單字中間
+                if ascii_start and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if ascii_start and text[i].isascii() and i + 1 < len(text) and _is_word_char(text[i + 1]):
+                    continue
+                matches.append((start, i + 1, canonical, explicit))
+        return matches
+
+
+@lru_cache(maxsize=1)
+def get_matcher():
+    """第一次用到才編譯自動機"""
+    return IndustryMatcher(_patterns())
+
+
+def _has_cue(text, start):
+    return text[:start].rstrip(" 「『").endswith(_CUES)
+
+
+def detect_industry(text):
+    """
+    從一段文字找出產業標準名稱，找不到回傳 None；短訊息的結果會快取。
+    優先順序：自述（我是…）的辭典產業 > 明確的產業名稱（接上業 / 公司…字尾）
+    > 其他別名；同一級取最前面最長的，都沒有時用備援規則。
+    """
+    if len(text) <= CACHE_MAX_CHARS:
+        return _detect_cached(text)
+    return _detect(text)
+
+
+@lru_cache(maxsize=2048)
+def _detect_cached(text):
+    return _detect(text)
+
+
+def _detect(text):
+    normalized = _normalize_text(text)
+    matches = get_matcher().find_all(normalized)
+    if matches:
+        return min(matches, key=lambda m: (not _has_cue(normalized, m[0]), not m[3], m[0], m[0] - m[1]))[2]
+
+    match = _FALLBACK.search(unicodedata.normalize("NFKC", text))
+    if match:
+        return match.group(1)
+    return None
+
+
+def normalize_industry(name):
+    """
+    把使用者輸入的產業名稱轉成標準名稱（例如「鋁門窗廠商」→「鋁建材業」），
+    可直接當作快取 / 統計的 key；不在辭典中的名稱只做空白與全半形整理。
+    """
+    cleaned = _SPACES.sub("", unicodedata.normalize("NFKC", name or ""))
+    if not cleaned:
+        return DEFAULT_INDUSTRY
+    normalized = _normalize_text(cleaned)
+    if normalized in _aliases():
+        return _aliases()[normalized]
+    matches = get_matcher().find_all(normalized)
+    if matches:
+        return max(matches, key=lambda m: (m[1] - m[0], -m[0]))[2]
+    return cleaned
+
+
+def alias_count():
+    """辭典中手寫的標準名稱與別名數（未加字尾）"""
+    return sum(len(roots) + 1 for roots in INDUSTRY_TAXONOMY.values())
+
+
+def pattern_count():
+    """辭典展開後的模式數（別名自動加上 SUFFIXES 字尾，數量遠大於 alias_count）"""
+    return get_matcher().size
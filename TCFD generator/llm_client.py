@@ -0,0 +1,67 @@
+"""
+Anthropic client 管理 - 全程序共用一個 HTTP 連線池，client 依 API Key 快取
+各頁面不再每次點擊就建立新 client，同一把 key 的 session 可沿用已建立的連線
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import anthropic
+import httpx
+
+MAX_CLIENTS = 32              # 最多快取幾把 API Key 的 client
+MAX_RETRIES = 0               # 重試與退避一律交給 rate_limiter，SDK 不各自重試 429
+
+# 連線池：所有 client 共用
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 120.0      # 閒置連線保留秒數（SDK 預設 5 秒，對話間隔常超過）
+
+# 逾時：連線要快失敗；讀取要容得下長回答的串流間隔
+TIMEOUT = httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=10.0)
+# 非串流的 messages.create 要等整個回答生成完才有回應，讀取逾時要放寬（各呼叫以 timeout= 傳入）
+CREATE_TIMEOUT = httpx.Timeout(connect=5.0, read=600.0, write=30.0, pool=10.0)
+
+_http_client = None
+_clients = OrderedDict()      # key 雜湊 -> client（LRU）
+_lock = threading.Lock()
+
+
+def _get_http_client():
+    global _http_client
+    if _http_client is None:
+        _http_client = anthropic.DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=TIMEOUT,
+        )
+    return _http_client
+
+
+def key_id(api_key):
+    """API Key 的雜湊，只拿來當 key，不保存明文"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def get_client(api_key):
+    """取得該 API Key 的 client；第一次用到才建立"""
+    client_key = key_id(api_key)
+    with _lock:
+        client = _clients.get(client_key)
+        if client is not None:
+            _clients.move_to_end(client_key)
+            return client
+        client = anthropic.Anthropic(
+            api_key=api_key,
+            http_client=_get_http_client(),
+            max_retries=MAX_RETRIES,
+        )
+        _clients[client_key] = client
+        # 淘汰的 client 不呼叫 close()，否則會關掉共用的連線池
+        while len(_clients) > MAX_CLIENTS:
+            _clients.popitem(last=False)
+        return client
+
@@ -0,0 +1,199 @@
+"""
+LLM 呼叫紀錄 - 每次呼叫的模型、tokens、延遲、重試與解析結果寫入本機 SQLite
+價格表集中在這裡，各頁面的成本都由此計算
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import industry_lexicon
+
+DB_PATH = Path(__file__).parent / "cache" / "telemetry.sqlite3"
+DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+# 美元 / 百萬 tokens：輸入、輸出、寫入快取、讀取快取
+PRICING = {
+    "opus": {"input": 15.0, "output": 75.0, "cache_write": 18.75, "cache_read": 1.5},
+    "sonnet": {"input": 3.0, "output": 15.0, "cache_write": 3.75, "cache_read": 0.3},
+    "haiku": {"input": 0.8, "output": 4.0, "cache_write": 1.0, "cache_read": 0.08},
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    page TEXT NOT NULL,
+    model TEXT NOT NULL,
+    industry TEXT,
+    input_tokens INTEGER DEFAULT 0,
+    output_tokens INTEGER DEFAULT 0,
+    cache_read_tokens INTEGER DEFAULT 0,
+    cache_write_tokens INTEGER DEFAULT 0,
+    latency_s REAL,
+    ttft_s REAL,
+    retries INTEGER DEFAULT 0,
+    parse_ok INTEGER,
+    error TEXT,
+    cost_usd REAL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls (ts);
+"""
+
+_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialized = True
+    return conn
+
+
+def price_for(model):
+    """依模型名稱找價格；未知模型回傳 None"""
+    name = (model or "").lower()
+    for family, price in PRICING.items():
+        if family in name:
+            return price
+    return None
+
+
+def usage_tokens(usage):
+    """從 API 回應的 usage 取出各類 tokens"""
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+def calculate_cost(model, input_tokens=0, output_tokens=0, cache_read_tokens=0, cache_write_tokens=0):
+    """美元成本"""
+    price = price_for(model)
+    if price is None:
+        return 0.0
+    return (input_tokens * price["input"] + output_tokens * price["output"]
+            + cache_read_tokens * price["cache_read"] + cache_write_tokens * price["cache_write"]) / 1_000_000
+
+
+def record(page, model, industry=None, tokens=None, latency=None, ttft=None,
+           retries=0, parse_ok=None, error=None):
+    """寫入一筆呼叫紀錄，回傳 (紀錄 id, 成本)；紀錄失敗不影響頁面"""
+    tokens = tokens or {}
+    cost = calculate_cost(model, **tokens)
+    row = (
+        time.time(), page, model,
+        industry_lexicon.normalize_industry(industry) if industry else None,
+        tokens.get("input_tokens", 0), tokens.get("output_tokens", 0),
+        tokens.get("cache_read_tokens", 0), tokens.get("cache_write_tokens", 0),
+        latency, ttft, retries,
+        None if parse_ok is None else int(bool(parse_ok)),
+        error, cost,
+    )
+    try:
+        with _lock:
+            conn = _connect()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO llm_calls (ts, page, model, industry, input_tokens, output_tokens,"
+                    " cache_read_tokens, cache_write_tokens, latency_s, ttft_s, retries, parse_ok, error, cost_usd)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            conn.close()
+        return cursor.lastrowid, cost
+    except sqlite3.Error:
+        return None, cost
+
+
+def mark_parsed(call_id, ok):
+    """呼叫結束後才知道解析結果時補記"""
+    if call_id is None:
+        return
+    try:
+        with _lock:
+            conn = _connect()
+            with conn:
+                conn.execute("UPDATE llm_calls SET parse_ok = ? WHERE id = ?", (int(bool(ok)), call_id))
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class Call:
+    """track() 內可填入的呼叫資訊"""
+
+    def __init__(self, page, model, industry):
+        self.page = page
+        self.model = model
+        self.industry = industry
+        self.tokens = None
+        self.ttft = None
+        self.retries = 0
+        self.parse_ok = None
+        self.latency = None
+        self.call_id = None
+        self.cost = 0.0
+        self.start = time.perf_counter()
+
+    def set_response(self, response):
+        self.tokens = usage_tokens(response.usage)
+
+    def first_token(self):
+        """串流時收到第一段文字呼叫，記下首字延遲"""
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.start
+
+    def mark_parsed(self, ok):
+        """結束後補記解析結果"""
+        self.parse_ok = ok
+        mark_parsed(self.call_id, ok)
+
+
+@contextmanager
+def track(page, model, industry=None, retries=0):
+    """
+    量測一次 LLM 呼叫並寫入紀錄；例外會記為失敗後照常拋出。
+
+        with llm_telemetry.track("簡易TCFD生成", model, industry) as call:
+            response = client.messages.create(...)
+            call.set_response(response)
+    """
+    call = Call(page, model, industry)
+    call.retries = retries
+    error = None
+    try:
+        yield call
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        call.latency = time.perf_counter() - call.start
+        call.call_id, call.cost = record(
+            page, model, industry=industry, tokens=call.tokens, latency=call.latency,
+            ttft=call.ttft, retries=call.retries, parse_ok=call.parse_ok, error=error,
+        )
+
+
+def load_calls(since=None):
+    """讀出紀錄（pandas DataFrame）；since 為 unix 時間"""
+    import pandas as pd
+
+    with _lock:
+        conn = _connect()
+        try:
+            query = "SELECT * FROM llm_calls"
+            params = ()
+            if since is not None:
+                query += " WHERE ts >= ?"
+                params = (since,)
+            df = pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+    df["time"] = pd.to_datetime(df["ts"], unit="s", utc=True).dt.tz_convert("Asia/Taipei")
+    return df
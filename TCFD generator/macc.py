@@ -0,0 +1,170 @@
+"""
+邊際減碳成本曲線（MACC）- 減碳措施的均化減碳成本一次以陣列算完，依成本排序後累加減碳量
+措施欄位：capex（百萬元）、opex_delta（每年營運成本變化，百萬元，負值為節省）、
+lifetime（年）、abatement（每年減碳 tCO2e）；measure、category 為選填
+category 對應資源效率表的兩列：能源效率提升、資源循環利用
+"""
+import numpy as np
+import pandas as pd
+
+from portfolio_optimizer import annuity_factor
+
+REQUIRED_COLUMNS = ["capex", "opex_delta", "lifetime", "abatement"]
+NUMERIC_COLUMNS = REQUIRED_COLUMNS
+CATEGORIES = ["能源效率提升", "資源循環利用"]
+DISCOUNT_RATE = 0.05
+UNIT = 1_000_000              # 百萬元 -> 元
+
+
+def prepare(df):
+    """檢查欄位並補上選填欄位；缺少必要欄位時拋出 ValueError"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少欄位：{', '.join(missing)}")
+    df = df.copy()
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
+    df["lifetime"] = df["lifetime"].clip(lower=1)
+    if "measure" not in df.columns:
+        df["measure"] = "措施 " + pd.Series(np.arange(1, len(df) + 1), index=df.index).astype(str)
+    if "category" not in df.columns:
+        df["category"] = CATEGORIES[0]
+    df["category"] = df["category"].fillna(CATEGORIES[0]).astype(str)
+    return df.reset_index(drop=True)
+
+
+def levelized_cost(capex, opex_delta, lifetime, abatement, rate=DISCOUNT_RATE):
+    """
+    均化減碳成本（元/噸）= (capex 年金化 + 每年營運成本變化) / 每年減碳量。
+    減碳量 <= 0 的措施回傳 inf（排在曲線最後、不畫）
+    """
+    abatement = np.asarray(abatement, dtype=float)
+    annual = np.asarray(capex, dtype=float) / annuity_factor(rate, lifetime) + np.asarray(opex_delta, dtype=float)
+    return np.divide(annual * UNIT, abatement, out=np.full(abatement.shape, np.inf), where=abatement > 0)
+
+
+class MACCurve:
+    """
+    依成本排序的 MACC。建立時整批計算；update() 修改單一措施時只重算該措施的成本，
+    在已排序陣列中搬移到新位置，累計減碳量也只從變動位置往後重算
+    """
+
+    def __init__(self, measures, rate=DISCOUNT_RATE):
+        df = prepare(measures)
+        self.rate = rate
+        self.measure = df["measure"].astype(str).to_numpy()
+        self.category = df["category"].to_numpy()
+        self.values = {col: df[col].to_numpy(dtype=float, copy=True) for col in NUMERIC_COLUMNS}
+        self.cost = levelized_cost(**self.values, rate=rate)
+        # order[k] 為成本第 k 低的措施；sorted_cost 與 order 對齊，插入位置用二分搜尋
+        self.order = np.argsort(self.cost, kind="stable")
+        self.sorted_cost = self.cost[self.order]
+        self.cumulative = np.cumsum(self._width(self.order))
+
+    def __len__(self):
+        return len(self.cost)
+
+    def _width(self, idx):
+        """曲線上的寬度：成本無法計算的措施不佔寬度"""
+        return np.where(np.isfinite(self.cost[idx]), self.values["abatement"][idx], 0.0)
+
+    def update(self, i, **fields):
+        """修改第 i 項措施的欄位（capex、opex_delta、lifetime、abatement），回傳是否有變動"""
+        changed = False
+        for col, value in fields.items():
+            if col not in self.values:
+                raise KeyError(col)
+            value = max(float(value), 1.0) if col == "lifetime" else float(value)
+            if self.values[col][i] != value:
+                self.values[col][i] = value
+                changed = True
+        if not changed:
+            return False
+
+        cost = levelized_cost(*(self.values[col][i] for col in NUMERIC_COLUMNS), rate=self.rate)
+        self.cost[i] = cost
+        old_pos = int(np.flatnonzero(self.order == i)[0])
+        order = np.delete(self.order, old_pos)
+        sorted_cost = np.delete(self.sorted_cost, old_pos)
+        new_pos = int(np.searchsorted(sorted_cost, cost, side="right"))
+        self.order = np.insert(order, new_pos, i)
+        self.sorted_cost = np.insert(sorted_cost, new_pos, cost)
+
+        start = min(old_pos, new_pos)
+        before = self.cumulative[start - 1] if start else 0.0
+        self.cumulative[start:] = before + np.cumsum(self._width(self.order[start:]))
+        return True
+
+    def frame(self):
+        """排序後的曲線資料（只含成本可計算的措施）：start、cumulative 為該措施在曲線上的起訖"""
+        width = self._width(self.order)
+        df = pd.DataFrame({
+            "measure": self.measure[self.order],
+            "category": self.category[self.order],
+            "cost": self.sorted_cost,
+            "abatement": width,
+            "start": self.cumulative - width,
+            "cumulative": self.cumulative,
+        })
+        return df[np.isfinite(df["cost"])].reset_index(drop=True)
+
+    def abatement_below(self, price):
+        """成本 <= price（元/噸）的措施合計減碳量"""
+        k = np.searchsorted(self.sorted_cost, price, side="right")
+        return float(self.cumulative[k - 1]) if k else 0.0
+
+
+def financial_notes(curve, carbon_price=300, top_n=3):
+    """資源效率表各列的試算摘要：{列名: [摘要, ...]}，每列列出成本最低的 top_n 項措施"""
+    df = curve.frame()
+    notes = {}
+    for category in CATEGORIES:
+        subset = df[df["category"] == category]
+        if subset.empty:
+            continue
+        negative = subset.loc[subset["cost"] < 0, "abatement"].sum()
+        below = subset.loc[subset["cost"] <= carbon_price, "abatement"].sum()
+        points = [f"減碳成本曲線：{len(subset):,} 項措施中，淨節省（負成本）減碳 {negative:,.0f} 噸/年，"
+                  f"每噸成本不高於碳價 {carbon_price:,} 元者合計 {below:,.0f} 噸/年"]
+        points += [f"{row.measure}：{row.cost:,.0f} 元/噸，減碳 {row.abatement:,.0f} 噸/年"
+                   for row in subset.head(top_n).itertuples()]
+        notes[category] = points
+    return notes
+
+
+def sample_measures(n, seed=0):
+    """產生 n 筆模擬減碳措施"""
+    rng = np.random.default_rng(seed)
+    energy = np.array(["LED照明", "變頻馬達", "高效冰水主機", "空壓系統改善", "熱回收", "太陽能板", "智能樓宇管理"])
+    circular = np.array(["廢料回收再製", "製程用水回收", "包材減量", "再生原料替代", "廢熱再利用"])
+    is_energy = rng.random(n) < 0.6
+    names = np.where(is_energy, energy[rng.integers(0, len(energy), n)], circular[rng.integers(0, len(circular), n)])
+    abatement = rng.lognormal(5.5, 1.0, n).round(0)
+    return pd.DataFrame({
+        "measure": np.char.add(np.char.add(names.astype(str), "-"), np.arange(1, n + 1).astype(str)),
+        "category": np.where(is_energy, CATEGORIES[0], CATEGORIES[1]),
+        "capex": (abatement * rng.lognormal(-4.5, 0.8, n)).round(2),
+        # 營運成本變化：多數措施省錢（負值），少數增加
+        "opex_delta": (abatement * rng.normal(-0.0015, 0.002, n)).round(3),
+        "lifetime": rng.choice([5, 8, 10, 15, 20], n),
+        "abatement": abatement,
+    })
+
+
+if __name__ == "__main__":
+    import time
+
+    measures = sample_measures(5000)
+    start = time.perf_counter()
+    curve = MACCurve(measures)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for i in range(100):
+        curve.update(i, capex=curve.values["capex"][i] * 1.5)
+    update_ms = (time.perf_counter() - start) * 1000 / 100
+    print(f"{len(curve):,} 項措施：建立 {build_ms:.1f} ms，修改一項 {update_ms:.3f} ms")
+    # 與整批重算比對
+    rebuilt = MACCurve(pd.DataFrame({"measure": curve.measure, "category": curve.category, **curve.values}))
+    assert np.allclose(np.sort(rebuilt.cost), curve.sorted_cost)
+    assert np.allclose(rebuilt.cumulative, curve.cumulative)
+    print(f"負成本減碳：{curve.abatement_below(0):,.0f} 噸/年")
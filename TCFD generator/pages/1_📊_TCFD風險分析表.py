@@ -5,8 +5,11 @@ TCFD 氣候風險分析表 - 互動式視覺化頁面
 
 import streamlit as st
 import pandas as pd
+import plotly.graph_objects as go
 import io
 import os
+import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from pptx import Presentation
@@ -15,6 +18,15 @@ from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
 
+sys.path.append(str(Path(__file__).parent.parent))
+from html_table import get_template, render_paged_table
+from perf import timed_section
+import sensitivity
+from tcfd_risk_data import (
+    HVAC_RISK_DATA, RISK_CATEGORIES, RISK_DATA, TECH_EFFICIENCY,
+    get_export_df, get_solution_df, get_solution_export_df,
+)
+
 # 設定 output 資料夾路徑
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -260,6 +272,23 @@ def create_tcfd_pptx():
     output.seek(0)
     return output
 
+
+@st.cache_data
+def build_pptx_bytes(date_str):
+    """簡報內容只隨日期（封面）改變，同一天只生成一次"""
+    return create_tcfd_pptx().getvalue()
+
+
+@st.cache_data
+def build_excel_bytes():
+    """Excel 報告（風險分析 + 節能方案）"""
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+        get_export_df().to_excel(writer, sheet_name='風險分析', index=False)
+        get_solution_export_df().to_excel(writer, sheet_name='節能方案', index=False)
+    return excel_buffer.getvalue()
+
+
 st.set_page_config(
     page_title="TCFD 風險分析表",
     page_icon="📊",
@@ -364,175 +393,394 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ============ 風險分析表 ============
-st.markdown("### 🌡️ 溫度上升對企業營運影響分析")
-
-# ===== 大樓空調廠商 TCFD 風險數據 =====
-hvac_risk_data = [
-    {
-        "description": "極端高溫頻率增加",
-        "description_detail": "夏季溫度持續上升，熱浪天數增加，導致冷卻需求大幅提升",
-        "impact": "設備負荷過重",
-        "impact_detail": "空調系統長時間高負荷運轉，設備壽命縮短，維修成本增加",
-        "actions": "開發高效能產品",
-        "actions_detail": "投資研發更高 EER 值的空調系統，提升極端氣候適應能力"
-    },
-    {
-        "description": "碳稅及環保法規",
-        "description_detail": "政府實施碳稅制度，對高耗能設備課徵額外稅費",
-        "impact": "營運成本上升",
-        "impact_detail": "產品競爭力下降，客戶轉向選擇節能認證產品",
-        "actions": "取得綠色認證",
-        "actions_detail": "申請 ENERGY STAR、節能標章等認證，提升市場競爭力"
-    },
-    {
-        "description": "能源價格波動",
-        "description_detail": "電力成本不穩定，再生能源需求增加，影響營運策略",
-        "impact": "客戶需求轉變",
-        "impact_detail": "大樓業主要求智能化節能方案，傳統產品需求下降",
-        "actions": "發展智慧空調系統",
-        "actions_detail": "整合 IoT 技術，提供 AI 控制及遠端監控功能"
-    }
-]
-
-# 舊版風險數據 (保留兼容)
-risk_categories = ["大樓空調廠商 (新)", "設備營運風險", "員工健康風險", "能源供應風險"]
-selected_category = st.selectbox("選擇風險類別", risk_categories)
-
-# 風險數據
-risk_data = {
-    "設備營運風險": [
-        {
-            "描述": "極端高溫導致設備過熱當機",
-            "影響": "🔴 停機損失每小時50-200萬<br>設備壽命減少15-25%",
-            "措施": "部署 <span class='tech-highlight'>AI溫控系統</span><br>預防性維護，<span class='benefit'>降低30%故障率</span>"
-        },
-        {
-            "描述": "冷卻系統能耗激增",
-            "影響": "🟠 能源成本增加40-60%<br>碳排放量上升35%",
-            "措施": "智能冷卻優化系統<br><span class='benefit'>節能25-40%</span>，ROI 2.5年"
-        },
-        {
-            "描述": "戶外設施材料老化加速",
-            "影響": "維護成本增加2-3倍<br>更換週期縮短50%",
-            "措施": "採用耐候新材料<br>建立數位化巡檢系統"
-        }
-    ],
-    "員工健康風險": [
-        {
-            "描述": "高溫作業環境健康風險",
-            "影響": "🔴 中暑事故增加3倍<br>勞動生產力下降20%",
-            "措施": "智能穿戴監測系統<br>動態調整作業時間"
-        },
-        {
-            "描述": "室內空氣品質惡化",
-            "影響": "員工請病假增加15%<br>工作效率降低12%",
-            "措施": "<span class='tech-highlight'>AI空氣品質管理</span><br>即時調節通風系統"
-        },
-        {
-            "描述": "通勤交通受極端天氣影響",
-            "影響": "遲到缺勤率上升25%<br>營運連續性風險",
-            "措施": "彈性工作制度<br>遠端辦公基礎設施"
-        }
-    ],
-    "能源供應風險": [
-        {
-            "描述": "尖峰用電需求暴增",
-            "影響": "🔴 電費支出增加50-80%<br>限電風險提高",
-            "措施": "部署<span class='tech-highlight'>智能電網系統</span><br><span class='benefit'>削峰填谷30%</span>"
-        },
-        {
-            "描述": "再生能源供應不穩定",
-            "影響": "供電中斷風險增加<br>備用電源成本上升",
-            "措施": "混合儲能系統<br>微電網建置，自給率達60%"
-        },
-        {
-            "描述": "傳統能源價格波動",
-            "影響": "🟠 能源成本波動±30%<br>預算規劃困難",
-            "措施": "長期綠電採購合約<br>能源避險金融工具"
-        }
-    ]
-}
-
 # 顯示表格
-def display_risk_table(category_data, category_name):
-    st.markdown(f"#### {category_name}")
-    
-    table_html = """
-    <table class="tcfd-table">
-        <tr>
-            <th class="header-sub" style="width:30%">風險描述</th>
-            <th class="header-sub" style="width:35%">影響評估</th>
-            <th class="header-sub" style="width:35%">適應措施</th>
-        </tr>
-    """
-    
-    for item in category_data:
-        table_html += f"""
-        <tr>
-            <td>{item['描述']}</td>
-            <td>{item['影響']}</td>
-            <td>{item['措施']}</td>
-        </tr>
-        """
-    
-    table_html += "</table>"
-    st.markdown(table_html, unsafe_allow_html=True)
-
-if selected_category == "大樓空調廠商 (新)":
-    # 顯示新的藍灰配色 HVAC TCFD 表格
-    st.markdown("#### 🏢 大樓空調廠商 TCFD 氣候風險表")
-    
-    hvac_table_html = """
-    <table style="width: 100%; border-collapse: collapse; font-family: Arial, sans-serif; margin: 20px 0;">
-        <thead>
-            <tr>
-                <th style="background: linear-gradient(135deg, #4a90a4 50%, #7a7a7a 50%); color: white; padding: 15px; text-align: center; font-weight: bold; border: 1px solid #ddd; font-size: 16px;">
-                    Description
-                </th>
-                <th style="background: linear-gradient(135deg, #4a90a4 50%, #7a7a7a 50%); color: white; padding: 15px; text-align: center; font-weight: bold; border: 1px solid #ddd; font-size: 16px;">
-                    Impact
-                </th>
-                <th style="background: linear-gradient(135deg, #4a90a4 50%, #7a7a7a 50%); color: white; padding: 15px; text-align: center; font-weight: bold; border: 1px solid #ddd; font-size: 16px;">
-                    Actions
-                </th>
-            </tr>
-        </thead>
-        <tbody>
-    """
-    
-    for i, item in enumerate(hvac_risk_data):
-        bg_color = "#f9f9f9" if i % 2 == 1 else "white"
-        hvac_table_html += f"""
-            <tr style="background-color: {bg_color};">
-                <td style="padding: 12px; border: 1px solid #ddd; vertical-align: top;">
-                    <strong>{item['description']}</strong><br>
-                    {item['description_detail']}
-                </td>
-                <td style="padding: 12px; border: 1px solid #ddd; vertical-align: top;">
-                    <strong>{item['impact']}</strong><br>
-                    {item['impact_detail']}
-                </td>
-                <td style="padding: 12px; border: 1px solid #ddd; vertical-align: top;">
-                    <strong>{item['actions']}</strong><br>
-                    {item['actions_detail']}
-                </td>
-            </tr>
-        """
-    
-    hvac_table_html += """
-        </tbody>
-    </table>
+RISK_TABLE = get_template(
+    headers=("風險描述", "影響評估", "適應措施"),
+    cells=("{描述}", "{影響}", "{措施}"),
+    table_attrs='class="tcfd-table"',
+    th_attrs=('class="header-sub" style="width:30%"', 'class="header-sub" style="width:35%"', 'class="header-sub" style="width:35%"'),
+)
+
+HVAC_TH_STYLE = 'style="background: linear-gradient(135deg, #4a90a4 50%, #7a7a7a 50%); color: white; padding: 15px; text-align: center; font-weight: bold; border: 1px solid #ddd; font-size: 16px;"'
+HVAC_TD_STYLE = 'style="padding: 12px; border: 1px solid #ddd; vertical-align: top;"'
+
+HVAC_TABLE = get_template(
+    headers=("Description", "Impact", "Actions"),
+    cells=(
+        "<strong>{description}</strong><br>{description_detail}",
+        "<strong>{impact}</strong><br>{impact_detail}",
+        "<strong>{actions}</strong><br>{actions_detail}",
+    ),
+    table_attrs='style="width: 100%; border-collapse: collapse; font-family: Arial, sans-serif; margin: 20px 0;"',
+    th_attrs=HVAC_TH_STYLE,
+    td_attrs=HVAC_TD_STYLE,
+    row_styles=("background-color: white;", "background-color: #f9f9f9;"),
+    footer="""
     <div style="margin-top: 10px; font-size: 12px; color: #666;">
         <strong>備註：</strong>此表格依據 TCFD 框架設計，協助大樓空調廠商識別氣候相關風險並制定對應策略。建議定期檢視更新內容，確保與最新氣候趨勢及法規要求同步。
     </div>
+    """,
+)
+
+
+def display_risk_table(category_data, category_name):
+    st.markdown(f"#### {category_name}")
+    render_paged_table(RISK_TABLE, category_data, key=f"risk_{category_name}")
+
+
+@st.fragment
+def risk_table_section():
+    """風險類別切換只重跑此區塊"""
+    with timed_section("風險分析表"):
+        st.markdown("### 🌡️ 溫度上升對企業營運影響分析")
+        selected_category = st.selectbox("選擇風險類別", RISK_CATEGORIES)
+        
+        if selected_category == "大樓空調廠商 (新)":
+            # 顯示新的藍灰配色 HVAC TCFD 表格
+            st.markdown("#### 🏢 大樓空調廠商 TCFD 氣候風險表")
+            render_paged_table(HVAC_TABLE, HVAC_RISK_DATA, key="hvac")
+        elif selected_category in RISK_DATA:
+            display_risk_table(RISK_DATA[selected_category], selected_category)
+
+
+@st.fragment
+def calculator_section():
+    """節能效益計算器：輸入變動只重跑計算器"""
+    with timed_section("節能效益計算器"):
+        st.markdown("### 🧮 節能效益計算器")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            current_energy_cost = st.number_input(
+                "目前年度能源成本 (萬元)",
+                min_value=0,
+                max_value=100000,
+                value=1000,
+                step=100
+            )
+        
+        with col2:
+            selected_tech = st.selectbox(
+                "選擇導入技術",
+                list(TECH_EFFICIENCY)
+            )
+        
+        with col3:
+            carbon_price = st.number_input(
+                "碳價格 (元/噸)",
+                min_value=0,
+                max_value=5000,
+                value=500,
+                step=50
+            )
+        
+        with col4:
+            emission_factor = st.number_input(
+                "排放係數 (噸/萬元電費)",
+                min_value=0.0,
+                max_value=5.0,
+                value=sensitivity.DEFAULT_EMISSION_FACTOR,
+                step=0.05
+            )
+        
+        # 計算效益
+        efficiency = TECH_EFFICIENCY[selected_tech]
+        
+        energy_saving, carbon_saving, total_benefit = sensitivity.benefit(
+            current_energy_cost, efficiency, emission_factor, carbon_price
+        )
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric(
+                label="💰 年度節省能源成本",
+                value=f"{energy_saving:.0f} 萬元",
+                delta=f"-{efficiency*100:.0f}%"
+            )
+        
+        with col2:
+            st.metric(
+                label="🌱 碳權價值估算",
+                value=f"{carbon_saving:.1f} 萬元",
+                delta="碳中和效益"
+            )
+        
+        with col3:
+            st.metric(
+                label="📈 總效益",
+                value=f"{total_benefit:.0f} 萬元/年",
+                delta="年化收益"
+            )
+        
+        base = {
+            "energy_cost": current_energy_cost,
+            "efficiency": efficiency,
+            "emission_factor": emission_factor,
+            "carbon_price": carbon_price,
+        }
+        with st.expander("📉 敏感度分析（龍捲風圖 / 熱力圖）"):
+            sensitivity_charts(base, total_benefit)
+
+
+@st.cache_data(max_entries=8)
+def sensitivity_cube(base, spread, names, steps):
+    """三個參數的總效益網格（依 base、變動幅度與軸快取），回傳 (網格, 各軸數值, 計算毫秒)"""
+    axes = {name: sensitivity.value_range(name, base[name], spread, steps) for name in names}
+    start = time.perf_counter()
+    cube = sensitivity.grid(base, axes)
+    return cube, axes, (time.perf_counter() - start) * 1000
+
+
+@st.fragment
+def sensitivity_charts(base, total_benefit):
     """
-    
-    st.markdown(hvac_table_html, unsafe_allow_html=True)
-else:
-    for cat_name, cat_data in risk_data.items():
-        if selected_category == cat_name:
-            display_risk_table(cat_data, cat_name)
-            break
+    各參數上下變動對總效益的影響；操作只重跑此區塊。
+    熱力圖的 100 x 100 x 100 網格依輸入快取，切換切片不需重算
+    """
+    labels = sensitivity.LABELS
+    spread = st.slider("參數變動幅度 (±%)", 5, 80, 20, 5) / 100
+    
+    # 龍捲風圖：每個參數單獨調低 / 調高，其餘維持目前輸入
+    result = sensitivity.tornado(base, spread)
+    names = [labels[name] for name in result["parameter"]]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=names, x=result["low_total"] - total_benefit, base=total_benefit, orientation='h',
+        name=f'調低 {spread:.0%}', marker_color='#e74c3c',
+        hovertemplate="%{y}<br>總效益 %{x:,.0f} 萬元<extra></extra>"
+    ))
+    fig.add_trace(go.Bar(
+        y=names, x=result["high_total"] - total_benefit, base=total_benefit, orientation='h',
+        name=f'調高 {spread:.0%}', marker_color='#2ecc71',
+        hovertemplate="%{y}<br>總效益 %{x:,.0f} 萬元<extra></extra>"
+    ))
+    fig.add_vline(x=total_benefit, line_dash="dash", line_color="#7f8c8d")
+    fig.update_layout(barmode='overlay', height=320, title='龍捲風圖：總效益 (萬元/年)',
+                      xaxis_title='總效益 (萬元/年)', margin=dict(l=10, r=10, t=40, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # 熱力圖：兩個參數為軸，第三個參數用滑桿切換切片
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        x_name = st.selectbox("X 軸", sensitivity.PARAMETERS, index=0, format_func=labels.get)
+    with col2:
+        y_options = [name for name in sensitivity.PARAMETERS if name != x_name]
+        y_name = st.selectbox("Y 軸", y_options, index=len(y_options) - 1, format_func=labels.get)
+    with col3:
+        z_options = [name for name in sensitivity.PARAMETERS if name not in (x_name, y_name)]
+        z_name = st.selectbox("切片參數", z_options, format_func=labels.get)
+    
+    steps = 100
+    cube, axes, grid_ms = sensitivity_cube(base, spread, (y_name, x_name, z_name), steps)
+    
+    z_values = axes[z_name]
+    z_index = st.select_slider(labels[z_name], options=range(steps), value=steps // 2,
+                               format_func=lambda i: f"{z_values[i]:,.3g}")
+    
+    fig = go.Figure(go.Heatmap(
+        x=axes[x_name], y=axes[y_name], z=cube[:, :, z_index], colorscale='YlGn',
+        colorbar=dict(title='萬元/年'),
+        hovertemplate=f"{labels[x_name]} %{{x:,.3g}}<br>{labels[y_name]} %{{y:,.3g}}"
+                      "<br>總效益 %{z:,.0f} 萬元<extra></extra>"
+    ))
+    fig.add_trace(go.Scatter(x=[base[x_name]], y=[base[y_name]], mode='markers', name='目前輸入',
+                             marker=dict(color='#e74c3c', size=10, symbol='x')))
+    fig.update_layout(height=420, xaxis_title=labels[x_name], yaxis_title=labels[y_name],
+                      margin=dict(l=10, r=10, t=10, b=10), showlegend=False)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"⚡ {steps}×{steps}×{steps} 網格（{cube.size:,} 組參數）計算 {grid_ms:.1f} ms")
+
+
+def save_html_copy(timestamp):
+    """複製 HTML 版本到 output，來源不存在時回傳 None"""
+    try:
+        with open("TCFD/TCFD氣候風險表.py", "r", encoding="utf-8") as f:
+            html_content = f.read()
+    except OSError:
+        return None
+    html_path = OUTPUT_DIR / f"TCFD_風險表_{timestamp}.html"
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html_content)
+    return html_path
+
+
+@st.fragment
+def export_section():
+    """輸出、下載與 output 資料夾：按鈕只重跑此區塊"""
+    with timed_section("輸出報告"):
+        export_df = get_export_df()
+        solution_export_df = get_solution_export_df()
+        today = datetime.now().strftime("%Y%m%d")
+        
+        # ===== 一鍵生成所有報告 =====
+        st.markdown("#### 🚀 一鍵生成所有報告")
+        
+        col1, col2 = st.columns([1, 2])
+        
+        with col1:
+            generate_all = st.button("⚡ 生成所有報告到 output 資料夾", use_container_width=True, type="primary")
+        
+        with col2:
+            if generate_all:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                saved_files = []
+                
+                with st.spinner("正在生成報告..."):
+                    # 1. 儲存 PPTX
+                    pptx_path = OUTPUT_DIR / f"TCFD_報告_{timestamp}.pptx"
+                    with open(pptx_path, "wb") as f:
+                        f.write(build_pptx_bytes(today))
+                    saved_files.append(f"✅ {pptx_path.name}")
+                    
+                    # 2. 儲存 CSV - 風險數據
+                    csv_path = OUTPUT_DIR / f"TCFD_風險數據_{timestamp}.csv"
+                    export_df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+                    saved_files.append(f"✅ {csv_path.name}")
+                    
+                    # 3. 儲存 CSV - 節能方案
+                    solution_csv_path = OUTPUT_DIR / f"TCFD_節能方案_{timestamp}.csv"
+                    solution_export_df.to_csv(solution_csv_path, index=False, encoding="utf-8-sig")
+                    saved_files.append(f"✅ {solution_csv_path.name}")
+                    
+                    # 4. 儲存 Excel (包含多個工作表)
+                    excel_path = OUTPUT_DIR / f"TCFD_完整報告_{timestamp}.xlsx"
+                    with open(excel_path, "wb") as f:
+                        f.write(build_excel_bytes())
+                    saved_files.append(f"✅ {excel_path.name}")
+                    
+                    # 5. 儲存 HTML
+                    html_path = save_html_copy(timestamp)
+                    if html_path:
+                        saved_files.append(f"✅ {html_path.name}")
+                
+                st.success(f"📁 已儲存 {len(saved_files)} 個檔案到 output 資料夾！")
+                for f in saved_files:
+                    st.write(f)
+        
+        st.markdown("---")
+        
+        # ===== 個別下載按鈕 =====
+        st.markdown("#### 📁 個別下載")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.download_button(
+                label="📽️ PowerPoint",
+                data=build_pptx_bytes(today),
+                file_name="TCFD_氣候風險分析報告.pptx",
+                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                use_container_width=True
+            )
+        
+        with col2:
+            st.download_button(
+                label="📗 Excel 報告",
+                data=build_excel_bytes(),
+                file_name="TCFD_完整報告.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+        
+        with col3:
+            # 讀取 HTML 版本
+            try:
+                with open("TCFD/TCFD氣候風險表.py", "r", encoding="utf-8") as f:
+                    html_content = f.read()
+                st.download_button(
+                    label="📄 HTML 網頁",
+                    data=html_content,
+                    file_name="TCFD_氣候風險分析表.html",
+                    mime="text/html",
+                    use_container_width=True
+                )
+            except OSError:
+                st.button("📄 HTML (無檔案)", disabled=True, use_container_width=True)
+        
+        with col4:
+            st.download_button(
+                label="📊 CSV 數據",
+                data=export_df.to_csv(index=False, encoding="utf-8-sig"),
+                file_name="TCFD_風險數據.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+        
+        # ===== 儲存到本地按鈕 =====
+        st.markdown("---")
+        st.markdown("#### 💾 儲存到 output 資料夾")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            if st.button("💾 存 PPTX", use_container_width=True):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                pptx_path = OUTPUT_DIR / f"TCFD_報告_{timestamp}.pptx"
+                with open(pptx_path, "wb") as f:
+                    f.write(build_pptx_bytes(today))
+                st.success(f"✅ 已儲存: {pptx_path.name}")
+        
+        with col2:
+            if st.button("💾 存 Excel", use_container_width=True):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                excel_path = OUTPUT_DIR / f"TCFD_完整報告_{timestamp}.xlsx"
+                with open(excel_path, "wb") as f:
+                    f.write(build_excel_bytes())
+                st.success(f"✅ 已儲存: {excel_path.name}")
+        
+        with col3:
+            if st.button("💾 存 HTML", use_container_width=True):
+                html_path = save_html_copy(datetime.now().strftime("%Y%m%d_%H%M%S"))
+                if html_path:
+                    st.success(f"✅ 已儲存: {html_path.name}")
+                else:
+                    st.error("❌ HTML 來源檔案不存在")
+        
+        with col4:
+            if st.button("💾 存 CSV", use_container_width=True):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                csv_path = OUTPUT_DIR / f"TCFD_風險數據_{timestamp}.csv"
+                export_df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+                st.success(f"✅ 已儲存: {csv_path.name}")
+        
+        # ===== 顯示 output 資料夾內容 =====
+        st.markdown("---")
+        st.markdown("#### 📂 output 資料夾內容")
+        
+        if OUTPUT_DIR.exists():
+            files = list(OUTPUT_DIR.glob("*"))
+            if files:
+                file_info = []
+                for f in sorted(files, key=lambda x: x.stat().st_mtime, reverse=True):
+                    size_kb = f.stat().st_size / 1024
+                    mtime = datetime.fromtimestamp(f.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                    file_info.append({
+                        "檔案名稱": f.name,
+                        "大小": f"{size_kb:.1f} KB",
+                        "修改時間": mtime
+                    })
+                
+                st.dataframe(
+                    pd.DataFrame(file_info),
+                    use_container_width=True,
+                    hide_index=True
+                )
+                
+                # 清空資料夾按鈕
+                if st.button("🗑️ 清空 output 資料夾", type="secondary"):
+                    for f in files:
+                        f.unlink()
+                    st.success("✅ 已清空 output 資料夾")
+                    st.rerun()
+            else:
+                st.info("📭 output 資料夾是空的")
+        else:
+            st.warning("⚠️ output 資料夾不存在")
+
+
+risk_table_section()
 
 st.markdown("---")
 
@@ -543,23 +791,9 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# 解決方案數據
-solution_df = pd.DataFrame({
-    "技術方案": ["🤖 AI能耗監控系統", "🏗️ 被動式建築設計", "🏢 智能樓宇管理"],
-    "技術特點": [
-        "機器學習預測用電模式，即時優化設備運行參數",
-        "自然通風、遮陽、保溫，減少機械空調依賴",
-        "IoT感測整合控制，人員密度動態調節"
-    ],
-    "節能效益": ["15-25%", "30-40%", "25-35%"],
-    "減碳效果": ["20%", "40%", "35%"],
-    "投資回收期": ["1.8年", "3.5年", "2.2年"],
-    "10年淨效益": ["+300萬", "+800萬", "+450萬"]
-})
-
 # 使用 Streamlit 原生表格顯示
 st.dataframe(
-    solution_df,
+    get_solution_df(),
     use_container_width=True,
     hide_index=True,
     column_config={
@@ -574,64 +808,7 @@ st.dataframe(
 
 # ============ 互動式計算器 ============
 st.markdown("---")
-st.markdown("### 🧮 節能效益計算器")
-
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    current_energy_cost = st.number_input(
-        "目前年度能源成本 (萬元)",
-        min_value=0,
-        max_value=100000,
-        value=1000,
-        step=100
-    )
-
-with col2:
-    selected_tech = st.selectbox(
-        "選擇導入技術",
-        ["AI能耗監控系統 (節能20%)", "被動式建築設計 (節能35%)", "智能樓宇管理 (節能30%)"]
-    )
-
-with col3:
-    carbon_price = st.number_input(
-        "碳價格 (元/噸)",
-        min_value=0,
-        max_value=5000,
-        value=500,
-        step=50
-    )
-
-# 計算效益
-tech_efficiency = {"AI能耗監控系統 (節能20%)": 0.20, "被動式建築設計 (節能35%)": 0.35, "智能樓宇管理 (節能30%)": 0.30}
-efficiency = tech_efficiency[selected_tech]
-
-energy_saving = current_energy_cost * efficiency
-carbon_saving = energy_saving * 0.5 * carbon_price / 100  # 假設每萬元電費約0.5噸碳排
-
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.metric(
-        label="💰 年度節省能源成本",
-        value=f"{energy_saving:.0f} 萬元",
-        delta=f"-{efficiency*100:.0f}%"
-    )
-
-with col2:
-    st.metric(
-        label="🌱 碳權價值估算",
-        value=f"{carbon_saving:.1f} 萬元",
-        delta="碳中和效益"
-    )
-
-with col3:
-    total_benefit = energy_saving + carbon_saving
-    st.metric(
-        label="📈 總效益",
-        value=f"{total_benefit:.0f} 萬元/年",
-        delta="年化收益"
-    )
+calculator_section()
 
 # ============ 輸出報告區域 ============
 st.markdown("---")
@@ -641,238 +818,7 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# 風險數據 DataFrame
-export_df = pd.DataFrame({
-    "風險類別": ["設備", "設備", "設備", "員工", "員工", "員工", "能源", "能源", "能源"],
-    "風險描述": ["設備過熱", "冷卻能耗", "材料老化", "健康風險", "空氣品質", "通勤影響", "尖峰用電", "供應不穩", "價格波動"],
-    "影響描述": [
-        "停機損失每小時50-200萬，設備壽命減少15-25%",
-        "能源成本增加40-60%，碳排放量上升35%",
-        "維護成本增加2-3倍，更換週期縮短50%",
-        "中暑事故增加3倍，勞動生產力下降20%",
-        "員工請病假增加15%，工作效率降低12%",
-        "遲到缺勤率上升25%，營運連續性風險",
-        "電費支出增加50-80%，限電風險提高",
-        "供電中斷風險增加，備用電源成本上升",
-        "能源成本波動±30%，預算規劃困難"
-    ],
-    "適應措施": [
-        "部署AI溫控系統，預防性維護，降低30%故障率",
-        "智能冷卻優化系統，節能25-40%，ROI 2.5年",
-        "採用耐候新材料，建立數位化巡檢系統",
-        "智能穿戴監測系統，動態調整作業時間",
-        "AI空氣品質管理，即時調節通風系統",
-        "彈性工作制度，遠端辦公基礎設施",
-        "部署智能電網系統，削峰填谷30%",
-        "混合儲能系統，微電網建置，自給率達60%",
-        "長期綠電採購合約，能源避險金融工具"
-    ],
-    "影響程度": [9, 7, 6, 8, 5, 4, 9, 6, 7],
-    "潛在損失(百萬)": [150, 80, 50, 30, 15, 10, 200, 100, 60]
-})
-
-# 節能方案 DataFrame
-solution_export_df = pd.DataFrame({
-    "技術方案": ["AI能耗監控系統", "被動式建築設計", "智能樓宇管理"],
-    "技術特點": [
-        "機器學習預測用電模式，即時優化設備運行參數",
-        "自然通風、遮陽、保溫，減少機械空調依賴",
-        "IoT感測整合控制，人員密度動態調節"
-    ],
-    "節能效益": ["15-25%", "30-40%", "25-35%"],
-    "減碳效果": ["20%", "40%", "35%"],
-    "投資回收期(年)": [1.8, 3.5, 2.2],
-    "10年淨效益(萬)": [300, 800, 450]
-})
-
-# ===== 一鍵生成所有報告 =====
-st.markdown("#### 🚀 一鍵生成所有報告")
-
-col1, col2 = st.columns([1, 2])
-
-with col1:
-    generate_all = st.button("⚡ 生成所有報告到 output 資料夾", use_container_width=True, type="primary")
-
-with col2:
-    if generate_all:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        saved_files = []
-        
-        with st.spinner("正在生成報告..."):
-            # 1. 儲存 PPTX
-            pptx_data = create_tcfd_pptx()
-            pptx_path = OUTPUT_DIR / f"TCFD_報告_{timestamp}.pptx"
-            with open(pptx_path, "wb") as f:
-                f.write(pptx_data.getvalue())
-            saved_files.append(f"✅ {pptx_path.name}")
-            
-            # 2. 儲存 CSV - 風險數據
-            csv_path = OUTPUT_DIR / f"TCFD_風險數據_{timestamp}.csv"
-            export_df.to_csv(csv_path, index=False, encoding="utf-8-sig")
-            saved_files.append(f"✅ {csv_path.name}")
-            
-            # 3. 儲存 CSV - 節能方案
-            solution_csv_path = OUTPUT_DIR / f"TCFD_節能方案_{timestamp}.csv"
-            solution_export_df.to_csv(solution_csv_path, index=False, encoding="utf-8-sig")
-            saved_files.append(f"✅ {solution_csv_path.name}")
-            
-            # 4. 儲存 Excel (包含多個工作表)
-            excel_path = OUTPUT_DIR / f"TCFD_完整報告_{timestamp}.xlsx"
-            with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-                export_df.to_excel(writer, sheet_name='風險分析', index=False)
-                solution_export_df.to_excel(writer, sheet_name='節能方案', index=False)
-            saved_files.append(f"✅ {excel_path.name}")
-            
-            # 5. 儲存 HTML
-            html_path = OUTPUT_DIR / f"TCFD_風險表_{timestamp}.html"
-            try:
-                with open("TCFD/TCFD氣候風險表.py", "r", encoding="utf-8") as f:
-                    html_content = f.read()
-                with open(html_path, "w", encoding="utf-8") as f:
-                    f.write(html_content)
-                saved_files.append(f"✅ {html_path.name}")
-            except:
-                pass
-        
-        st.success(f"📁 已儲存 {len(saved_files)} 個檔案到 output 資料夾！")
-        for f in saved_files:
-            st.write(f)
-
-st.markdown("---")
-
-# ===== 個別下載按鈕 =====
-st.markdown("#### 📁 個別下載")
-
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    # 生成 PPTX
-    pptx_data = create_tcfd_pptx()
-    st.download_button(
-        label="📽️ PowerPoint",
-        data=pptx_data,
-        file_name="TCFD_氣候風險分析報告.pptx",
-        mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        use_container_width=True
-    )
-
-with col2:
-    # 生成 Excel
-    excel_buffer = io.BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-        export_df.to_excel(writer, sheet_name='風險分析', index=False)
-        solution_export_df.to_excel(writer, sheet_name='節能方案', index=False)
-    excel_buffer.seek(0)
-    
-    st.download_button(
-        label="📗 Excel 報告",
-        data=excel_buffer,
-        file_name="TCFD_完整報告.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        use_container_width=True
-    )
-
-with col3:
-    # 讀取 HTML 版本
-    try:
-        with open("TCFD/TCFD氣候風險表.py", "r", encoding="utf-8") as f:
-            html_content = f.read()
-        st.download_button(
-            label="📄 HTML 網頁",
-            data=html_content,
-            file_name="TCFD_氣候風險分析表.html",
-            mime="text/html",
-            use_container_width=True
-        )
-    except:
-        st.button("📄 HTML (無檔案)", disabled=True, use_container_width=True)
-
-with col4:
-    st.download_button(
-        label="📊 CSV 數據",
-        data=export_df.to_csv(index=False, encoding="utf-8-sig"),
-        file_name="TCFD_風險數據.csv",
-        mime="text/csv",
-        use_container_width=True
-    )
-
-# ===== 儲存到本地按鈕 =====
-st.markdown("---")
-st.markdown("#### 💾 儲存到 output 資料夾")
-
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    if st.button("💾 存 PPTX", use_container_width=True):
-        pptx_data = create_tcfd_pptx()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pptx_path = OUTPUT_DIR / f"TCFD_報告_{timestamp}.pptx"
-        with open(pptx_path, "wb") as f:
-            f.write(pptx_data.getvalue())
-        st.success(f"✅ 已儲存: {pptx_path.name}")
-
-with col2:
-    if st.button("💾 存 Excel", use_container_width=True):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        excel_path = OUTPUT_DIR / f"TCFD_完整報告_{timestamp}.xlsx"
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            export_df.to_excel(writer, sheet_name='風險分析', index=False)
-            solution_export_df.to_excel(writer, sheet_name='節能方案', index=False)
-        st.success(f"✅ 已儲存: {excel_path.name}")
-
-with col3:
-    if st.button("💾 存 HTML", use_container_width=True):
-        try:
-            with open("TCFD/TCFD氣候風險表.py", "r", encoding="utf-8") as f:
-                html_content = f.read()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            html_path = OUTPUT_DIR / f"TCFD_風險表_{timestamp}.html"
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
-            st.success(f"✅ 已儲存: {html_path.name}")
-        except:
-            st.error("❌ HTML 來源檔案不存在")
-
-with col4:
-    if st.button("💾 存 CSV", use_container_width=True):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_path = OUTPUT_DIR / f"TCFD_風險數據_{timestamp}.csv"
-        export_df.to_csv(csv_path, index=False, encoding="utf-8-sig")
-        st.success(f"✅ 已儲存: {csv_path.name}")
-
-# ===== 顯示 output 資料夾內容 =====
-st.markdown("---")
-st.markdown("#### 📂 output 資料夾內容")
-
-if OUTPUT_DIR.exists():
-    files = list(OUTPUT_DIR.glob("*"))
-    if files:
-        file_info = []
-        for f in sorted(files, key=lambda x: x.stat().st_mtime, reverse=True):
-            size_kb = f.stat().st_size / 1024
-            mtime = datetime.fromtimestamp(f.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-            file_info.append({
-                "檔案名稱": f.name,
-                "大小": f"{size_kb:.1f} KB",
-                "修改時間": mtime
-            })
-        
-        st.dataframe(
-            pd.DataFrame(file_info),
-            use_container_width=True,
-            hide_index=True
-        )
-        
-        # 清空資料夾按鈕
-        if st.button("🗑️ 清空 output 資料夾", type="secondary"):
-            for f in files:
-                f.unlink()
-            st.success("✅ 已清空 output 資料夾")
-            st.rerun()
-    else:
-        st.info("📭 output 資料夾是空的")
-else:
-    st.warning("⚠️ output 資料夾不存在")
+export_section()
 
 # ============ 側邊欄 ============
 with st.sidebar:
@@ -892,4 +838,3 @@ with st.sidebar:
     使用計算器可估算導入
     節能技術後的效益。
     """)
-
@@ -6,15 +6,11 @@ AI 回答後自動生成 PPTX
 """
 
 import streamlit as st
-import anthropic
 from pathlib import Path
-import base64
 from datetime import datetime
 import json
-import re
-from docx import Document
-import PyPDF2
-from PIL import Image
+import sys
+import time
 import io
 from pptx import Presentation
 from pptx.util import Inches, Pt
@@ -22,6 +18,19 @@ from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
 
+sys.path.append(str(Path(__file__).parent.parent))
+import attachments
+import background_jobs
+import retrieval
+import tcfd_parser
+import blob_store
+import chat_context
+import image_prep
+import industry_lexicon
+import llm_client
+import llm_telemetry
+import rate_limiter
+
 # 設定 output 資料夾
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -38,80 +47,6 @@ st.caption("支援 TCFD 報告生成 → AI 回答後自動產生 PPTX")
 
 
 # ============ PPTX 生成函數 ============
-def parse_tcfd_from_response(response_text):
-    """從 AI 回應中解析 TCFD 表格內容"""
-    tcfd_items = []
-    
-    # 嘗試多種解析方式
-    
-    # 方式1: 尋找 HTML 表格
-    table_match = re.search(r'<table[^>]*>(.*?)</table>', response_text, re.DOTALL | re.IGNORECASE)
-    if table_match:
-        table_html = table_match.group(1)
-        # 提取 <tr> 中的 <td> 內容
-        rows = re.findall(r'<tr[^>]*>(.*?)</tr>', table_html, re.DOTALL | re.IGNORECASE)
-        for row in rows[1:]:  # 跳過表頭
-            cells = re.findall(r'<td[^>]*>(.*?)</td>', row, re.DOTALL | re.IGNORECASE)
-            if len(cells) >= 3:
-                # 清理 HTML 標籤
-                desc = re.sub(r'<[^>]+>', '\n', cells[0]).strip()
-                impact = re.sub(r'<[^>]+>', '\n', cells[1]).strip()
-                actions = re.sub(r'<[^>]+>', '\n', cells[2]).strip()
-                tcfd_items.append({
-                    "description": desc,
-                    "impact": impact,
-                    "actions": actions
-                })
-    
-    # 方式2: 尋找 Markdown 表格
-    if not tcfd_items:
-        md_rows = re.findall(r'\|([^|]+)\|([^|]+)\|([^|]+)\|', response_text)
-        for row in md_rows:
-            if '---' not in row[0] and 'Description' not in row[0] and '描述' not in row[0]:
-                tcfd_items.append({
-                    "description": row[0].strip(),
-                    "impact": row[1].strip(),
-                    "actions": row[2].strip()
-                })
-    
-    # 方式3: 尋找編號列表
-    if not tcfd_items:
-        # 嘗試找 **標題** 格式
-        sections = re.split(r'\n(?=\d+\.|\*\*|###)', response_text)
-        current_item = {}
-        
-        for section in sections:
-            section = section.strip()
-            if not section:
-                continue
-            
-            lower_section = section.lower()
-            
-            if 'description' in lower_section or '風險描述' in lower_section or '描述' in lower_section:
-                if current_item and 'description' in current_item:
-                    tcfd_items.append(current_item)
-                    current_item = {}
-                # 提取內容
-                content = re.sub(r'^[\d\.\*\#\s]+', '', section)
-                content = re.sub(r'\*\*[^*]+\*\*', '', content, count=1).strip()
-                current_item['description'] = content[:200] if content else section[:200]
-                
-            elif 'impact' in lower_section or '影響' in lower_section:
-                content = re.sub(r'^[\d\.\*\#\s]+', '', section)
-                content = re.sub(r'\*\*[^*]+\*\*', '', content, count=1).strip()
-                current_item['impact'] = content[:200] if content else section[:200]
-                
-            elif 'action' in lower_section or '措施' in lower_section or '行動' in lower_section:
-                content = re.sub(r'^[\d\.\*\#\s]+', '', section)
-                content = re.sub(r'\*\*[^*]+\*\*', '', content, count=1).strip()
-                current_item['actions'] = content[:200] if content else section[:200]
-        
-        if current_item and len(current_item) >= 2:
-            tcfd_items.append(current_item)
-    
-    return tcfd_items
-
-
 def create_tcfd_pptx_from_response(industry_name, tcfd_items, full_response):
     """根據 AI 回應建立 PPTX"""
     prs = Presentation()
@@ -296,24 +231,15 @@ def create_tcfd_pptx_from_response(industry_name, tcfd_items, full_response):
 
 
 def extract_industry_from_messages(messages):
-    """從對話中提取產業名稱"""
-    for msg in reversed(messages):
-        content = msg.get("content", "")
-        if isinstance(content, list):
-            content = " ".join([c.get("text", "") for c in content if c.get("type") == "text"])
-        
-        # 尋找產業關鍵字
-        match = re.search(r'(我是|我們是|屬於|從事|經營)?[「「]?([^「」\s]{2,10}(?:業|產業|公司|廠商|製造|工業))[」」]?', content)
-        if match:
-            return match.group(2)
-        
-        # 常見產業
-        industries = ["鋁建材", "空調", "鋼鐵", "電子", "紡織", "營建", "太陽能", "半導體", "汽車", "化工", "食品"]
-        for ind in industries:
-            if ind in content:
-                return ind + "業"
+    """從對話中提取產業名稱（每則訊息的結果已快取）；先看使用者訊息，再看助手回覆"""
+    ordered = [m for m in reversed(messages) if m.get("role") == "user"]
+    ordered += [m for m in reversed(messages) if m.get("role") != "user"]
+    for msg in ordered:
+        industry = industry_lexicon.detect_industry(chat_context.message_text(msg.get("content", "")))
+        if industry:
+            return industry
     
-    return "企業"
+    return industry_lexicon.DEFAULT_INDUSTRY
 
 
 # ============ 側邊欄設定 ============
@@ -342,6 +268,14 @@ with st.sidebar:
     st.subheader("🎛️ 參數")
     max_tokens = st.slider("Max Tokens", 1024, 8192, 4096)
     temperature = st.slider("Temperature", 0.0, 1.0, 0.5, 0.1)
+    context_budget = st.slider(
+        "對話上下文預算 (tokens)", 2000, 100000, chat_context.DEFAULT_BUDGET, 1000,
+        help="超過預算的較舊對話會壓縮成摘要，不再整段重送"
+    )
+    retrieval_top_k = st.slider(
+        "附件檢索段數", 1, 20, retrieval.TOP_K,
+        help="大型附件只送出與問題最相關的段落"
+    )
     
     st.divider()
     
@@ -357,6 +291,10 @@ with st.sidebar:
             st.session_state.messages = []
             st.session_state.total_cost = 0
             st.session_state.last_pptx = None
+            st.session_state.pptx_job = None
+            st.session_state.message_stats = {}
+            st.session_state.context_state = chat_context.new_state()
+            st.session_state.last_turn_tokens = None
             st.rerun()
     
     with col2:
@@ -375,61 +313,65 @@ with st.sidebar:
     if 'total_cost' not in st.session_state:
         st.session_state.total_cost = 0
     st.metric("本次總成本", f"${st.session_state.total_cost:.4f}")
+    
+    # 上一輪送出的 tokens（估計值 / API 實際計費）
+    last_turn = st.session_state.get('last_turn_tokens')
+    if last_turn:
+        st.metric("上一輪輸入 tokens", f"{last_turn['input_tokens']:,}",
+                  help="API 回報的實際輸入 tokens")
+        st.caption(f"原文保留 {last_turn['kept']} 則 ≈ {last_turn['context_tokens']:,} tokens"
+                   f" | 摘要 {last_turn['summarized']} 則 ≈ {last_turn['summary_tokens']:,} tokens")
 
 
 # ============ 初始化 Session State ============
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
-if 'client' not in st.session_state:
-    st.session_state.client = None
-
 if 'last_pptx' not in st.session_state:
     st.session_state.last_pptx = None
 
+# 背景生成中的 PPTX 工作 id；完成時的提示訊息
+if 'pptx_job' not in st.session_state:
+    st.session_state.pptx_job = None
+if 'pptx_notice' not in st.session_state:
+    st.session_state.pptx_notice = None
+
 if 'pending_template' not in st.session_state:
     st.session_state.pending_template = None
 
+# 送出後遞增以清空上傳元件
+if 'uploader_key' not in st.session_state:
+    st.session_state.uploader_key = 0
+
+# 滾動摘要狀態
+if 'context_state' not in st.session_state:
+    st.session_state.context_state = chat_context.new_state()
+
+# 每則助手訊息的延遲統計（key: messages 索引）
+if 'message_stats' not in st.session_state:
+    st.session_state.message_stats = {}
+
 
 # ============ 工具函數 ============
+ATTACHMENT_PREFIX = "📎 附件："
+IMAGE_TYPES = ["png", "jpg", "jpeg", "gif", "webp"]
+
 def read_file_content(file):
-    try:
-        file_type = file.name.split('.')[-1].lower()
-        if file_type == 'txt':
-            return file.read().decode('utf-8')
-        elif file_type == 'docx':
-            doc = Document(io.BytesIO(file.read()))
-            return '\n'.join([para.text for para in doc.paragraphs])
-        elif file_type == 'pdf':
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-            return ''.join([page.extract_text() for page in pdf_reader.pages])
-    except:
-        return None
+    """解析上傳文件（文字與切塊）；以內容雜湊快取，重跑時不會重新解析"""
+    return attachments.ingest(file.name, file.getvalue())
 
 def encode_image(image_file):
+    """縮圖、壓縮並去除中繼資料後編碼；以內容雜湊快取"""
     try:
-        image = Image.open(image_file)
-        buffered = io.BytesIO()
-        image.save(buffered, format=image.format or "PNG")
-        mime_type = f"image/{image.format.lower()}" if image.format else "image/png"
-        return {
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": mime_type,
-                "data": base64.b64encode(buffered.getvalue()).decode('utf-8')
-            }
-        }
-    except:
+        block, _ = image_prep.encode_image_block(image_file.getvalue())
+        return block
+    except Exception:
         return None
 
-def calculate_cost(input_tokens, output_tokens, model_name):
-    if "sonnet" in model_name.lower():
-        return input_tokens / 1_000_000 * 3 + output_tokens / 1_000_000 * 15
-    elif "opus" in model_name.lower():
-        return input_tokens / 1_000_000 * 15 + output_tokens / 1_000_000 * 75
-    return 0
-
+def format_stats(stats):
+    """單則訊息的 tokens / 延遲說明"""
+    return (f"📊 Tokens: {stats['input_tokens']} in / {stats['output_tokens']} out | 💰 ${stats['cost']:.4f}"
+            f" | ⚡ 首字 {stats['ttft']:.2f}s / 總計 {stats['latency']:.2f}s")
 
 # ============ TCFD 快捷模板 ============
 st.markdown("### ⚡ TCFD 報告生成")
@@ -484,18 +426,78 @@ if st.session_state.pending_template:
 st.markdown("---")
 st.markdown("### 💬 對話")
 
-for message in st.session_state.messages:
+for idx, message in enumerate(st.session_state.messages):
     with st.chat_message(message["role"]):
         if isinstance(message["content"], str):
             st.markdown(message["content"])
         elif isinstance(message["content"], list):
             for block in message["content"]:
                 if block.get("type") == "text":
-                    st.markdown(block.get("text", ""))
+                    text = block.get("text", "")
+                    if text.startswith(ATTACHMENT_PREFIX):
+                        st.caption(text.split("\n", 1)[0])
+                    else:
+                        st.markdown(text)
+                elif block.get("type") == "image":
+                    st.caption("🖼️ 已附加圖片")
+        if idx in st.session_state.message_stats:
+            st.caption(format_stats(st.session_state.message_stats[idx]))
 
 
 # ============ 顯示上次生成的 PPTX ============
-if st.session_state.last_pptx:
+def build_pptx_job(messages, tcfd_items, assistant_message):
+    """背景執行：產生 PPTX、存入 blob store 並寫到 output（不可呼叫 st.*）"""
+    industry = extract_industry_from_messages(messages)
+    pptx_data = create_tcfd_pptx_from_response(industry, tcfd_items, assistant_message)
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"TCFD_{industry}_{timestamp}.pptx"
+    digest = blob_store.put(pptx_data)
+    
+    # 自動儲存到 output
+    blob_store.save_as(digest, OUTPUT_DIR / filename)
+    return {
+        'blob': digest,
+        'filename': filename,
+        'industry': industry,
+        'items_count': len(tcfd_items)
+    }
+
+
+def pptx_download_section():
+    """下載區；背景工作完成前顯示進度"""
+    job_id = st.session_state.pptx_job
+    if job_id:
+        status, result = background_jobs.poll(job_id)
+        if status == "running":
+            st.info("📽️ PPTX 背景生成中，完成後會在這裡出現下載按鈕...")
+            return
+        st.session_state.pptx_job = None
+        if status == "done":
+            st.session_state.last_pptx = result
+            st.session_state.pptx_notice = result
+        elif status == "error":
+            st.session_state.pptx_notice = {"error": str(result)}
+        # 整頁重跑一次以停止輪詢
+        st.rerun()
+    
+    notice = st.session_state.pptx_notice
+    if notice:
+        st.session_state.pptx_notice = None
+        if "error" in notice:
+            st.error(f"❌ PPTX 生成失敗: {notice['error']}")
+        else:
+            st.success(f"✅ PPTX 已自動生成並儲存到 output/{notice['filename']}")
+            st.info(f"📊 解析到 {notice['items_count']} 個風險項目")
+    
+    if not st.session_state.last_pptx:
+        return
+    if not blob_store.exists(st.session_state.last_pptx['blob']):
+        # 太久沒下載，檔案已被清理
+        st.session_state.last_pptx = None
+        st.warning("⚠️ 上次生成的 PPTX 已過期，請重新生成")
+        return
+    
     st.markdown("---")
     st.markdown("### 📥 下載報告")
     
@@ -504,7 +506,7 @@ if st.session_state.last_pptx:
     with col1:
         st.download_button(
             "📽️ 下載 PowerPoint",
-            data=st.session_state.last_pptx['data'],
+            data=blob_store.get(st.session_state.last_pptx['blob']),
             file_name=st.session_state.last_pptx['filename'],
             mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
             use_container_width=True
@@ -513,8 +515,7 @@ if st.session_state.last_pptx:
     with col2:
         if st.button("💾 儲存到 output", use_container_width=True):
             pptx_path = OUTPUT_DIR / st.session_state.last_pptx['filename']
-            with open(pptx_path, "wb") as f:
-                f.write(st.session_state.last_pptx['data'].getvalue())
+            blob_store.save_as(st.session_state.last_pptx['blob'], pptx_path)
             st.success(f"✅ 已儲存: {pptx_path.name}")
     
     with col3:
@@ -522,6 +523,41 @@ if st.session_state.last_pptx:
         st.caption(f"📊 風險項目: {st.session_state.last_pptx.get('items_count', 0)} 項")
 
 
+# ============ 附件上傳 ============
+uploaded_files = st.file_uploader(
+    "📎 附加文件或圖片（隨下一則訊息送出）",
+    type=list(attachments.TEXT_TYPES) + IMAGE_TYPES,
+    accept_multiple_files=True,
+    key=f"uploader_{st.session_state.uploader_key}"
+)
+
+attached_docs = []
+attached_images = []
+for file in uploaded_files or []:
+    if file.name.rsplit('.', 1)[-1].lower() in IMAGE_TYPES:
+        try:
+            _, image_stats = image_prep.encode_image_block(file.getvalue())
+        except Exception:
+            st.warning(f"⚠️ 無法讀取圖片 {file.name}")
+            continue
+        attached_images.append(file)
+        width, height = image_stats["size"]
+        st.caption(f"🖼️ {file.name}：{image_stats['original_bytes'] / 1024:,.0f} KB → "
+                   f"{image_stats['encoded_bytes'] / 1024:,.0f} KB（{width}×{height}）")
+        continue
+    try:
+        with st.spinner(f"📄 解析 {file.name}..."):
+            doc = read_file_content(file)
+    except ValueError as e:
+        st.warning(f"⚠️ 無法解析 {file.name}（可能已加密或檔案損壞）：{e}")
+        continue
+    if doc is None:
+        st.warning(f"⚠️ 不支援的檔案格式：{file.name}")
+        continue
+    attached_docs.append(doc)
+    st.caption(f"📄 {file.name}：{len(doc['text']):,} 字 / {len(doc['chunks'])} 段")
+
+
 # ============ 用戶輸入 ============
 user_input = st.chat_input("輸入您的產業（如：我是鋁建材業）...")
 
@@ -530,9 +566,6 @@ if user_input:
         st.error("❌ 請先在側邊欄輸入 Claude API Key!")
         st.stop()
     
-    if st.session_state.client is None:
-        st.session_state.client = anthropic.Anthropic(api_key=api_key)
-    
     # 組合訊息：模板 + 用戶輸入
     if st.session_state.pending_template:
         full_message = f"{user_input}\n\n{st.session_state.pending_template}"
@@ -540,81 +573,137 @@ if user_input:
     else:
         full_message = user_input
     
+    # 附件：大型文件只取與問題相關的段落，文件與圖片放在使用者文字之前
+    content = []
+    retrieval_stats = None
+    if attached_docs:
+        selected, retrieval_stats = retrieval.select_context(attached_docs, full_message, k=retrieval_top_k)
+        for name, parts in selected.items():
+            if retrieval_stats["mode"] == "retrieval":
+                body = "（以下為與問題相關的節錄段落）\n" + "\n\n……\n\n".join(parts)
+            else:
+                body = "\n".join(parts)
+            content.append({"type": "text", "text": f"{ATTACHMENT_PREFIX}{name}\n{body}"})
+    for image_file in attached_images:
+        image_block = encode_image(image_file)
+        if image_block:
+            content.append(image_block)
+    if content:
+        content.append({"type": "text", "text": full_message})
+        st.session_state.uploader_key += 1
+    
     # 保存用戶訊息
     st.session_state.messages.append({
         "role": "user",
-        "content": full_message
+        "content": content or full_message
     })
     
     with st.chat_message("user"):
         st.markdown(user_input)
         if "TCFD" in full_message:
             st.caption("📋 已附加 TCFD 報告模板")
-    
-    # 調用 Claude API
+        for doc in attached_docs:
+            st.caption(f"{ATTACHMENT_PREFIX}{doc['name']}")
+        if retrieval_stats and retrieval_stats["mode"] == "retrieval":
+            st.caption(f"🔎 附件檢索：送出 {retrieval_stats['selected']}/{retrieval_stats['total_chunks']} 段"
+                       f" | 建索引 {retrieval_stats['build_ms']:.0f} ms / 查詢 {retrieval_stats['query_ms']:.1f} ms")
+        if attached_images:
+            st.caption(f"🖼️ 已附加 {len(attached_images)} 張圖片")
+    
+    # 調用 Claude API（串流輸出，邊收邊顯示）
     with st.chat_message("assistant"):
-        with st.spinner("🤔 AI 分析中..."):
-            try:
-                system_prompt = """你是專業的 TCFD 氣候風險顧問。
+        try:
+            system_prompt = """你是專業的 TCFD 氣候風險顧問。
 請用繁體中文回答。
 當被要求生成 TCFD 表格時，請務必使用 HTML <table> 格式輸出，包含完整的 <tr><td> 標籤。
 每個風險項目要具體針對用戶的產業特性撰寫。"""
 
-                response = st.session_state.client.messages.create(
-                    model=model,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    system=system_prompt,
-                    messages=st.session_state.messages
-                )
-                
-                assistant_message = response.content[0].text
-                st.markdown(assistant_message)
-                
-                # 計算成本
-                cost = calculate_cost(response.usage.input_tokens, response.usage.output_tokens, model)
-                st.session_state.total_cost += cost
-                st.caption(f"📊 Tokens: {response.usage.input_tokens} in / {response.usage.output_tokens} out | 💰 ${cost:.4f}")
-                
-                # 保存助手訊息
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": assistant_message
-                })
-                
-                # ====== 自動生成 PPTX ======
-                if auto_generate_pptx:
-                    with st.spinner("📽️ 正在生成 PPTX..."):
-                        # 提取產業名稱
-                        industry = extract_industry_from_messages(st.session_state.messages)
-                        
-                        # 解析 TCFD 內容
-                        tcfd_items = parse_tcfd_from_response(assistant_message)
-                        
-                        # 生成 PPTX
-                        pptx_data = create_tcfd_pptx_from_response(industry, tcfd_items, assistant_message)
-                        
-                        # 儲存到 session state
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filename = f"TCFD_{industry}_{timestamp}.pptx"
-                        
-                        st.session_state.last_pptx = {
-                            'data': pptx_data,
-                            'filename': filename,
-                            'industry': industry,
-                            'items_count': len(tcfd_items)
-                        }
-                        
-                        # 自動儲存到 output
-                        pptx_path = OUTPUT_DIR / filename
-                        with open(pptx_path, "wb") as f:
-                            f.write(pptx_data.getvalue())
-                        
-                        st.success(f"✅ PPTX 已自動生成並儲存到 output/{filename}")
-                        st.info(f"📊 解析到 {len(tcfd_items)} 個風險項目")
+            # 依 token 預算裁切對話，較舊內容改以摘要放進 system prompt
+            context_messages, summary, context_stats = chat_context.build_context(
+                st.session_state.messages, st.session_state.context_state, budget=context_budget
+            )
+            if context_stats["truncated"]:
+                st.warning(f"⚠️ 這則訊息（含附件）超過對話上下文預算 {context_budget:,} tokens，"
+                           "超出部分已截斷；可調高側邊欄的預算或縮短內容")
+
+            placeholder = st.empty()
+            placeholder.caption("🤔 AI 分析中...")
+            industry = extract_industry_from_messages(st.session_state.messages)
+            # 同一把 key 共用 client 與連線池（換 key 也會拿到對應的 client）
+            client = llm_client.get_client(api_key)
+
+            def stream_reply():
+                """串流一次回答；429 在開始串流前就會拋出，重新排隊後從頭再來"""
+                chunks = []
+                tcfd_stream = tcfd_parser.TCFDStreamParser()
+                last_render = 0.0
+                placeholder.caption("🤔 AI 分析中...")
+                with llm_telemetry.track("Claude AI 助手", model, industry,
+                                         retries=rate_limiter.current_attempt()) as llm_call:
+                    with client.messages.stream(
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        system=chat_context.with_summary(system_prompt, summary),
+                        messages=context_messages
+                    ) as stream:
+                        for text in stream.text_stream:
+                            llm_call.first_token()
+                            chunks.append(text)
+                            tcfd_stream.feed(text)
+                            # 每 50ms 最多重繪一次，避免長回答時前端更新過於頻繁
+                            now = time.perf_counter()
+                            if now - last_render >= 0.05:
+                                placeholder.markdown("".join(chunks) + "▌")
+                                last_render = now
+                        response = stream.get_final_message()
+                    llm_call.set_response(response)
+                return "".join(chunks), tcfd_stream, llm_call, response
+
+            # 所有 session 共用 API 額度，額度滿了就排隊並顯示位置
+            assistant_message, tcfd_stream, llm_call, response = rate_limiter.call(
+                api_key, model, stream_reply,
+                on_wait=lambda position, eta: placeholder.caption(rate_limiter.describe_wait(position, eta))
+            )
+            placeholder.markdown(assistant_message)
+
+            # 成本由 llm_telemetry 的價格表計算（含快取 tokens）
+            st.session_state.total_cost += llm_call.cost
+            stats = {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "cost": llm_call.cost,
+                "ttft": llm_call.ttft if llm_call.ttft is not None else llm_call.latency,
+                "latency": llm_call.latency,
+            }
+            st.session_state.message_stats[len(st.session_state.messages)] = stats
+            st.session_state.last_turn_tokens = {**context_stats, "input_tokens": response.usage.input_tokens}
+            st.caption(format_stats(stats))
+            
+            # 保存助手訊息
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": assistant_message
+            })
+            
+            # ====== 自動生成 PPTX（背景執行，不阻塞對話）======
+            if auto_generate_pptx:
+                # 解析已在串流時完成，這裡只取結果
+                tcfd_items = tcfd_stream.close()
+                if "TCFD" in full_message:
+                    llm_call.mark_parsed(len(tcfd_items) > 0)
                 
-            except Exception as e:
-                st.error(f"❌ 錯誤: {e}")
+                st.session_state.pptx_job = background_jobs.submit(
+                    build_pptx_job, list(st.session_state.messages), tcfd_items, assistant_message
+                )
+            
+        except Exception as e:
+            st.error(f"❌ 錯誤: {e}")
+
+
+# ============ 下載報告 ============
+# 放在對話之後定義，這一輪剛送出的工作也會被輪詢；有工作在背景執行時每秒檢查一次，沒有就不輪詢
+st.fragment(run_every=1.0 if st.session_state.pptx_job else None)(pptx_download_section)()
 
 
 # ============ 頁腳 ============
@@ -9,7 +9,21 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import sys
+import time
 from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import carbon_fee
+import csv_ingest
+import energy_projection
+import figure_cache
+import macc
+import physical_hazard
+import portfolio_optimizer
+import risk_matrix
+import temperature_scenarios
 
 st.set_page_config(
     page_title="數據分析工具",
@@ -30,12 +44,339 @@ with st.sidebar:
     st.markdown("### 📊 分析選項")
     analysis_type = st.radio(
         "選擇分析類型",
-        ["風險矩陣", "效益分析", "趨勢預測", "自訂數據"]
+        ["風險矩陣", "效益分析", "趨勢預測", "碳費試算", "溫升情境", "減碳成本曲線", "據點災害暴露", "自訂數據"]
     )
 
 st.title("📈 TCFD 數據分析工具")
 st.caption("風險矩陣視覺化 | 節能效益計算 | ROI 分析")
 
+@st.cache_data(max_entries=16, show_spinner=False)
+def simulate_energy_cost(base_cost, growth_rate, growth_volatility, tech_saving, saving_uncertainty, years, n_paths):
+    """蒙地卡羅模擬（固定亂數種子，相同參數重繪時直接取快取）"""
+    start = time.perf_counter()
+    bands, final_saving = energy_projection.simulate(
+        base_cost, growth_rate, growth_volatility, tech_saving, saving_uncertainty, years, n_paths=n_paths
+    )
+    return bands, final_saving, (time.perf_counter() - start) * 1000
+
+
+SCATTER_MAX_POINTS = 100_000     # 自訂數據散佈圖最多畫幾點，超過就抽樣
+PREVIEW_ROWS = 1000
+
+
+def ingest_upload(uploaded_file):
+    """上傳檔轉成 Parquet，回傳 digest；同一個上傳檔只雜湊一次"""
+    digests = st.session_state.setdefault("csv_digests", {})
+    if uploaded_file.file_id not in digests:
+        digests[uploaded_file.file_id] = csv_ingest.ingest(uploaded_file.getvalue())
+    return digests[uploaded_file.file_id]
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_csv_columns(digest, columns=None, limit=None):
+    """從 Parquet 讀出指定欄位（換軸時只讀需要的兩欄）"""
+    return csv_ingest.load(digest, columns=list(columns) if columns else None, limit=limit)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_risk_register(digest):
+    """上傳的風險登錄表（依檔案內容快取）"""
+    return risk_matrix.prepare(csv_ingest.load(digest))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def sample_risk_register(n):
+    return risk_matrix.prepare(risk_matrix.sample_register(n))
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def evaluate_candidates(source, key, rate, years):
+    """候選方案的 NPV / IRR / 減碳量（依資料來源與折現參數快取）"""
+    if source == "upload":
+        candidates = csv_ingest.load(key)
+    elif source == "sample":
+        candidates = portfolio_optimizer.sample_candidates(key)
+    else:
+        candidates = solution_df[['technology', 'energy_saving_pct', 'carbon_reduction_pct', 'investment', 'roi_years']]
+    return portfolio_optimizer.evaluate(candidates, rate=rate / 100, years=years)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def project_carbon_fee(source, key, start_year, years):
+    """各廠區 x 年度 x 情境碳費（依資料來源、起始年與年數快取），回傳 (試算結果, 耗時 ms)"""
+    facilities = csv_ingest.load(key) if source == "upload" else carbon_fee.sample_facilities(key)
+    start = time.perf_counter()
+    result = carbon_fee.project(facilities, start_year=start_year, years=years)
+    return result, (time.perf_counter() - start) * 1000
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def project_temperature_impact(source, key, start_year, years):
+    """各事業單位 x 年度 x 情境的溫升財務衝擊（依資料來源、起始年與年數快取），回傳 (試算結果, 耗時 ms)"""
+    units = csv_ingest.load(key) if source == "upload" else temperature_scenarios.sample_units(key)
+    start = time.perf_counter()
+    result = temperature_scenarios.project(units, start_year=start_year, years=years)
+    return result, (time.perf_counter() - start) * 1000
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_macc_measures(source, key):
+    """減碳措施清單（依資料來源快取）"""
+    measures = csv_ingest.load(key) if source == "upload" else macc.sample_measures(key)
+    return macc.prepare(measures)
+
+
+def macc_curve(source_key, measures, rate):
+    """
+    目前 session 的減碳成本曲線：資料來源或折現率改變才整批重建，
+    表格編輯只對有變動的措施呼叫 update()（局部重排）
+    """
+    state = st.session_state.get("macc_curve")
+    if state is None or state["key"] != (source_key, rate):
+        state = st.session_state["macc_curve"] = {
+            "key": (source_key, rate), "curve": macc.MACCurve(measures, rate=rate / 100), "edited": set()
+        }
+    edits = st.session_state.get(f"macc_editor_{source_key}", {}).get("edited_rows", {})
+    curve = state["curve"]
+    updated = 0
+    # 取消的編輯要改回原值，所以上次編輯過的列也要再比對一次
+    for row in state["edited"] | {int(r) for r in edits}:
+        changes = edits.get(row, edits.get(str(row), {}))
+        values = {}
+        for col in macc.NUMERIC_COLUMNS:
+            value = changes.get(col)
+            values[col] = measures.at[row, col] if value is None else value
+        updated += curve.update(row, **values)
+    state["edited"] = {int(r) for r in edits}
+    return curve, updated
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def score_sites(source, key):
+    """據點對照災害圖層評分（依資料來源快取），回傳 (評分結果, 耗時 ms)"""
+    sites = csv_ingest.load(key) if source == "upload" else physical_hazard.sample_assets(key)
+    start = time.perf_counter()
+    scored = physical_hazard.score(sites)
+    return scored, (time.perf_counter() - start) * 1000
+
+
+MAP_MAX_POINTS = 20_000       # 地圖上最多畫幾個據點，超過就抽樣
+MAP_STRIDE = 2                # 底圖每隔幾格取一格
+
+
+def add_fan(fig, x, band, name, color):
+    """P10~P90 區間帶 + P50 中位線"""
+    fig.add_trace(go.Scatter(x=x, y=band[90], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(
+        x=x, y=band[10], name=f'{name} P10~P90',
+        line=dict(width=0), fill='tonexty', fillcolor=f'rgba({color}, 0.2)'
+    ))
+    fig.add_trace(go.Scatter(x=x, y=band[50], name=f'{name} P50', line=dict(color=f'rgb({color})')))
+
+
+# ============ 圖表 ============
+# 以下建圖函式都經過 figure_cache：輸入資料與參數沒變就直接取快取，不重建
+def saving_figure(df):
+    """各方案節能 / 減碳效益比較"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        name='節能效益',
+        x=df['technology'],
+        y=df['energy_saving_pct'],
+        marker_color='#3498db'
+    ))
+    
+    fig.add_trace(go.Bar(
+        name='減碳效益',
+        x=df['technology'],
+        y=df['carbon_reduction_pct'],
+        marker_color='#2ecc71'
+    ))
+    
+    fig.update_layout(
+        title='各方案節能減碳效益比較',
+        yaxis_title='百分比 (%)',
+        barmode='group',
+        height=400
+    )
+    return fig
+
+
+def roi_figure(df):
+    """投資與 10 年淨效益"""
+    return px.bar(
+        df,
+        x='technology',
+        y=['investment', '10yr_benefit'],
+        title='投資與10年淨效益',
+        labels={'value': '金額 (百萬元)', 'technology': '技術方案'},
+        color_discrete_map={'investment': '#e74c3c', '10yr_benefit': '#2ecc71'},
+        barmode='group',
+        height=400
+    )
+
+
+def portfolio_figure(evaluated, chosen, objective, y_title):
+    """候選方案散佈圖，選入的標綠色"""
+    fig = go.Figure()
+    for picked, name, color in ((False, '未選入', '#bdc3c7'), (True, '選入', '#2ecc71')):
+        subset = evaluated[chosen == picked]
+        fig.add_trace(go.Scattergl(
+            x=subset['investment'], y=subset[objective], mode='markers', name=name,
+            marker=dict(color=color, size=7, opacity=0.8),
+            text=subset['technology'] if 'technology' in subset.columns else None,
+            hovertemplate="%{text}<br>投資 %{x:,.1f} 百萬<br>%{y:,.1f}<extra></extra>",
+        ))
+    fig.update_layout(height=400, xaxis_title='投資 (百萬元)', yaxis_title=y_title,
+                      title='候選方案：投資 vs 目標值')
+    return fig
+
+
+def trend_figure(years_range, title, projection=None, bands=None):
+    """能源成本趨勢：單一成長率畫兩條線，蒙地卡羅畫 P10~P90 區間帶"""
+    fig = go.Figure()
+    if bands is None:
+        fig.add_trace(go.Scatter(
+            x=years_range, y=projection["baseline"],
+            name='不導入技術',
+            line=dict(color='#e74c3c', dash='dash'),
+            fill=None
+        ))
+        
+        fig.add_trace(go.Scatter(
+            x=years_range, y=projection["with_tech"],
+            name='導入節能技術',
+            line=dict(color='#2ecc71'),
+            fill='tonexty',
+            fillcolor='rgba(46, 204, 113, 0.2)'
+        ))
+    else:
+        add_fan(fig, years_range, bands["baseline"], '不導入技術', '231, 76, 60')
+        add_fan(fig, years_range, bands["with_tech"], '導入節能技術', '46, 204, 113')
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title='年份',
+        yaxis_title='能源成本 (萬元)',
+        height=400,
+        hovermode='x unified'
+    )
+    return fig
+
+
+def saving_histogram(final_saving):
+    """累積節省分布：先在伺服器端分箱，只傳箱數資料到前端"""
+    counts, edges = np.histogram(final_saving, bins=60)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts / counts.sum(),
+        marker_color='#2ecc71', width=np.diff(edges)
+    ))
+    fig.update_layout(height=300, xaxis_title='累積節省 (萬元)', yaxis_title='機率',
+                      yaxis_tickformat='.1%', margin=dict(t=10, b=10))
+    return fig
+
+
+def fee_trend_figure(totals, highlight):
+    """各情境逐年碳費合計，報告情境以粗線標示"""
+    fig = go.Figure()
+    for scenario in totals.columns:
+        fig.add_trace(go.Scatter(
+            x=totals.index, y=totals[scenario], name=scenario, mode='lines+markers',
+            line=dict(width=4 if scenario == highlight else 1.5)
+        ))
+    fig.update_layout(title='各情境年度碳費', xaxis_title='年份', yaxis_title='碳費 (百萬元)',
+                      height=400, hovermode='x unified')
+    return fig
+
+
+def facility_fee_figure(top):
+    """累計碳費最高的廠區"""
+    fig = go.Figure(go.Bar(
+        x=top['fee'], y=top['facility'], orientation='h', marker_color='#e67e22',
+        hovertemplate="%{y}<br>累計 %{x:,.1f} 百萬元<extra></extra>"
+    ))
+    fig.update_layout(title=f'累計碳費前 {len(top)} 名廠區', xaxis_title='累計碳費 (百萬元)',
+                      yaxis=dict(autorange='reversed'), height=400)
+    return fig
+
+
+def warming_impact_figure(totals):
+    """各溫升情境逐年增加成本"""
+    fig = go.Figure()
+    for scenario, color in zip(totals.columns, ['#2ecc71', '#f39c12', '#e74c3c']):
+        fig.add_trace(go.Scatter(x=totals.index, y=totals[scenario], name=scenario,
+                                 mode='lines', line=dict(color=color, width=2.5)))
+    fig.update_layout(title='各溫升情境年度增加成本', xaxis_title='年份', yaxis_title='增加成本 (百萬元)',
+                      height=400, hovermode='x unified')
+    return fig
+
+
+def warming_component_figure(components, year):
+    """指定年度各情境的衝擊組成"""
+    fig = go.Figure()
+    for component, color in zip(components.columns, ['#3498db', '#9b59b6', '#e67e22']):
+        fig.add_trace(go.Bar(x=components.index, y=components[component], name=component, marker_color=color))
+    fig.update_layout(title=f'{year} 年衝擊組成', yaxis_title='百萬元', barmode='stack', height=400)
+    return fig
+
+
+def macc_figure(curve_df, carbon_price):
+    """減碳成本曲線：寬度為減碳量、高度為每噸成本，依成本由低到高排列"""
+    fig = go.Figure()
+    for category, color in zip(macc.CATEGORIES, ['#3498db', '#2ecc71']):
+        subset = curve_df[curve_df['category'] == category]
+        fig.add_trace(go.Bar(
+            x=subset['start'] + subset['abatement'] / 2, y=subset['cost'], width=subset['abatement'],
+            name=category, marker=dict(color=color, line=dict(width=0)),
+            customdata=np.column_stack([subset['measure'], subset['abatement']]),
+            hovertemplate="<b>%{customdata[0]}</b><br>%{y:,.0f} 元/噸<br>減碳 %{customdata[1]:,.0f} 噸/年<extra></extra>",
+        ))
+    fig.add_hline(y=carbon_price, line_dash='dash', line_color='#e74c3c',
+                  annotation_text=f'碳費 {carbon_price:,} 元/噸', annotation_position='top left')
+    fig.update_layout(title='邊際減碳成本曲線 (MACC)', xaxis_title='累計減碳量 (噸/年)',
+                      yaxis_title='減碳成本 (元/噸)', bargap=0, height=450)
+    return fig
+
+
+def hazard_map_figure(background, sites, layer, grid):
+    """災害圖層底圖 + 據點（顏色為綜合暴露度）"""
+    info = physical_hazard.LAYERS[layer]
+    step = grid['res'] * MAP_STRIDE
+    fig = go.Figure(go.Heatmap(
+        z=background,
+        x=grid['lon0'] + (np.arange(background.shape[1]) + 0.5) * step,
+        y=grid['lat0'] + (np.arange(background.shape[0]) + 0.5) * step,
+        colorscale='Blues' if layer == 'flood' else 'OrRd', opacity=0.6,
+        colorbar=dict(title=f"{info['label']} {info['unit']}", x=1.0),
+        hovertemplate=f"{info['label']} %{{z:.1f}}{info['unit']}<extra></extra>",
+    ))
+    fig.add_trace(go.Scattergl(
+        x=sites['lon'], y=sites['lat'], mode='markers', name='據點',
+        marker=dict(size=6, color=sites['score'], colorscale='RdYlGn_r', cmin=0, cmax=1,
+                    line=dict(width=0.5, color='#333'),
+                    colorbar=dict(title='綜合暴露度', x=1.12)),
+        customdata=np.column_stack([sites['site'], sites['level']]),
+        hovertemplate="<b>%{customdata[0]}</b><br>綜合暴露度 %{marker.color:.2f}（%{customdata[1]}）<extra></extra>",
+    ))
+    fig.update_layout(height=600, xaxis_title='經度', yaxis_title='緯度', showlegend=False,
+                      yaxis=dict(scaleanchor='x', scaleratio=1.1))
+    return fig
+
+
+def hazard_level_figure(counts):
+    """各災害高 / 中 / 低暴露據點數"""
+    fig = go.Figure()
+    for level, color in zip(physical_hazard.LEVELS, ['#e74c3c', '#f39c12', '#2ecc71']):
+        fig.add_trace(go.Bar(x=counts.index, y=counts[level], name=f'{level}暴露', marker_color=color))
+    fig.update_layout(title='各災害暴露等級', yaxis_title='據點數', barmode='stack', height=400)
+    return fig
+
+
+def custom_scatter(df, x, y):
+    return px.scatter(df, x=x, y=y, title=f'{y} vs {x}', render_mode='webgl')
+
+
 # ============ 風險數據 ============
 risk_df = pd.DataFrame({
     'category': ['設備', '設備', '設備', '員工', '員工', '員工', '能源', '能源', '能源'],
@@ -59,78 +400,59 @@ solution_df = pd.DataFrame({
 if analysis_type == "風險矩陣":
     st.markdown("### 🎯 氣候風險矩陣")
     
+    # 資料來源：內建範例、上傳的風險登錄表，或模擬的大型登錄表
+    source = st.radio("資料來源", ["範例數據", "上傳風險登錄表 (CSV)", "模擬大型登錄表"], horizontal=True)
+    matrix_df = None
+    if source == "上傳風險登錄表 (CSV)":
+        register_file = st.file_uploader(
+            "CSV 需有 probability、impact_score 欄位；category、risk_type、cost_impact 為選填",
+            type=['csv'], key="risk_register"
+        )
+        if register_file is not None:
+            try:
+                matrix_df = load_risk_register(ingest_upload(register_file))
+            except ValueError as e:
+                st.error(f"❌ 無法讀取風險登錄表：{e}")
+    elif source == "模擬大型登錄表":
+        n_rows = st.select_slider("筆數", [1_000, 5_000, 10_000, 50_000, 200_000], value=50_000)
+        matrix_df = sample_risk_register(n_rows)
+    if matrix_df is None:
+        matrix_df = risk_matrix.prepare(risk_df)
+    
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # 建立風險矩陣圖
-        fig = px.scatter(
-            risk_df,
-            x='probability',
-            y='impact_score',
-            size='cost_impact',
-            color='category',
-            hover_name='risk_type',
-            hover_data={
-                'probability': ':.0%',
-                'impact_score': True,
-                'cost_impact': ':,.0f',
-                'mitigation_effectiveness': ':.0%'
-            },
-            labels={
-                'probability': '發生機率',
-                'impact_score': '影響程度 (1-10)',
-                'cost_impact': '潛在損失 (百萬元)',
-                'category': '風險類別',
-                'mitigation_effectiveness': '減緩有效性'
-            },
-            title='TCFD 氣候風險矩陣',
-            color_discrete_map={
-                '設備': '#e74c3c',
-                '員工': '#3498db',
-                '能源': '#2ecc71'
-            }
-        )
-        
-        # 添加風險區域
-        fig.add_shape(type="rect", x0=0.5, y0=7, x1=1.0, y1=10,
-                     fillcolor="red", opacity=0.1, line_width=0)
-        fig.add_shape(type="rect", x0=0, y0=7, x1=0.5, y1=10,
-                     fillcolor="orange", opacity=0.1, line_width=0)
-        fig.add_shape(type="rect", x0=0.5, y0=0, x1=1.0, y1=7,
-                     fillcolor="orange", opacity=0.1, line_width=0)
-        fig.add_shape(type="rect", x0=0, y0=0, x1=0.5, y1=7,
-                     fillcolor="green", opacity=0.1, line_width=0)
-        
-        fig.add_annotation(x=0.75, y=9, text="高風險區", showarrow=False, font=dict(color="red"))
-        fig.add_annotation(x=0.25, y=9, text="中高風險", showarrow=False, font=dict(color="orange"))
-        fig.add_annotation(x=0.75, y=3, text="中風險", showarrow=False, font=dict(color="orange"))
-        fig.add_annotation(x=0.25, y=3, text="低風險區", showarrow=False, font=dict(color="green"))
-        
-        fig.update_layout(
-            height=500,
-            xaxis=dict(range=[0, 1], tickformat='.0%'),
-            yaxis=dict(range=[0, 10])
-        )
-        
+        # 建立風險矩陣圖（大量資料時自動改為分箱熱圖）
+        fig = figure_cache.get("risk_matrix", risk_matrix.build_figure, matrix_df)
         st.plotly_chart(fig, use_container_width=True)
+        if len(matrix_df) > risk_matrix.BIN_THRESHOLD:
+            st.caption(f"資料超過 {risk_matrix.BIN_THRESHOLD:,} 筆，已在伺服器端分箱，顏色為每格風險筆數")
     
     with col2:
         st.markdown("#### 📊 風險摘要")
         
-        high_risk = risk_df[risk_df['impact_score'] >= 8]
-        st.error(f"🔴 高影響風險: {len(high_risk)} 項")
-        for _, row in high_risk.iterrows():
-            st.write(f"• {row['risk_type']} (損失: {row['cost_impact']}百萬)")
+        level_counts, zone_counts, top_high = risk_matrix.summarize(matrix_df)
+        st.error(f"🔴 高影響風險: {level_counts['高影響']:,} 項")
+        if len(top_high):
+            if level_counts['高影響'] > len(top_high):
+                st.caption(f"損失最高的 {len(top_high)} 項：")
+            st.markdown("  \n".join(
+                f"• {name} (損失: {cost:,.0f}百萬)"
+                for name, cost in zip(top_high['risk_type'], top_high['cost_impact'])
+            ))
         
-        medium_risk = risk_df[(risk_df['impact_score'] >= 5) & (risk_df['impact_score'] < 8)]
-        st.warning(f"🟠 中影響風險: {len(medium_risk)} 項")
+        st.warning(f"🟠 中影響風險: {level_counts['中影響']:,} 項")
         
-        low_risk = risk_df[risk_df['impact_score'] < 5]
-        st.success(f"🟢 低影響風險: {len(low_risk)} 項")
+        st.success(f"🟢 低影響風險: {level_counts['低影響']:,} 項")
         
         st.markdown("---")
-        st.metric("總潛在損失", f"{risk_df['cost_impact'].sum()} 百萬元")
-        st.metric("平均減緩效果", f"{risk_df['mitigation_effectiveness'].mean():.0%}")
+        st.metric("總潛在損失", f"{matrix_df['cost_impact'].sum():,.0f} 百萬元")
+        if 'mitigation_effectiveness' in matrix_df.columns:
+            st.metric("平均減緩效果", f"{matrix_df['mitigation_effectiveness'].mean():.0%}")
+        st.dataframe(
+            zone_counts.rename("筆數").rename_axis("區域").reset_index(),
+            hide_index=True, use_container_width=True
+        )
 
 # ============ 效益分析 ============
 elif analysis_type == "效益分析":
@@ -140,29 +462,7 @@ elif analysis_type == "效益分析":
     
     with col1:
         # 節能效益比較
-        fig_saving = go.Figure()
-        
-        fig_saving.add_trace(go.Bar(
-            name='節能效益',
-            x=solution_df['technology'],
-            y=solution_df['energy_saving_pct'],
-            marker_color='#3498db'
-        ))
-        
-        fig_saving.add_trace(go.Bar(
-            name='減碳效益',
-            x=solution_df['technology'],
-            y=solution_df['carbon_reduction_pct'],
-            marker_color='#2ecc71'
-        ))
-        
-        fig_saving.update_layout(
-            title='各方案節能減碳效益比較',
-            yaxis_title='百分比 (%)',
-            barmode='group',
-            height=400
-        )
-        
+        fig_saving = figure_cache.get("saving", saving_figure, solution_df)
         st.plotly_chart(fig_saving, use_container_width=True)
     
     with col2:
@@ -170,17 +470,7 @@ elif analysis_type == "效益分析":
         solution_df['annual_saving'] = solution_df['investment'] / solution_df['roi_years']
         solution_df['10yr_benefit'] = solution_df['annual_saving'] * 10 - solution_df['investment']
         
-        fig_roi = px.bar(
-            solution_df,
-            x='technology',
-            y=['investment', '10yr_benefit'],
-            title='投資與10年淨效益',
-            labels={'value': '金額 (百萬元)', 'technology': '技術方案'},
-            color_discrete_map={'investment': '#e74c3c', '10yr_benefit': '#2ecc71'},
-            barmode='group',
-            height=400
-        )
-        
+        fig_roi = figure_cache.get("roi", roi_figure, solution_df)
         st.plotly_chart(fig_roi, use_container_width=True)
     
     # 詳細數據表
@@ -205,6 +495,78 @@ elif analysis_type == "效益分析":
         st.success(f"🚀 最快回收: **{best_roi['technology']}** ({best_roi['roi_years']}年)")
     with col2:
         st.success(f"💎 最高效益: **{best_benefit['technology']}** (10年淨效益 {best_benefit['10yr_benefit']:.0f}百萬)")
+    
+    # 投資組合最佳化：候選方案多時，在資本預算內挑出 NPV 或減碳量最大的組合
+    st.markdown("---")
+    st.markdown("### 🧮 投資組合最佳化")
+    
+    source = st.radio("候選方案", ["上方三項方案", "上傳候選清單 (CSV)", "模擬多廠區候選"], horizontal=True)
+    source_key = ("base", 0)
+    if source == "上傳候選清單 (CSV)":
+        candidate_file = st.file_uploader(
+            "CSV 需有 investment、roi_years 欄位；technology、carbon_reduction_pct、baseline_emissions 為選填",
+            type=['csv'], key="portfolio_candidates"
+        )
+        if candidate_file is not None:
+            try:
+                source_key = ("upload", ingest_upload(candidate_file))
+            except ValueError as e:
+                st.error(f"❌ 無法讀取 CSV：{e}")
+    elif source == "模擬多廠區候選":
+        source_key = ("sample", st.select_slider("候選數", [100, 500, 1_000, 5_000, 20_000], value=1_000))
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        rate = st.number_input("折現率 (%)", 0.0, 30.0, 5.0, 0.5)
+    with col2:
+        horizon = st.number_input("評估年限", 1, 30, 10)
+    
+    try:
+        evaluated = evaluate_candidates(*source_key, rate, horizon)
+    except ValueError as e:
+        st.error(f"❌ 候選清單格式錯誤：{e}")
+        st.stop()
+    
+    with col3:
+        total_investment = float(evaluated['investment'].sum())
+        budget = st.number_input("資本預算 (百萬元)", 0.0, max(total_investment, 1.0),
+                                 round(total_investment * 0.3, 1), key=f"budget_{source_key}")
+    with col4:
+        objective_label = st.radio("最佳化目標", ["NPV", "減碳量"], horizontal=True)
+    objective = "npv" if objective_label == "NPV" else "abatement"
+    
+    start = time.perf_counter()
+    chosen, summary = portfolio_optimizer.optimize(evaluated, budget, objective=objective)
+    solve_ms = (time.perf_counter() - start) * 1000
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("選入方案", f"{summary['selected']:,} / {len(evaluated):,}")
+    col2.metric("使用預算", f"{summary['capex']:,.1f} 百萬", f"剩餘 {budget - summary['capex']:,.1f}")
+    col3.metric(f"組合 NPV ({horizon}年)", f"{summary['npv']:,.0f} 百萬")
+    abatement_unit = "噸/年" if "baseline_emissions" in evaluated.columns else "%"
+    col4.metric("組合減碳量", f"{summary['abatement']:,.0f} {abatement_unit}")
+    st.caption(f"⚡ {len(evaluated):,} 個候選：{'動態規劃' if summary['method'] == 'dp' else '貪婪法'}"
+               f" {solve_ms:.0f} ms | 與理論上界差距 {summary['gap']:.2%}")
+    
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        y_title = 'NPV (百萬元)' if objective == 'npv' else f'減碳量 ({abatement_unit})'
+        fig = figure_cache.get("portfolio", portfolio_figure, evaluated, chosen, objective=objective, y_title=y_title)
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        picked_df = evaluated[chosen].sort_values(objective, ascending=False)
+        columns = [c for c in ['technology', 'investment', 'npv', 'irr', 'abatement'] if c in picked_df.columns]
+        st.dataframe(
+            picked_df[columns].head(200).rename(columns={
+                'technology': '技術方案', 'investment': '投資(百萬)', 'npv': 'NPV(百萬)',
+                'irr': 'IRR', 'abatement': f'減碳({abatement_unit})'
+            }),
+            hide_index=True, use_container_width=True, height=400,
+            column_config={
+                'NPV(百萬)': st.column_config.NumberColumn(format="%.1f"),
+                'IRR': st.column_config.NumberColumn(format="percent"),
+            }
+        )
 
 # ============ 趨勢預測 ============
 elif analysis_type == "趨勢預測":
@@ -213,48 +575,38 @@ elif analysis_type == "趨勢預測":
     col1, col2 = st.columns([1, 2])
     
     with col1:
+        mode = st.radio("預測模式", ["單一成長率", "蒙地卡羅模擬"], horizontal=True)
         base_cost = st.number_input("基準年能源成本 (萬元)", value=1000, step=100)
         growth_rate = st.slider("年增長率 (%)", 0, 20, 5)
         tech_saving = st.slider("技術節能率 (%)", 0, 50, 25)
-        years = st.slider("預測年數", 5, 20, 10)
+        years = st.slider("預測年數", 5, 30 if mode == "蒙地卡羅模擬" else 20, 10)
+        if mode == "蒙地卡羅模擬":
+            growth_volatility = st.slider("能源價格年波動 (標準差 %)", 0.0, 10.0, 3.0, 0.5)
+            saving_uncertainty = st.slider("節能率不確定性 (標準差 %)", 0.0, 20.0, 5.0, 0.5)
+            n_paths = st.select_slider("模擬路徑數", [10_000, 20_000, 50_000, 100_000], value=10_000)
+    
+    # 年份軸
+    years_range = np.arange(datetime.now().year, datetime.now().year + years + 1)
     
     with col2:
-        # 生成預測數據
-        years_range = list(range(datetime.now().year, datetime.now().year + years + 1))
-        
-        # 不導入技術的成本
-        baseline = [base_cost * (1 + growth_rate/100) ** i for i in range(years + 1)]
-        
-        # 導入技術後的成本
-        with_tech = [base_cost * (1 - tech_saving/100) * (1 + growth_rate/100) ** i for i in range(years + 1)]
-        
-        # 累積節省
-        cumulative_saving = [sum(baseline[:i+1]) - sum(with_tech[:i+1]) for i in range(years + 1)]
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=years_range, y=baseline,
-            name='不導入技術',
-            line=dict(color='#e74c3c', dash='dash'),
-            fill=None
-        ))
-        
-        fig.add_trace(go.Scatter(
-            x=years_range, y=with_tech,
-            name='導入節能技術',
-            line=dict(color='#2ecc71'),
-            fill='tonexty',
-            fillcolor='rgba(46, 204, 113, 0.2)'
-        ))
-        
-        fig.update_layout(
-            title=f'{years}年能源成本趨勢預測',
-            xaxis_title='年份',
-            yaxis_title='能源成本 (萬元)',
-            height=400,
-            hovermode='x unified'
-        )
+        if mode == "單一成長率":
+            # 不導入技術 / 導入技術後的成本，累積節省以 cumsum 計算
+            projection = energy_projection.project(base_cost, growth_rate, tech_saving, years)
+            baseline = projection["baseline"]
+            with_tech = projection["with_tech"]
+            cumulative_saving = projection["cumulative_saving"]
+            title = f'{years}年能源成本趨勢預測'
+            fig = figure_cache.get("trend", trend_figure, years_range, title=title, projection=projection)
+        else:
+            bands, final_saving, sim_ms = simulate_energy_cost(
+                base_cost, growth_rate, growth_volatility, tech_saving, saving_uncertainty, years, n_paths
+            )
+            # 指標顯示中位數
+            baseline = bands["baseline"][50]
+            with_tech = bands["with_tech"][50]
+            cumulative_saving = bands["cumulative_saving"][50]
+            title = f'{years}年能源成本趨勢預測（{n_paths:,} 條路徑，P10 / P50 / P90）'
+            fig = figure_cache.get("trend", trend_figure, years_range, title=title, bands=bands)
         
         st.plotly_chart(fig, use_container_width=True)
     
@@ -281,6 +633,279 @@ elif analysis_type == "趨勢預測":
             f"{cumulative_saving[-1]:,.0f} 萬元",
             "總效益"
         )
+    
+    if mode == "蒙地卡羅模擬":
+        st.markdown(f"#### 🎲 {years}年累積節省分布")
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            fig = figure_cache.get("saving_histogram", saving_histogram, final_saving)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            saving_band = bands["cumulative_saving"]
+            st.metric("悲觀 (P10)", f"{saving_band[10][-1]:,.0f} 萬元")
+            st.metric("中位數 (P50)", f"{saving_band[50][-1]:,.0f} 萬元")
+            st.metric("樂觀 (P90)", f"{saving_band[90][-1]:,.0f} 萬元")
+        
+        st.caption(f"⚡ 模擬 {n_paths:,} 條路徑 × {years} 年：{sim_ms:.0f} ms（相同參數重繪時取快取）")
+
+# ============ 碳費試算 ============
+elif analysis_type == "碳費試算":
+    st.markdown("### 🏭 碳費試算")
+    st.caption(f"年排放量（範疇一 + 範疇二）達 {carbon_fee.THRESHOLD:,} 噸的廠區徵收，"
+               f"收費排放量扣除 {carbon_fee.DEDUCTION:,} 噸；費率與情境為試算假設")
+    
+    source = st.radio("排放盤查", ["範例廠區", "上傳排放盤查 (CSV)", "模擬多廠區"], horizontal=True)
+    source_key = ("sample", 12)
+    if source == "上傳排放盤查 (CSV)":
+        inventory_file = st.file_uploader(
+            "CSV 需有 scope1、scope2 欄位（tCO2e）；facility、reduction（年減量率 0~1）為選填",
+            type=['csv'], key="carbon_inventory"
+        )
+        if inventory_file is not None:
+            try:
+                source_key = ("upload", ingest_upload(inventory_file))
+            except ValueError as e:
+                st.error(f"❌ 無法讀取 CSV：{e}")
+    elif source == "模擬多廠區":
+        source_key = ("sample", st.select_slider("廠區數", [100, 500, 1_000, 5_000], value=1_000))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fee_years = st.slider("試算年數", 5, 30, 10)
+    with col2:
+        scenario = st.selectbox("報告情境", carbon_fee.SCENARIO_NAMES)
+    
+    try:
+        result, fee_ms = project_carbon_fee(*source_key, datetime.now().year, fee_years)
+    except ValueError as e:
+        st.error(f"❌ 排放盤查格式錯誤：{e}")
+        st.stop()
+    
+    totals = carbon_fee.annual_totals(result)
+    col1, col2, col3 = st.columns(3)
+    col1.metric(f"{result['years'][0]} 年碳費", f"{totals[scenario].iloc[0]:,.1f} 百萬元")
+    col2.metric(f"{fee_years} 年累計", f"{totals[scenario].sum():,.1f} 百萬元")
+    liable = result['liable'][:, 0, result['scenarios'].index(scenario)]
+    col3.metric("達徵收門檻廠區", f"{liable.sum():,} / {len(liable):,}")
+    
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        fig = figure_cache.get("fee_trend", fee_trend_figure, totals, highlight=scenario)
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        top = carbon_fee.facility_totals(result, scenario, top_n=15)
+        fig = figure_cache.get("facility_fee", facility_fee_figure, top)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("#### 📝 轉型風險表財務影響摘要")
+    st.info("  \n".join(carbon_fee.financial_notes(result, scenario)))
+    st.caption(f"⚡ {len(result['facilities']):,} 廠區 × {fee_years} 年 × {len(result['scenarios'])} 情境："
+               f"{fee_ms:.0f} ms | 一鍵生成 5 表時上傳同一份盤查，摘要會寫入「政策與法規」的潛在影響欄")
+
+# ============ 溫升情境 ============
+elif analysis_type == "溫升情境":
+    st.markdown("### 🌡️ 溫升情境財務影響")
+    st.caption("冷卻負載、高溫生產力損失兩項實體衝擊，相對基準年財務數字的增加成本（以共同能源價格計價）；"
+               "各情境能源價格走勢屬轉型面，另列不加總；係數為試算假設")
+    
+    source = st.radio("事業單位財務", ["範例事業單位", "上傳財務資料 (CSV)", "模擬多事業單位"], horizontal=True)
+    source_key = ("sample", 6)
+    if source == "上傳財務資料 (CSV)":
+        units_file = st.file_uploader(
+            "CSV 需有 revenue、energy_cost、labor_cost 欄位（百萬元）；unit、cooling_share、outdoor_share 為選填",
+            type=['csv'], key="temperature_units"
+        )
+        if units_file is not None:
+            try:
+                source_key = ("upload", ingest_upload(units_file))
+            except ValueError as e:
+                st.error(f"❌ 無法讀取 CSV：{e}")
+    elif source == "模擬多事業單位":
+        source_key = ("sample", st.select_slider("事業單位數", [100, 500, 1_000, 5_000], value=1_000))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        warming_years = st.slider("試算年數", 10, 30, 25)
+    with col2:
+        scenario = st.selectbox("明細情境", temperature_scenarios.SCENARIO_NAMES, index=1)
+    
+    try:
+        result, warming_ms = project_temperature_impact(*source_key, datetime.now().year, warming_years)
+    except ValueError as e:
+        st.error(f"❌ 財務資料格式錯誤：{e}")
+        st.stop()
+    
+    totals = temperature_scenarios.scenario_totals(result)
+    revenue = result['revenue'].sum()
+    cols = st.columns(len(totals.columns))
+    for col, name in zip(cols, totals.columns):
+        last = totals[name].iloc[-1]
+        col.metric(f"{name}：{result['years'][-1]} 年增加成本", f"{last:,.1f} 百萬元",
+                   f"營收 {last / revenue:.1%}" if revenue > 0 else None, delta_color="inverse")
+    
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        fig = figure_cache.get("warming_impact", warming_impact_figure, totals)
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        components = temperature_scenarios.component_totals(result)
+        fig = figure_cache.get("warming_components", warming_component_figure, components,
+                               year=int(result['years'][-1]))
+        st.plotly_chart(fig, use_container_width=True)
+        transition = temperature_scenarios.energy_price_totals(result)
+        st.caption(f"另計{temperature_scenarios.TRANSITION_LABEL}（{result['years'][-1]} 年，不含在上方合計）："
+                   + "、".join(f"{name} {value:,.1f} 百萬元" for name, value in transition.items()))
+    
+    st.markdown(f"#### 📋 事業單位明細（{scenario}，{result['years'][-1]} 年）")
+    units_df = temperature_scenarios.unit_totals(result, scenario)
+    column_config = {name: st.column_config.NumberColumn(format="%.2f")
+                     for name in list(temperature_scenarios.COMPONENT_LABELS.values())
+                     + ['合計(百萬)', temperature_scenarios.TRANSITION_LABEL]}
+    column_config['占營收'] = st.column_config.NumberColumn(format="percent")
+    st.dataframe(
+        units_df.head(200).rename(columns={'unit': '事業單位', 'total': '合計(百萬)', 'revenue_share': '占營收',
+                                           'transition': temperature_scenarios.TRANSITION_LABEL}),
+        hide_index=True, use_container_width=True, column_config=column_config
+    )
+    
+    st.markdown("#### 📝 溫升風險表財務影響摘要")
+    for row, points in temperature_scenarios.financial_notes(result).items():
+        st.info(f"**{row}**  \n" + "  \n".join(points))
+    st.caption(f"⚡ {len(result['units']):,} 事業單位 × {warming_years} 年 × {len(result['scenarios'])} 情境："
+               f"{warming_ms:.0f} ms | 一鍵生成 5 表時上傳同一份財務資料，摘要會寫入溫升風險表的潛在影響欄")
+
+# ============ 減碳成本曲線 ============
+elif analysis_type == "減碳成本曲線":
+    st.markdown("### 📉 邊際減碳成本曲線")
+    st.caption("每噸成本 = (投資年金化 + 每年營運成本變化) / 每年減碳量；負值代表減碳同時省錢")
+    
+    source = st.radio("減碳措施", ["範例措施", "上傳措施清單 (CSV)", "模擬大量措施"], horizontal=True)
+    source_key = ("sample", 30)
+    if source == "上傳措施清單 (CSV)":
+        measures_file = st.file_uploader(
+            "CSV 需有 capex（百萬元）、opex_delta（百萬元/年）、lifetime（年）、abatement（噸/年）欄位；"
+            "measure、category（能源效率提升 / 資源循環利用）為選填",
+            type=['csv'], key="macc_measures"
+        )
+        if measures_file is not None:
+            try:
+                source_key = ("upload", ingest_upload(measures_file))
+            except ValueError as e:
+                st.error(f"❌ 無法讀取 CSV：{e}")
+    elif source == "模擬大量措施":
+        source_key = ("sample", st.select_slider("措施數", [500, 1_000, 5_000, 10_000], value=1_000))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        rate = st.number_input("折現率 (%)", 0.0, 30.0, 5.0, 0.5)
+    with col2:
+        carbon_price = st.number_input("參考碳價 (元/噸)", 0, 10_000, 300, 50)
+    
+    try:
+        measures = load_macc_measures(*source_key)
+    except ValueError as e:
+        st.error(f"❌ 措施清單格式錯誤：{e}")
+        st.stop()
+    
+    start = time.perf_counter()
+    curve, updated = macc_curve(source_key, measures, rate)
+    curve_ms = (time.perf_counter() - start) * 1000
+    curve_df = curve.frame()
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("措施數", f"{len(curve):,}")
+    col2.metric("淨節省減碳量", f"{curve.abatement_below(0):,.0f} 噸/年", help="每噸成本為負的措施合計")
+    col3.metric(f"碳價 {carbon_price:,} 元以下減碳量", f"{curve.abatement_below(carbon_price):,.0f} 噸/年")
+    
+    fig = figure_cache.get("macc", macc_figure, curve_df, carbon_price=carbon_price)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"⚡ {'更新 ' + str(updated) + ' 項措施' if updated else '曲線'}：{curve_ms:.1f} ms")
+    
+    st.markdown("#### ✏️ 措施清單（可直接修改，曲線只重算修改的措施）")
+    st.data_editor(
+        measures[['measure', 'category'] + macc.NUMERIC_COLUMNS],
+        key=f"macc_editor_{source_key}", hide_index=True, use_container_width=True,
+        disabled=['measure', 'category'], num_rows="fixed", height=300,
+        column_config={
+            'measure': '措施', 'category': '類別',
+            'capex': st.column_config.NumberColumn('投資(百萬)', min_value=0.0),
+            'opex_delta': st.column_config.NumberColumn('營運成本變化(百萬/年)'),
+            'lifetime': st.column_config.NumberColumn('年限', min_value=1, step=1),
+            'abatement': st.column_config.NumberColumn('減碳(噸/年)', min_value=0.0),
+        }
+    )
+    
+    st.markdown("#### 📝 資源效率表潛在效益摘要")
+    for row, points in macc.financial_notes(curve, carbon_price=carbon_price).items():
+        st.info(f"**{row}**  \n" + "  \n".join(points))
+    st.caption("一鍵生成 5 表時上傳同一份措施清單，摘要會寫入資源效率表的潛在效益欄")
+
+# ============ 據點災害暴露 ============
+elif analysis_type == "據點災害暴露":
+    st.markdown("### 🗺️ 據點災害暴露")
+    st.caption("據點座標對照網格化災害圖層（淹水潛勢、高溫日數、乾旱指數）；未匯入圖層時使用範例圖層")
+    
+    source = st.radio("營運據點", ["範例據點", "上傳據點清單 (CSV)", "模擬大量據點"], horizontal=True)
+    source_key = ("sample", 300)
+    if source == "上傳據點清單 (CSV)":
+        sites_file = st.file_uploader(
+            "CSV 需有 lat、lon 欄位；site、asset_value（百萬元）為選填",
+            type=['csv'], key="hazard_sites"
+        )
+        if sites_file is not None:
+            try:
+                source_key = ("upload", ingest_upload(sites_file))
+            except ValueError as e:
+                st.error(f"❌ 無法讀取 CSV：{e}")
+    elif source == "模擬大量據點":
+        source_key = ("sample", st.select_slider("據點數", [1_000, 10_000, 50_000, 100_000], value=10_000))
+    
+    try:
+        scored, score_ms = score_sites(*source_key)
+    except ValueError as e:
+        st.error(f"❌ 據點清單格式錯誤：{e}")
+        st.stop()
+    
+    high = scored['level'] == physical_hazard.LEVELS[0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("據點數", f"{len(scored):,}")
+    col2.metric("高暴露據點", f"{high.sum():,}", f"{high.mean():.0%}" if len(scored) else None, delta_color="inverse")
+    col3.metric("高暴露資產", f"{scored.loc[high, 'asset_value'].sum():,.0f} 百萬元")
+    
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        grid = physical_hazard.load_grid()
+        available = [name for name in physical_hazard.LAYERS if physical_hazard.load_layer(name) is not None]
+        layer = st.selectbox("底圖圖層", available,
+                             format_func=lambda name: physical_hazard.LAYERS[name]['label'])
+        background = np.asarray(physical_hazard.load_layer(layer)[::MAP_STRIDE, ::MAP_STRIDE])
+        map_sites = scored.dropna(subset=['score'])
+        if len(map_sites) > MAP_MAX_POINTS:
+            map_sites = map_sites.sample(MAP_MAX_POINTS, random_state=0)
+            st.caption(f"據點多，地圖隨機抽樣 {MAP_MAX_POINTS:,} 點（統計仍用全部據點）")
+        fig = figure_cache.get("hazard_map", hazard_map_figure, background,
+                               map_sites[['site', 'lat', 'lon', 'score', 'level']], layer=layer, grid=grid)
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = figure_cache.get("hazard_levels", hazard_level_figure, physical_hazard.level_counts(scored))
+        st.plotly_chart(fig, use_container_width=True)
+        st.markdown("#### 🔴 暴露度最高據點")
+        st.dataframe(
+            scored.nlargest(20, 'score')[['site', 'score'] + list(physical_hazard.LAYERS) + ['asset_value']].rename(
+                columns={'site': '據點', 'score': '綜合暴露度', 'asset_value': '資產(百萬)'}
+                | {name: info['label'] for name, info in physical_hazard.LAYERS.items()}
+            ),
+            hide_index=True, use_container_width=True,
+            column_config={'綜合暴露度': st.column_config.NumberColumn(format="%.2f")}
+        )
+    
+    st.markdown("#### 📝 實體風險表潛在影響摘要")
+    for row, points in physical_hazard.financial_notes(scored).items():
+        st.info(f"**{row}**  \n" + "  \n".join(points))
+    st.caption(f"⚡ {len(scored):,} 個據點 × {len(physical_hazard.LAYERS)} 個圖層評分：{score_ms:.0f} ms"
+               " | 一鍵生成 5 表時上傳同一份據點清單，摘要會寫入實體風險表的潛在影響欄")
 
 # ============ 自訂數據 ============
 elif analysis_type == "自訂數據":
@@ -291,11 +916,21 @@ elif analysis_type == "自訂數據":
     uploaded_file = st.file_uploader("上傳 CSV 檔案", type=['csv'])
     
     if uploaded_file is not None:
-        custom_df = pd.read_csv(uploaded_file)
-        st.dataframe(custom_df, use_container_width=True)
+        # CSV 只在第一次上傳時解析並轉存 Parquet，之後換軸只讀需要的欄位
+        try:
+            digest = ingest_upload(uploaded_file)
+        except ValueError as e:
+            st.error(f"❌ 無法讀取 CSV：{e}")
+            st.stop()
+        meta = csv_ingest.info(digest)
+        st.caption(f"📦 {meta['rows']:,} 筆 × {len(meta['columns'])} 欄"
+                   f" | Parquet 快取 {meta['size'] / 1024 / 1024:.1f} MB")
+        st.dataframe(load_csv_columns(digest, limit=PREVIEW_ROWS), use_container_width=True)
+        if meta['rows'] > PREVIEW_ROWS:
+            st.caption(f"僅顯示前 {PREVIEW_ROWS:,} 筆")
         
-        # 自動偵測數值欄位
-        numeric_cols = custom_df.select_dtypes(include=[np.number]).columns.tolist()
+        # 自動偵測數值欄位（由 Parquet schema 判斷，不需載入資料）
+        numeric_cols = meta['numeric_columns']
         
         if len(numeric_cols) >= 2:
             col1, col2 = st.columns(2)
@@ -304,7 +939,11 @@ elif analysis_type == "自訂數據":
             with col2:
                 y_col = st.selectbox("Y 軸", numeric_cols, index=1 if len(numeric_cols) > 1 else 0)
             
-            fig = px.scatter(custom_df, x=x_col, y=y_col, title=f'{y_col} vs {x_col}')
+            plot_df = load_csv_columns(digest, tuple(dict.fromkeys([x_col, y_col])))
+            if len(plot_df) > SCATTER_MAX_POINTS:
+                plot_df = plot_df.sample(SCATTER_MAX_POINTS, random_state=0)
+                st.caption(f"資料量大，隨機抽樣 {SCATTER_MAX_POINTS:,} 點繪圖")
+            fig = figure_cache.get("custom_scatter", custom_scatter, plot_df, x=x_col, y=y_col)
             st.plotly_chart(fig, use_container_width=True)
     else:
         st.markdown("#### 使用範例數據")
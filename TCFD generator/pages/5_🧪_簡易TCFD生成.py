@@ -5,7 +5,7 @@ TCFD 報告生成器 (CSV 格式)
 """
 
 import streamlit as st
-import anthropic
+import sys
 from datetime import datetime
 from pathlib import Path
 from pptx import Presentation
@@ -14,6 +14,12 @@ from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
 
+sys.path.append(str(Path(__file__).parent.parent))
+import llm_client
+import llm_telemetry
+import rate_limiter
+import singleflight
+
 # Output 路徑
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -57,16 +63,29 @@ if st.button("🚀 生成 TCFD 報告", type="primary", use_container_width=True
 只輸出這 3 行，不要其他文字：'''
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = llm_client.get_client(api_key)
         
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1024,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        def ask_llm():
+            with llm_telemetry.track("簡易TCFD生成", "claude-sonnet-4-20250514", industry,
+                                     retries=rate_limiter.current_attempt()) as llm_call:
+                response = client.messages.create(
+                    model="claude-sonnet-4-20250514",
+                    max_tokens=1024,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=llm_client.CREATE_TIMEOUT,
+                )
+                llm_call.set_response(response)
+            return response.content[0].text.strip(), llm_call
         
-        llm_response = response.content[0].text.strip()
-        st.success("✅ Step 1 完成：LLM 已回應")
+        # 其他人同時送出相同產業時，共用同一次 LLM 呼叫；API 額度滿了就排隊
+        queue_status = st.empty()
+        key = singleflight.make_key("簡易TCFD生成", "claude-sonnet-4-20250514", prompt, max_tokens=1024)
+        (llm_response, llm_call), shared = singleflight.do(
+            key, lambda report: rate_limiter.call(api_key, "claude-sonnet-4-20250514", ask_llm, on_wait=report),
+            on_wait=lambda position, eta: queue_status.info(rate_limiter.describe_wait(position, eta))
+        )
+        queue_status.empty()
+        st.success("✅ Step 1 完成：LLM 已回應" + ("（與同時送出的相同請求共用）" if shared else ""))
         
         # 顯示原始回應
         with st.expander("🔍 LLM 原始回應"):
@@ -94,6 +113,7 @@ if st.button("🚀 生成 TCFD 報告", type="primary", use_container_width=True
                         'Actions': parts[2].strip()
                     })
         
+        llm_call.mark_parsed(len(risks) > 0)
         st.success(f"✅ Step 2 完成：解析到 {len(risks)} 個風險項目")
         
         # 顯示解析結果
@@ -110,6 +130,7 @@ if st.button("🚀 生成 TCFD 報告", type="primary", use_container_width=True
             st.stop()
         
     except Exception as e:
+        llm_call.mark_parsed(False)
         st.error(f"❌ 解析失敗: {e}")
         st.code(llm_response)
         st.stop()
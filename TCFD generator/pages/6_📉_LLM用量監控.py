@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+LLM 用量監控
+各頁面 LLM 呼叫的延遲、成本與失敗率（資料來源：llm_telemetry）
+"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import llm_telemetry
+import rate_limiter
+import singleflight
+
+st.set_page_config(
+    page_title="LLM 用量監控",
+    page_icon="📉",
+    layout="wide"
+)
+
+# 時間範圍 -> (秒數, 趨勢圖的時間粒度)
+TIME_RANGES = {
+    "最近 24 小時": (24 * 3600, "1h"),
+    "最近 7 天": (7 * 24 * 3600, "6h"),
+    "最近 30 天": (30 * 24 * 3600, "1D"),
+    "全部": (None, "1D"),
+}
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def load_calls(since):
+    df = llm_telemetry.load_calls(since)
+    # 衍生欄位一次算好，後續都是整欄運算
+    df["failed"] = df["error"].notna()
+    df["parse_checked"] = df["parse_ok"].notna()
+    df["parse_failed"] = df["parse_ok"].eq(0)
+    df["industry"] = df["industry"].fillna("未標記")
+    return df
+
+
+# ============ 側邊欄 ============
+with st.sidebar:
+    st.markdown("### 🔗 快速連結")
+    st.page_link("app.py", label="🏠 首頁")
+    st.page_link("pages/2_🤖_Claude_AI助手.py", label="🤖 Claude AI 助手")
+    st.page_link("pages/4_🏭_TCFD報告生成器.py", label="🏭 TCFD 報告生成器")
+
+    st.divider()
+
+    st.markdown("### 🔎 篩選")
+    range_label = st.selectbox("時間範圍", list(TIME_RANGES), index=1)
+    if st.button("🔄 重新整理", use_container_width=True):
+        load_calls.clear()
+
+seconds, freq = TIME_RANGES[range_label]
+# 取整到分鐘，讓快取在 ttl 內可以命中
+since = (int(time.time()) // 60 * 60 - seconds) if seconds else None
+calls = load_calls(since)
+
+st.title("📉 LLM 用量監控")
+st.caption("延遲 p50/p95 | 各產業成本 | 失敗率趨勢")
+
+if calls.empty:
+    st.info("目前還沒有 LLM 呼叫紀錄，使用 AI 助手或報告生成器後再回來查看。")
+    st.stop()
+
+with st.sidebar:
+    pages = st.multiselect("頁面", sorted(calls["page"].unique()))
+    models = st.multiselect("模型", sorted(calls["model"].unique()))
+
+df = calls
+if pages:
+    df = df[df["page"].isin(pages)]
+if models:
+    df = df[df["model"].isin(models)]
+if df.empty:
+    st.warning("篩選後沒有資料")
+    st.stop()
+
+ok = df[~df["failed"]]
+
+# ============ 總覽 ============
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("呼叫次數", f"{len(df):,}")
+col2.metric("總成本", f"${df['cost_usd'].sum():.4f}")
+col3.metric("延遲 p50 / p95",
+            f"{ok['latency_s'].quantile(0.5):.1f}s / {ok['latency_s'].quantile(0.95):.1f}s" if len(ok) else "-")
+col4.metric("API 失敗率", f"{df['failed'].mean():.1%}")
+parse_checked = df["parse_checked"].sum()
+col5.metric("解析失敗率", f"{df['parse_failed'].sum() / parse_checked:.1%}" if parse_checked else "-",
+            help="只計算有要求結構化輸出的呼叫")
+
+# 重複請求合併：只記在本程序記憶體，重啟後歸零
+flights = singleflight.stats()
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("合併共用", f"{flights['shared']:,}",
+            help="同時送出的相同請求直接共用另一個 session 的結果，未再呼叫 API（本程序啟動以來）")
+col2.metric("實際執行", f"{flights['executed']:,}")
+col3.metric("合併比例", f"{flights['shared'] / (flights['shared'] + flights['executed']):.1%}"
+            if flights["executed"] else "-")
+col4.metric("進行中", flights["inflight"])
+limiter = rate_limiter.stats()
+col5.metric("排隊中 / 429 退避", f"{limiter['queued']} / {limiter['throttled']}",
+            help="等待 API 額度的請求數，以及收到 429 後退避的次數（本程序啟動以來）")
+
+st.divider()
+
+# ============ 依頁面 / 模型 ============
+st.markdown("### ⏱️ 延遲與用量（依頁面 / 模型）")
+groups = df.groupby(["page", "model"])
+latency = ok.groupby(["page", "model"])["latency_s"].quantile([0.5, 0.95]).unstack().reindex(columns=[0.5, 0.95])
+latency.columns = ["延遲 p50 (s)", "延遲 p95 (s)"]
+ttft = ok.groupby(["page", "model"])["ttft_s"].median().rename("首字 p50 (s)")
+summary = pd.concat([
+    groups.size().rename("呼叫次數"),
+    latency,
+    ttft,
+    groups[["input_tokens", "output_tokens", "cache_read_tokens"]].sum().rename(columns={
+        "input_tokens": "輸入 tokens", "output_tokens": "輸出 tokens", "cache_read_tokens": "快取讀取 tokens"
+    }),
+    groups["retries"].sum().rename("重試次數"),
+    groups["failed"].mean().rename("失敗率"),
+    groups["cost_usd"].sum().rename("成本 (USD)"),
+], axis=1).reset_index().rename(columns={"page": "頁面", "model": "模型"})
+st.dataframe(
+    summary,
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "延遲 p50 (s)": st.column_config.NumberColumn(format="%.2f"),
+        "延遲 p95 (s)": st.column_config.NumberColumn(format="%.2f"),
+        "首字 p50 (s)": st.column_config.NumberColumn(format="%.2f"),
+        "失敗率": st.column_config.NumberColumn(format="percent"),
+        "成本 (USD)": st.column_config.NumberColumn(format="$%.4f"),
+    }
+)
+
+# ============ 各產業成本 ============
+col1, col2 = st.columns(2)
+with col1:
+    st.markdown("### 🏭 各產業成本")
+    by_industry = df.groupby("industry").agg(
+        cost=("cost_usd", "sum"), calls=("id", "size")
+    ).sort_values("cost", ascending=True).tail(15).reset_index()
+    fig = px.bar(by_industry, x="cost", y="industry", orientation="h", text="calls",
+                 labels={"cost": "成本 (USD)", "industry": "產業", "calls": "呼叫次數"})
+    fig.update_traces(texttemplate="%{text} 次", textposition="outside")
+    fig.update_layout(height=420, margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+
+with col2:
+    st.markdown("### 💰 成本組成")
+    # 每個模型查一次價格，再對齊到每一列
+    prices = pd.DataFrame.from_dict(
+        {m: llm_telemetry.price_for(m) or {} for m in df["model"].unique()}, orient="index"
+    ).reindex(columns=["input", "output", "cache_read", "cache_write"]).fillna(0)
+    rates = prices.reindex(df["model"]).set_axis(df.index)
+    parts = pd.Series({
+        "輸入": (df["input_tokens"] * rates["input"]).sum(),
+        "輸出": (df["output_tokens"] * rates["output"]).sum(),
+        "快取讀取": (df["cache_read_tokens"] * rates["cache_read"]).sum(),
+        "快取寫入": (df["cache_write_tokens"] * rates["cache_write"]).sum(),
+    }) / 1_000_000
+    fig = px.pie(names=parts.index, values=parts.values, hole=0.45)
+    fig.update_layout(height=420, margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+
+# ============ 趨勢 ============
+st.markdown("### 📈 趨勢")
+binned = df.resample(freq, on="time")
+trend = pd.DataFrame({
+    "呼叫次數": binned["id"].size(),
+    "API 失敗率": binned["failed"].mean(),
+    "解析失敗率": binned["parse_failed"].sum() / binned["parse_checked"].sum().replace(0, float("nan")),
+})
+latency_trend = ok.resample(freq, on="time")["latency_s"].quantile([0.5, 0.95]).unstack().reindex(columns=[0.5, 0.95])
+latency_trend.columns = ["p50", "p95"]
+
+col1, col2 = st.columns(2)
+with col1:
+    fig = px.line(trend[["API 失敗率", "解析失敗率"]], markers=True,
+                  labels={"value": "失敗率", "time": "時間", "variable": ""})
+    fig.update_layout(height=360, yaxis_tickformat=".0%", margin=dict(l=10, r=10, t=30, b=10),
+                      title="失敗率")
+    st.plotly_chart(fig, use_container_width=True)
+with col2:
+    fig = px.line(latency_trend, markers=True, labels={"value": "延遲 (s)", "time": "時間", "variable": ""})
+    fig.update_layout(height=360, margin=dict(l=10, r=10, t=30, b=10), title="延遲 p50 / p95")
+    st.plotly_chart(fig, use_container_width=True)
+
+# ============ 最近失敗 ============
+failures = df[df["failed"] | df["parse_failed"]].sort_values("ts", ascending=False).head(20)
+if not failures.empty:
+    with st.expander(f"⚠️ 最近失敗（{len(failures)} 筆）"):
+        st.dataframe(
+            failures[["time", "page", "model", "industry", "retries", "parse_ok", "error"]],
+            hide_index=True,
+            use_container_width=True
+        )
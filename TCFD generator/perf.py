@@ -0,0 +1,25 @@
+"""
+重繪耗時量測 - 記錄各區塊（fragment）每次執行的時間
+"""
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+TIMINGS_KEY = "_rerun_timings"
+
+
+@contextmanager
+def timed_section(name, show=True):
+    """
+    量測區塊執行時間（毫秒），存到 session_state。
+    show=True 時在區塊末尾顯示本次耗時；寫在區塊（fragment）裡面，
+    只重跑 fragment 時也會跟著更新
+    """
+    start = time.perf_counter()
+    yield
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    timings = st.session_state.setdefault(TIMINGS_KEY, {})
+    timings[name] = elapsed_ms
+    if show:
+        st.caption(f"⏱️ {name} 重繪 {elapsed_ms:.1f} ms")
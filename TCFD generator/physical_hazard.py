@@ -0,0 +1,285 @@
+"""
+實體風險據點評分 - 據點經緯度對照網格化災害圖層（淹水、高溫日數、乾旱），算出各據點暴露度
+圖層存成 .npy 以 memory map 讀取，多個 session 共用作業系統的頁快取，不各自載入記憶體
+實際災害資料以 import_layers 匯入（連同網格整批取代）；尚未匯入時使用合成的範例圖層
+所有圖層共用同一個規則經緯度網格，最近網格以座標直接換算索引（O(1)，不需要 KD-tree）
+據點欄位：lat、lon；site、asset_value（百萬元）為選填
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HAZARD_DIR = Path(__file__).parent / "cache" / "hazard"
+HAZARD_DIR.mkdir(parents=True, exist_ok=True)
+GRID_FILE = HAZARD_DIR / "grid.json"
+
+REQUIRED_COLUMNS = ["lat", "lon"]
+# 圖層：單位、視為滿分（1.0）的數值、權重、對應實體風險表的列
+LAYERS = {
+    "flood": {"label": "淹水潛勢", "unit": "m", "full": 2.0, "weight": 0.4, "row": "極端氣候事件"},
+    "heat_days": {"label": "高溫日數", "unit": "天/年", "full": 60.0, "weight": 0.35, "row": "長期氣候變遷"},
+    "drought": {"label": "乾旱指數", "unit": "", "full": 1.0, "weight": 0.25, "row": "長期氣候變遷"},
+}
+LEVELS = ["高", "中", "低"]
+HIGH, MEDIUM = 0.6, 0.3       # 暴露度分級門檻
+SEARCH_RADIUS = 5             # 落在無資料格（海上）時往外找有效網格的格數
+
+# 範例圖層範圍（台灣本島附近）與解析度
+SAMPLE_GRID = {"lat0": 21.8, "lon0": 119.3, "res": 0.01, "shape": [360, 290]}
+
+_layers = {}                  # 圖層名稱 -> (檔案識別, memmap)
+_lock = threading.Lock()
+
+
+# ============ 圖層 ============
+def _write_atomic(path, write):
+    """先寫暫存檔再改名，其他 session 不會讀到寫一半的檔案"""
+    fd, tmp = tempfile.mkstemp(dir=HAZARD_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _check_shape(name, values, grid):
+    values = np.asarray(values, dtype=np.float32)
+    if list(values.shape) != list(grid["shape"]):
+        raise ValueError(f"圖層 {name} 形狀 {values.shape} 與網格 {grid['shape']} 不符")
+    return values
+
+
+def import_layers(layers, grid):
+    """
+    以新網格整批取代圖層（例如由 GeoTIFF 轉出的陣列）：layers 為 {圖層名稱: 陣列}，
+    陣列形狀須等於 grid["shape"]，第 0 列為最南緯度 lat0，無資料處為 NaN。
+    舊網格上沒有一起匯入的圖層會刪除（評分時視為無資料）
+    """
+    unknown = [name for name in layers if name not in LAYERS]
+    if unknown:
+        raise ValueError(f"未知的圖層：{', '.join(unknown)}")
+    arrays = {name: _check_shape(name, values, grid) for name, values in layers.items()}
+    with _lock:
+        for name, values in arrays.items():
+            _write_atomic(HAZARD_DIR / f"{name}.npy", lambda f, values=values: np.save(f, values))
+        for name in LAYERS:
+            if name not in arrays:
+                (HAZARD_DIR / f"{name}.npy").unlink(missing_ok=True)
+        # 網格最後寫，讀取端拿到新網格時圖層都已就位
+        _write_atomic(GRID_FILE, lambda f: f.write(json.dumps(grid).encode()))
+        _layers.clear()
+
+
+def save_layer(name, values, grid):
+    """在現有網格上新增或更新單一圖層；要換網格請用 import_layers"""
+    if not GRID_FILE.exists():
+        return import_layers({name: values}, grid)
+    if load_grid() != grid:
+        raise ValueError("圖層網格與現有網格不同，請用 import_layers 整批取代")
+    if name not in LAYERS:
+        raise ValueError(f"未知的圖層：{name}")
+    values = _check_shape(name, values, grid)
+    with _lock:
+        _write_atomic(HAZARD_DIR / f"{name}.npy", lambda f: np.save(f, values))
+        _layers.pop(name, None)
+
+
+def load_grid():
+    return json.loads(GRID_FILE.read_text())
+
+
+def load_layer(name):
+    """
+    以唯讀 memory map 開啟圖層；檔案被其他程序換掉時重新開啟。
+    圖層不存在（匯入時沒有提供）回傳 None
+    """
+    path = HAZARD_DIR / f"{name}.npy"
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    ident = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        cached = _layers.get(name)
+        if cached is None or cached[0] != ident:
+            cached = _layers[name] = (ident, np.load(path, mmap_mode="r"))
+        return cached[1]
+
+
+def ensure_layers():
+    """還沒有任何網格時產生範例圖層；已匯入的網格（即使缺部分圖層）不會被範例覆蓋"""
+    if not GRID_FILE.exists():
+        import_layers(sample_layers(), SAMPLE_GRID)
+    return load_grid()
+
+
+def sample_layers(grid=SAMPLE_GRID, seed=0):
+    """範例圖層：以橢圓近似本島陸地，西部低地淹水潛勢高、南部高溫與乾旱較嚴重、中央山區較低"""
+    rng = np.random.default_rng(seed)
+    rows, cols = grid["shape"]
+    lat = grid["lat0"] + (np.arange(rows) + 0.5)[:, None] * grid["res"]
+    lon = grid["lon0"] + (np.arange(cols) + 0.5)[None, :] * grid["res"]
+    # 旋轉約 18 度的橢圓
+    u = (lon - 120.95) * np.cos(0.31) - (lat - 23.7) * np.sin(0.31)
+    v = (lon - 120.95) * np.sin(0.31) + (lat - 23.7) * np.cos(0.31)
+    land = (u / 0.62) ** 2 + (v / 1.85) ** 2 <= 1
+    mountain = np.clip(1 - np.abs(u + 0.05) / 0.45, 0, 1) * np.clip(1 - np.abs(v) / 1.6, 0, 1)
+    south = np.clip((24.8 - lat) / 3.0, 0, 1)
+
+    def noise(scale):
+        return rng.normal(0, scale, (rows, cols)).astype(np.float32)
+
+    layers = {
+        "flood": np.clip(1.6 * (1 - mountain) * np.clip(-u / 0.6 + 0.4, 0, 1) + noise(0.25), 0, None),
+        "heat_days": np.clip(15 + 45 * south * (1 - mountain) + noise(4), 0, None),
+        "drought": np.clip(0.2 + 0.6 * south - 0.2 * mountain + noise(0.05), 0, 1),
+    }
+    return {name: np.where(land, values, np.nan) for name, values in layers.items()}
+
+
+# ============ 評分 ============
+def prepare(df):
+    """檢查欄位並補上選填欄位；缺少必要欄位時拋出 ValueError"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少欄位：{', '.join(missing)}")
+    df = df.copy()
+    for col in REQUIRED_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+    if "site" not in df.columns:
+        df["site"] = "據點 " + pd.Series(np.arange(1, len(df) + 1), index=df.index).astype(str)
+    if "asset_value" not in df.columns:
+        df["asset_value"] = 0.0
+    df["asset_value"] = pd.to_numeric(df["asset_value"], errors="coerce").fillna(0.0)
+    return df.reset_index(drop=True)
+
+
+def cell_index(lat, lon, grid):
+    """座標 -> 最近網格 (列, 欄)；超出範圍的回傳 -1"""
+    rows, cols = grid["shape"]
+    r = np.floor((np.asarray(lat, dtype=float) - grid["lat0"]) / grid["res"]).astype(np.int64)
+    c = np.floor((np.asarray(lon, dtype=float) - grid["lon0"]) / grid["res"]).astype(np.int64)
+    outside = (r < 0) | (r >= rows) | (c < 0) | (c >= cols)
+    return np.where(outside, -1, r), np.where(outside, -1, c)
+
+
+def _offsets(radius):
+    """搜尋半徑內的位移，依距離由近到遠"""
+    dr, dc = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    order = np.argsort(dr.ravel() ** 2 + dc.ravel() ** 2, kind="stable")
+    return dr.ravel()[order], dc.ravel()[order]
+
+
+def lookup(layer, rows, cols, radius=SEARCH_RADIUS):
+    """
+    取各據點所在網格的值；落在無資料格（海岸線外、範圍邊緣）的據點，
+    改取 radius 格內最近的有效網格，仍找不到則為 NaN
+    """
+    n_rows, n_cols = layer.shape
+    values = np.full(len(rows), np.nan, dtype=np.float32)
+    inside = rows >= 0
+    values[inside] = layer[rows[inside], cols[inside]]
+    pending = np.flatnonzero(np.isnan(values) & inside)
+    for dr, dc in zip(*_offsets(radius)):
+        if not len(pending):
+            break
+        r = np.clip(rows[pending] + dr, 0, n_rows - 1)
+        c = np.clip(cols[pending] + dc, 0, n_cols - 1)
+        found = layer[r, c]
+        ok = ~np.isnan(found)
+        values[pending[ok]] = found[ok]
+        pending = pending[~ok]
+    return values
+
+
+def score(assets):
+    """
+    每個據點補上各圖層數值、0~1 暴露度（{圖層}_score）、加權綜合暴露度（score）與等級（level）
+    """
+    grid = ensure_layers()
+    df = prepare(assets)
+    rows, cols = cell_index(df["lat"].to_numpy(), df["lon"].to_numpy(), grid)
+    total = np.zeros(len(df))
+    weights = np.zeros(len(df))
+    for name, layer in LAYERS.items():
+        data = load_layer(name)
+        if data is None or list(data.shape) != list(grid["shape"]):
+            # 缺少的圖層（或正在換網格）視為無資料
+            values = np.full(len(df), np.nan, dtype=np.float32)
+        else:
+            values = lookup(data, rows, cols)
+        df[name] = values
+        exposure = np.clip(values / layer["full"], 0, 1)
+        df[f"{name}_score"] = exposure
+        # 沒有資料的圖層不計入該據點的加權
+        valid = ~np.isnan(exposure)
+        total += np.where(valid, exposure, 0.0) * layer["weight"]
+        weights += valid * layer["weight"]
+    df["score"] = np.divide(total, weights, out=np.full(len(df), np.nan), where=weights > 0)
+    df["level"] = np.select([df["score"] >= HIGH, df["score"] >= MEDIUM, df["score"] >= 0], LEVELS, default="無資料")
+    return df
+
+
+def level_counts(scored):
+    """各圖層的高 / 中 / 低暴露據點數（DataFrame：index 為圖層、欄為等級）"""
+    counts = {}
+    for name, layer in LAYERS.items():
+        exposure = scored[f"{name}_score"].to_numpy()
+        levels = np.select([exposure >= HIGH, exposure >= MEDIUM, exposure >= 0], LEVELS, default="無資料")
+        counts[layer["label"]] = pd.Series(levels).value_counts().reindex(LEVELS, fill_value=0)
+    return pd.DataFrame(counts).T
+
+
+def financial_notes(scored):
+    """實體風險表各列的摘要：{列名: [摘要, ...]}"""
+    n = len(scored)
+    value = scored["asset_value"].sum()
+    notes = {}
+    for name, layer in LAYERS.items():
+        if scored[name].isna().all():
+            continue
+        high = scored[f"{name}_score"] >= HIGH
+        text = (f"{layer['label']}：{high.sum():,} / {n:,} 個據點屬高暴露"
+                f"（平均 {scored[name].mean():,.1f}{layer['unit']}）")
+        if value > 0:
+            exposed = scored.loc[high, "asset_value"].sum()
+            text += f"，涉及資產 {exposed:,.0f} 百萬元（{exposed / value:.0%}）"
+        notes.setdefault(layer["row"], []).append(text)
+    return notes
+
+
+def sample_assets(n, seed=0):
+    """產生 n 筆模擬據點（從第一個可用圖層的有效網格抽樣）"""
+    rng = np.random.default_rng(seed)
+    grid = ensure_layers()
+    layer = next((data for data in map(load_layer, LAYERS) if data is not None), None)
+    if layer is None:
+        layer = np.zeros(grid["shape"], dtype=np.float32)
+    land_rows, land_cols = np.nonzero(~np.isnan(layer))
+    pick = rng.integers(0, len(land_rows), n)
+    return pd.DataFrame({
+        "site": np.char.add("據點-", np.arange(1, n + 1).astype(str)),
+        "lat": (grid["lat0"] + (land_rows[pick] + rng.random(n)) * grid["res"]).round(5),
+        "lon": (grid["lon0"] + (land_cols[pick] + rng.random(n)) * grid["res"]).round(5),
+        "asset_value": rng.lognormal(4, 1.0, n).round(1),
+    })
+
+
+if __name__ == "__main__":
+    import time
+
+    assets = sample_assets(100_000)
+    start = time.perf_counter()
+    scored = score(assets)
+    print(f"{len(scored):,} 個據點評分：{(time.perf_counter() - start) * 1000:.0f} ms")
+    print(level_counts(scored))
+    for row, points in financial_notes(scored).items():
+        print(row, points)
@@ -0,0 +1,203 @@
+"""
+節能方案投資組合最佳化 - 批次計算 NPV / IRR，在資本預算內挑出 NPV 或減碳量最大的組合
+候選表欄位與 solution_df 相同：technology、investment（百萬元）、energy_saving_pct、carbon_reduction_pct、roi_years
+年效益沿用頁面的估法：investment / roi_years，評估期間內每年相同
+"""
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = ["investment", "roi_years"]
+DP_RESOLUTION = 2000          # 動態規劃至少把預算切成幾格
+DP_MAX_RESOLUTION = 50_000
+DP_MAX_CELLS = 20_000_000     # 候選數 x 格數上限（取捨表記憶體），超過就只用貪婪法
+
+
+def annuity_factor(rate, years):
+    """每年 1 元、共 years 年的現值係數（rate、years 可為陣列）"""
+    rate = np.asarray(rate, dtype=float)
+    years = np.asarray(years, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = (1 - (1 + rate) ** -years) / rate
+    return np.where(np.abs(rate) < 1e-12, years, factor)
+
+
+def npv(investment, annual_saving, rate, years):
+    """淨現值：每年效益折現加總 - 期初投資（陣列運算）"""
+    return np.asarray(annual_saving) * annuity_factor(rate, years) - np.asarray(investment)
+
+
+def irr(investment, annual_saving, years, lo=-0.99, hi=10.0, iterations=60):
+    """
+    內部報酬率：所有候選同時二分搜尋，解 annual x 現值係數(irr) = investment。
+    評估期間內回收不了（或效益 <= 0）的回傳 NaN
+    """
+    investment = np.asarray(investment, dtype=float)
+    annual_saving = np.asarray(annual_saving, dtype=float)
+    low = np.full(investment.shape, lo)
+    high = np.full(investment.shape, hi)
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        # NPV 隨折現率遞減：NPV > 0 表示 IRR 比 mid 高
+        positive = annual_saving * annuity_factor(mid, years) > investment
+        low = np.where(positive, mid, low)
+        high = np.where(positive, high, mid)
+    result = (low + high) / 2
+    solvable = (annual_saving > 0) & (annual_saving * years > investment)
+    return np.where(solvable, result, np.nan)
+
+
+def evaluate(candidates, rate=0.05, years=10, baseline_emissions=None):
+    """
+    補上 annual_saving、npv、irr、abatement 欄位。
+    abatement：有 baseline_emissions（噸/年）欄位或參數時為每年減碳噸數，否則為減碳百分比
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in candidates.columns]
+    if missing:
+        raise ValueError(f"缺少欄位：{', '.join(missing)}")
+    df = candidates.copy()
+    investment = pd.to_numeric(df["investment"], errors="coerce").to_numpy(dtype=float)
+    roi_years = pd.to_numeric(df["roi_years"], errors="coerce").to_numpy(dtype=float)
+    df["annual_saving"] = np.divide(investment, roi_years, out=np.zeros_like(investment), where=roi_years > 0)
+    df["npv"] = npv(investment, df["annual_saving"].to_numpy(), rate, years)
+    df["irr"] = irr(investment, df["annual_saving"].to_numpy(), years)
+    carbon_pct = pd.to_numeric(df.get("carbon_reduction_pct", 0), errors="coerce")
+    emissions = df["baseline_emissions"] if "baseline_emissions" in df.columns else baseline_emissions
+    df["abatement"] = carbon_pct / 100 * emissions if emissions is not None else carbon_pct
+    df["abatement"] = pd.to_numeric(df["abatement"], errors="coerce").fillna(0.0)
+    return df
+
+
+def _greedy(cost, value, budget):
+    """依效益 / 成本比排序，放得下就選；再與「預算內單一最佳項目」比較（保證至少最佳解的一半）"""
+    order = np.argsort(-value / np.maximum(cost, 1e-12), kind="stable")
+    chosen = np.zeros(len(cost), dtype=bool)
+    remaining = budget
+    for idx in order:
+        if cost[idx] <= remaining:
+            chosen[idx] = True
+            remaining -= cost[idx]
+    fits = cost <= budget
+    if fits.any():
+        best_single = np.argmax(np.where(fits, value, -np.inf))
+        if value[best_single] > value[chosen].sum():
+            chosen[:] = False
+            chosen[best_single] = True
+    return chosen
+
+
+def _upper_bound(cost, value, budget):
+    """分數背包的最佳值（LP 鬆弛），任何整數解都不會超過"""
+    order = np.argsort(-value / np.maximum(cost, 1e-12), kind="stable")
+    cum_cost = np.cumsum(cost[order])
+    cum_value = np.cumsum(value[order])
+    k = np.searchsorted(cum_cost, budget, side="right")
+    bound = cum_value[k - 1] if k > 0 else 0.0
+    if k < len(order):
+        spare = budget - (cum_cost[k - 1] if k > 0 else 0.0)
+        bound += value[order[k]] * spare / cost[order[k]]
+    return float(bound)
+
+
+def _dynamic_programming(cost, value, budget, resolution):
+    """
+    0/1 背包：預算切成 resolution 格，成本無條件進位（挑出的組合一定不超出預算）。
+    每個項目一次更新整列（陣列位移），記錄取捨以回推選了哪些
+    """
+    unit = budget / resolution
+    weights = np.ceil(cost / unit - 1e-9).astype(int)
+    best = np.zeros(resolution + 1)
+    taken = np.zeros((len(cost), resolution + 1), dtype=bool)
+    for i, (w, v) in enumerate(zip(weights, value)):
+        if w > resolution:
+            continue
+        candidate = best[:resolution + 1 - w] + v
+        improve = candidate > best[w:]
+        taken[i, w:] = improve
+        best[w:] = np.where(improve, candidate, best[w:])
+    chosen = np.zeros(len(cost), dtype=bool)
+    capacity = resolution
+    for i in range(len(cost) - 1, -1, -1):
+        if taken[i, capacity]:
+            chosen[i] = True
+            capacity -= weights[i]
+    return chosen
+
+
+def optimize(evaluated, budget, objective="npv", method="auto", resolution=DP_RESOLUTION):
+    """
+    在 budget（百萬元）內挑出 objective（npv / abatement）總和最大的方案組合。
+    只考慮目標值 > 0 的方案；method：dp（動態規劃）、greedy（貪婪 + 上界）、auto（依規模自動選）。
+    回傳 (是否選取的布林陣列, 摘要 dict)
+    """
+    cost = evaluated["investment"].to_numpy(dtype=float)
+    value = evaluated[objective].to_numpy(dtype=float)
+    eligible = np.flatnonzero((value > 0) & (cost >= 0) & np.isfinite(value) & np.isfinite(cost))
+    chosen = np.zeros(len(evaluated), dtype=bool)
+    if method == "auto":
+        method = "dp" if len(eligible) * resolution <= DP_MAX_CELLS else "greedy"
+
+    if budget > 0 and len(eligible):
+        sub_cost, sub_value = cost[eligible], value[eligible]
+        # 零成本的方案一定選
+        free = sub_cost == 0
+        chosen[eligible[free]] = True
+        paid = ~free
+        if paid.any():
+            paid_cost, paid_value = sub_cost[paid], sub_value[paid]
+            picked = _greedy(paid_cost, paid_value, budget)
+            if method == "dp":
+                # 記憶體允許下切得越細越好；成本進位會讓大量小項目時的 DP 略差於貪婪法，取兩者較好的
+                resolution = max(resolution, min(DP_MAX_CELLS // len(paid_cost), DP_MAX_RESOLUTION))
+                dp_picked = _dynamic_programming(paid_cost, paid_value, budget, resolution)
+                if paid_value[dp_picked].sum() >= paid_value[picked].sum():
+                    picked = dp_picked
+            chosen[eligible[paid][picked]] = True
+        bound = _upper_bound(sub_cost[paid], sub_value[paid], budget) + sub_value[free].sum()
+    else:
+        bound = 0.0
+
+    total = float(value[chosen].sum())
+    return chosen, {
+        "method": method,
+        "selected": int(chosen.sum()),
+        "capex": float(cost[chosen].sum()),
+        "objective": objective,
+        "total": total,
+        "upper_bound": bound,
+        "gap": (bound - total) / bound if bound > 0 else 0.0,
+        "npv": float(evaluated["npv"].to_numpy()[chosen].sum()),
+        "abatement": float(evaluated["abatement"].to_numpy()[chosen].sum()),
+    }
+
+
+def sample_candidates(n, seed=0):
+    """產生 n 筆模擬候選方案（多廠區 x 多種措施）"""
+    rng = np.random.default_rng(seed)
+    measures = np.array(["AI能耗監控", "被動式設計", "智能樓宇管理", "高效冰水主機", "LED照明",
+                         "空壓系統改善", "太陽能板", "熱回收", "變頻馬達", "儲能系統"])
+    sites = np.char.add("廠區", (rng.integers(1, max(2, n // 10) + 1, n)).astype(str))
+    investment = rng.lognormal(3.5, 0.9, n).round(1)
+    return pd.DataFrame({
+        "technology": np.char.add(np.char.add(sites, "-"), measures[rng.integers(0, len(measures), n)]),
+        "energy_saving_pct": rng.uniform(3, 40, n).round(1),
+        "carbon_reduction_pct": rng.uniform(2, 45, n).round(1),
+        "investment": investment,
+        "roi_years": rng.uniform(1.2, 14, n).round(1),
+        "baseline_emissions": rng.uniform(200, 5000, n).round(0),
+    })
+
+
+if __name__ == "__main__":
+    import time
+
+    candidates = sample_candidates(5000)
+    start = time.perf_counter()
+    evaluated = evaluate(candidates, rate=0.05, years=10)
+    eval_ms = (time.perf_counter() - start) * 1000
+    budget = candidates["investment"].sum() * 0.1
+    for method in ("dp", "greedy"):
+        start = time.perf_counter()
+        chosen, summary = optimize(evaluated, budget, method=method)
+        print(f"{method:>6}：{(time.perf_counter() - start) * 1000:.0f} ms，選 {summary['selected']} 項，"
+              f"NPV {summary['total']:,.0f} / 上界 {summary['upper_bound']:,.0f}")
+    print(f"NPV/IRR 5,000 筆：{eval_ms:.1f} ms")
@@ -0,0 +1,237 @@
+"""
+全程序的 API 流量控制 - 每把 API Key、每個模型各一個 token bucket，所有 session 依先來後到排隊
+遇到 429 時該 bucket 暫停一段時間，請求重新排隊，不讓各 session 各自重試互相擠爆額度
+SDK 本身不重試（llm_client 的 max_retries=0），所有重試與退避都在這裡
+
+RPM 依 API 帳號等級設定，以環境變數覆寫：
+    TCFD_KEY_RPM=1000
+    TCFD_MODEL_RPM="opus=200,sonnet=1000,haiku=2000"
+    TCFD_DEFAULT_MODEL_RPM=500
+"""
+import os
+import random
+import threading
+import time
+
+import anthropic
+
+import llm_client
+
+
+def _env_rpm(name, default):
+    try:
+        return max(float(os.environ[name]), 1.0)
+    except (KeyError, ValueError):
+        return default
+
+
+def _env_model_rpm(name, default):
+    """「family=rpm,family=rpm」格式；沒寫到的模型沿用預設"""
+    rpm = dict(default)
+    for part in os.environ.get(name, "").split(","):
+        family, _, value = part.partition("=")
+        if not family.strip():
+            continue
+        try:
+            rpm[family.strip().lower()] = max(float(value), 1.0)
+        except ValueError:
+            continue
+    return rpm
+
+
+# 每分鐘請求數（RPM）：整把 Key 的上限，與 Key 底下各模型的上限；預設為最低等級帳號的 50
+KEY_RPM = _env_rpm("TCFD_KEY_RPM", 50)
+MODEL_RPM = _env_model_rpm("TCFD_MODEL_RPM", {"opus": 50, "sonnet": 50, "haiku": 50})
+DEFAULT_MODEL_RPM = _env_rpm("TCFD_DEFAULT_MODEL_RPM", 50)
+BURST_SECONDS = 10            # 閒置後最多可一次送出幾秒份的額度
+
+MAX_ATTEMPTS = 4              # 遇到 429 / 暫時性錯誤最多嘗試幾次
+BACKOFF_BASE = 2.0            # 沒有 retry-after 時的退避秒數（指數成長）
+BACKOFF_MAX = 60.0
+POLL_INTERVAL = 0.5           # 排隊時多久回報一次位置
+
+
+class TokenBucket:
+    def __init__(self, rpm):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0      # 429 退避期間不放行
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now, needed=1):
+        """還要等幾秒才湊得到 needed 個 token"""
+        self._refill(now)
+        shortage = max(0.0, needed - self.tokens)
+        return max(self.blocked_until - now, 0.0) + shortage / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, now, seconds):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class _Ticket:
+    __slots__ = ("bucket_keys",)
+
+    def __init__(self, bucket_keys):
+        self.bucket_keys = bucket_keys
+
+
+_cond = threading.Condition()
+_buckets = {}
+_queue = []                   # 排隊中的 ticket（先來的在前）
+_stats = {"admitted": 0, "throttled": 0}
+
+
+def _model_rpm(model):
+    name = (model or "").lower()
+    for family, rpm in MODEL_RPM.items():
+        if family in name:
+            return rpm
+    return DEFAULT_MODEL_RPM
+
+
+def _bucket_keys(api_key, model):
+    key = llm_client.key_id(api_key)
+    return (("key", key), ("model", key, model))
+
+
+def _bucket(bucket_key):
+    bucket = _buckets.get(bucket_key)
+    if bucket is None:
+        rpm = KEY_RPM if bucket_key[0] == "key" else _model_rpm(bucket_key[2])
+        bucket = _buckets[bucket_key] = TokenBucket(rpm)
+    return bucket
+
+
+def _check(ticket, now):
+    """
+    可以放行時扣掉 token 並回傳 None，否則回傳 (前面還有幾個請求, 預估等待秒數)。
+    只有排在前面、且用到同一個 bucket 的請求會擋住自己（不同 Key 互不影響）。
+    """
+    ahead = {}
+    for other in _queue[:_queue.index(ticket)]:
+        for bucket_key in other.bucket_keys:
+            if bucket_key in ticket.bucket_keys:
+                ahead[bucket_key] = ahead.get(bucket_key, 0) + 1
+    buckets = [_bucket(bucket_key) for bucket_key in ticket.bucket_keys]
+    if not ahead and all(bucket.wait_time(now) <= 0 for bucket in buckets):
+        for bucket in buckets:
+            bucket.take(now)
+        return None
+    eta = max(bucket.wait_time(now, ahead.get(bucket_key, 0) + 1)
+              for bucket_key, bucket in zip(ticket.bucket_keys, buckets))
+    return max(ahead.values(), default=0), eta
+
+
+def acquire(api_key, model, on_wait=None):
+    """
+    排隊直到 Key 與模型都有額度，回傳等待秒數。
+    on_wait(前面幾個請求, 預估秒數) 會在等待期間定期被呼叫，可用來更新畫面。
+    """
+    ticket = _Ticket(_bucket_keys(api_key, model))
+    start = time.monotonic()
+    with _cond:
+        _queue.append(ticket)
+        try:
+            while True:
+                status = _check(ticket, time.monotonic())
+                if status is None:
+                    _stats["admitted"] += 1
+                    return time.monotonic() - start
+                if on_wait is not None:
+                    # 回報時放開鎖，畫面更新慢也不會卡住其他 session
+                    _cond.release()
+                    try:
+                        on_wait(*status)
+                    finally:
+                        _cond.acquire()
+                _cond.wait(min(max(status[1], 0.01), POLL_INTERVAL))
+        finally:
+            _queue.remove(ticket)
+            _cond.notify_all()
+
+
+def retry_after(error, attempt):
+    """429 要等幾秒：優先用回應的 retry-after，否則指數退避加抖動"""
+    response = getattr(error, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(header), BACKOFF_MAX)
+    except (TypeError, ValueError):
+        return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * random.uniform(0.8, 1.2)
+
+
+def backoff(api_key, model, seconds):
+    """收到 429：Key 與模型的 bucket 暫停 seconds 秒，排隊中的請求一起順延"""
+    now = time.monotonic()
+    with _cond:
+        for bucket_key in _bucket_keys(api_key, model):
+            _bucket(bucket_key).block(now, seconds)
+        _stats["throttled"] += 1
+        _cond.notify_all()
+
+
+def _transient(error):
+    """SDK 原本會自動重試的暫時性錯誤：408 / 409 / 5xx / 529 與連線失敗（逾時不重試，重跑長回答太貴）"""
+    if isinstance(error, anthropic.APITimeoutError):
+        return False
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(error, anthropic.APIStatusError) and (status in (408, 409) or status >= 500)
+
+
+_attempt = threading.local()
+
+
+def current_attempt():
+    """在 call() 的 fn 內呼叫：這是第幾次重試（第一次為 0），供 llm_telemetry 記錄"""
+    return getattr(_attempt, "value", 0)
+
+
+def call(api_key, model, fn, on_wait=None):
+    """
+    排隊取得額度後執行 fn()，最多 MAX_ATTEMPTS 次：
+    429 時整把 Key / 模型一起退避後重新排隊；其他暫時性錯誤只有這個請求退避重試。
+    fn 內的 429 必須拋出 anthropic.RateLimitError（client 需關閉 SDK 自動重試）。
+    fn 內可用 current_attempt() 取得目前的重試次數。
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        acquire(api_key, model, on_wait)
+        _attempt.value = attempt
+        try:
+            return fn()
+        except anthropic.RateLimitError as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            backoff(api_key, model, retry_after(e, attempt))
+        except anthropic.APIError as e:
+            if attempt == MAX_ATTEMPTS - 1 or not _transient(e):
+                raise
+            time.sleep(retry_after(e, attempt))
+        finally:
+            _attempt.value = 0
+
+
+def describe_wait(position, eta):
+    """排隊狀態的顯示文字"""
+    if position:
+        return f"⏳ 排隊中：前面還有 {position} 個請求，預估等待 {eta:.0f} 秒"
+    return f"⏳ 已達 API 速率上限，預估等待 {eta:.0f} 秒"
+
+
+def stats():
+    """放行次數、429 次數與目前排隊數（本程序啟動以來）"""
+    with _cond:
+        return {**_stats, "queued": len(_queue)}
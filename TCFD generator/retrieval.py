@@ -0,0 +1,121 @@
+"""
+附件檢索 - 在本機對附件切塊建立 BM25 索引，只把與問題相關的段落送進 prompt
+中文以相鄰二字（bigram）切詞，英數以單字切詞，不需外部服務
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+TOP_K = 6                  # 預設送出的段落數
+FULL_TEXT_CHARS = 6000     # 附件總字數低於此值時直接送全文
+BM25_K1 = 1.5
+BM25_B = 0.75
+INDEX_CACHE_SIZE = 16
+
+_TOKEN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+|[a-z0-9]+(?:\.[0-9]+)?')
+_CJK_RUN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+
+_index_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def tokenize(text):
+    """中文連續字串拆成 bigram（單字則保留單字），英數轉小寫後以單字為單位"""
+    tokens = []
+    for run in _TOKEN.findall(text.lower()):
+        if _CJK_RUN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class BM25Index:
+    """倒排索引：term -> [(段落編號, 詞頻), ...]"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks            # [(檔名, 段落文字), ...]
+        self.postings = {}
+        self.doc_len = []
+        for i, (_, text) in enumerate(chunks):
+            counts = Counter(tokenize(text))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((i, tf))
+        n = len(chunks)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def search(self, query, k=TOP_K):
+        """回傳分數最高的 k 個 (分數, 段落編號)"""
+        scores = {}
+        avg_len = self.avg_len or 1.0
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for i, tf in plist:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[i] / avg_len)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, i) for i, score in ranked]
+
+
+def get_index(docs):
+    """
+    docs 為 attachments.ingest 的結果 list；以 digest 組合快取索引。
+    回傳 (索引, 建立耗時 ms)，命中快取時耗時為 0。
+    """
+    key = tuple(doc["digest"] for doc in docs)
+    with _cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index, 0.0
+
+    start = time.perf_counter()
+    index = BM25Index([(doc["name"], chunk) for doc in docs for chunk in doc["chunks"]])
+    build_ms = (time.perf_counter() - start) * 1000
+
+    with _cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index, build_ms
+
+
+def select_context(docs, query, k=TOP_K):
+    """
+    回傳 ({檔名: [段落, ...]}, 統計)。
+    附件不大時送全文；否則只取 BM25 前 k 段，並依原文順序排列。
+    """
+    total_chars = sum(len(doc["text"]) for doc in docs)
+    total_chunks = sum(len(doc["chunks"]) for doc in docs)
+    stats = {"mode": "full", "selected": total_chunks, "total_chunks": total_chunks,
+             "build_ms": 0.0, "query_ms": 0.0}
+    if total_chars <= FULL_TEXT_CHARS:
+        return {doc["name"]: [doc["text"]] for doc in docs}, stats
+
+    index, build_ms = get_index(docs)
+    start = time.perf_counter()
+    hits = index.search(query, k)
+    query_ms = (time.perf_counter() - start) * 1000
+    if not hits:
+        # 問題與附件沒有共同詞彙時退回前 k 段
+        hits = [(0.0, i) for i in range(min(k, len(index.chunks)))]
+
+    selected = {}
+    for i in sorted(i for _, i in hits):
+        name, text = index.chunks[i]
+        selected.setdefault(name, []).append(text)
+    stats.update(mode="retrieval", selected=len(hits), build_ms=build_ms, query_ms=query_ms)
+    return selected, stats
@@ -0,0 +1,155 @@
+"""
+氣候風險矩陣 - 區域分類、2D 分箱與繪圖，全部以欄位向量運算
+資料筆數少時逐點以 WebGL 繪製；超過 BIN_THRESHOLD 筆改在伺服器端分箱，只送格子統計到前端
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+BIN_THRESHOLD = 5000          # 超過此筆數改畫分箱熱圖
+X_BINS = 40                   # 發生機率 0~1
+Y_BINS = 40                   # 影響程度 0~10
+
+REQUIRED_COLUMNS = ["probability", "impact_score"]
+CATEGORY_COLORS = {'設備': '#e74c3c', '員工': '#3498db', '能源': '#2ecc71'}
+
+# 與圖上區塊一致：機率 0.5、影響 7 為界
+ZONES = ["高風險區", "中高風險", "中風險", "低風險區"]
+ZONE_COLORS = {"高風險區": "red", "中高風險": "orange", "中風險": "orange", "低風險區": "green"}
+ZONE_RECTS = {
+    "高風險區": (0.5, 7, 1.0, 10),
+    "中高風險": (0, 7, 0.5, 10),
+    "中風險": (0.5, 0, 1.0, 7),
+    "低風險區": (0, 0, 0.5, 7),
+}
+
+# 影響程度分級（風險摘要用）
+IMPACT_LEVELS = ["高影響", "中影響", "低影響"]
+
+
+def classify_zones(probability, impact):
+    """依機率與影響程度分到四個區域（陣列進、陣列出）"""
+    probability = np.asarray(probability, dtype=float)
+    impact = np.asarray(impact, dtype=float)
+    likely = probability >= 0.5
+    severe = impact >= 7
+    return np.select(
+        [likely & severe, severe, likely],
+        ZONES[:3],
+        default=ZONES[3]
+    )
+
+
+def impact_levels(impact):
+    """影響程度 >= 8 高、5~8 中、< 5 低"""
+    impact = np.asarray(impact, dtype=float)
+    return np.select([impact >= 8, impact >= 5], IMPACT_LEVELS[:2], default=IMPACT_LEVELS[2])
+
+
+def prepare(df):
+    """
+    檢查欄位並補上選填欄位與分類結果；缺少必要欄位時拋出 ValueError。
+    回傳新的 DataFrame，不修改傳入的資料
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少欄位：{', '.join(missing)}")
+    df = df.copy()
+    df["probability"] = pd.to_numeric(df["probability"], errors="coerce")
+    df["impact_score"] = pd.to_numeric(df["impact_score"], errors="coerce")
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+    # 機率若以百分比輸入（> 1），換成 0~1
+    if len(df) and df["probability"].max() > 1:
+        df["probability"] = df["probability"] / 100
+    if "category" not in df.columns:
+        df["category"] = "未分類"
+    if "risk_type" not in df.columns:
+        df["risk_type"] = "風險 " + pd.Series(np.arange(1, len(df) + 1), index=df.index).astype(str)
+    if "cost_impact" not in df.columns:
+        df["cost_impact"] = 0.0
+    df["cost_impact"] = pd.to_numeric(df["cost_impact"], errors="coerce").fillna(0.0)
+    df["zone"] = classify_zones(df["probability"].to_numpy(), df["impact_score"].to_numpy())
+    df["impact_level"] = impact_levels(df["impact_score"].to_numpy())
+    return df
+
+
+def sample_register(n, seed=0):
+    """產生 n 筆模擬風險登錄資料（展示大型資料模式用）"""
+    rng = np.random.default_rng(seed)
+    categories = np.array(list(CATEGORY_COLORS))
+    return pd.DataFrame({
+        "category": categories[rng.integers(0, len(categories), n)],
+        "risk_type": np.char.add("風險-", np.arange(1, n + 1).astype(str)),
+        "impact_score": np.clip(rng.normal(6, 2, n), 0, 10).round(1),
+        "probability": rng.beta(2, 2.5, n).round(3),
+        "cost_impact": rng.lognormal(3.5, 1.0, n).round(1),
+        "mitigation_effectiveness": rng.uniform(0.2, 0.9, n).round(2),
+    })
+
+
+def summarize(df, top_n=10):
+    """各影響等級 / 區域筆數，以及損失最高的高影響風險"""
+    level_counts = df["impact_level"].value_counts().reindex(IMPACT_LEVELS, fill_value=0)
+    zone_counts = df["zone"].value_counts().reindex(ZONES, fill_value=0)
+    top_high = df.loc[df["impact_level"] == IMPACT_LEVELS[0], ["risk_type", "cost_impact"]].nlargest(top_n, "cost_impact")
+    return level_counts, zone_counts, top_high
+
+
+def bin_matrix(df, x_bins=X_BINS, y_bins=Y_BINS):
+    """機率 x 影響程度 2D 分箱：回傳 (x 中心, y 中心, 筆數, 損失合計)，陣列形狀為 (y_bins, x_bins)"""
+    x_edges = np.linspace(0, 1, x_bins + 1)
+    y_edges = np.linspace(0, 10, y_bins + 1)
+    x = df["probability"].to_numpy()
+    y = df["impact_score"].to_numpy()
+    counts, _, _ = np.histogram2d(y, x, bins=[y_edges, x_edges])
+    cost, _, _ = np.histogram2d(y, x, bins=[y_edges, x_edges], weights=df["cost_impact"].to_numpy())
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts, cost
+
+
+def add_zones(fig):
+    """四個風險區塊與標籤"""
+    for zone, (x0, y0, x1, y1) in ZONE_RECTS.items():
+        fig.add_shape(type="rect", x0=x0, y0=y0, x1=x1, y1=y1,
+                      fillcolor=ZONE_COLORS[zone], opacity=0.1, line_width=0, layer="below")
+        fig.add_annotation(x=(x0 + x1) / 2, y=9 if y0 >= 7 else 3, text=zone,
+                           showarrow=False, font=dict(color=ZONE_COLORS[zone]))
+
+
+def build_figure(df, threshold=BIN_THRESHOLD):
+    """風險矩陣圖：筆數 <= threshold 逐點（Scattergl），否則分箱熱圖"""
+    fig = go.Figure()
+    if len(df) <= threshold:
+        # 點的大小依潛在損失，比例尺與資料量無關
+        cost = df["cost_impact"].to_numpy(dtype=float)
+        sizeref = 2.0 * max(cost.max(initial=0.0), 1e-9) / 40 ** 2
+        for category, group in df.groupby("category", sort=False):
+            fig.add_trace(go.Scattergl(
+                x=group["probability"], y=group["impact_score"],
+                mode="markers", name=category,
+                marker=dict(size=group["cost_impact"], sizemode="area", sizeref=sizeref, sizemin=4,
+                            color=CATEGORY_COLORS.get(category), opacity=0.75),
+                customdata=np.column_stack([group["risk_type"], group["cost_impact"], group["zone"]]),
+                hovertemplate="<b>%{customdata[0]}</b><br>發生機率 %{x:.0%}<br>影響程度 %{y}"
+                              "<br>潛在損失 %{customdata[1]:,.0f} 百萬元<br>%{customdata[2]}<extra></extra>",
+            ))
+        title = "TCFD 氣候風險矩陣"
+    else:
+        x, y, counts, cost = bin_matrix(df)
+        # 空格子不畫，避免蓋住風險區塊底色
+        z = np.where(counts > 0, counts, np.nan)
+        fig.add_trace(go.Heatmap(
+            x=x, y=y, z=z, customdata=cost, colorscale="YlOrRd",
+            colorbar=dict(title="筆數"),
+            hovertemplate="發生機率 %{x:.0%}<br>影響程度 %{y:.1f}<br>%{z:,.0f} 筆"
+                          "<br>潛在損失合計 %{customdata:,.0f} 百萬元<extra></extra>",
+        ))
+        title = f"TCFD 氣候風險矩陣（{len(df):,} 筆，{X_BINS}×{Y_BINS} 分箱）"
+    add_zones(fig)
+    fig.update_layout(
+        title=title,
+        height=500,
+        xaxis=dict(range=[0, 1], tickformat='.0%', title='發生機率'),
+        yaxis=dict(range=[0, 10], title='影響程度 (1-10)'),
+        legend_title_text='風險類別',
+    )
+    return fig
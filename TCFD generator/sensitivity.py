@@ -0,0 +1,92 @@
+"""
+節能效益敏感度分析 - 效益公式以 NumPy broadcasting 一次算完整個參數網格
+參數：energy_cost（年度能源成本，萬元）、efficiency（節能率 0~1）、
+     emission_factor（每萬元電費的碳排，噸）、carbon_price（碳價格，元/噸）
+"""
+import numpy as np
+import pandas as pd
+
+PARAMETERS = ["energy_cost", "efficiency", "emission_factor", "carbon_price"]
+LABELS = {
+    "energy_cost": "年度能源成本 (萬元)",
+    "efficiency": "節能率",
+    "emission_factor": "排放係數 (噸/萬元)",
+    "carbon_price": "碳價格 (元/噸)",
+}
+DEFAULT_EMISSION_FACTOR = 0.5     # 每萬元電費約 0.5 噸碳排
+CARBON_VALUE_DIVISOR = 100        # 與計算器原本的換算一致：節省電費 x 係數 x 碳價 / 100
+
+
+def benefit(energy_cost, efficiency, emission_factor, carbon_price):
+    """回傳 (年度節省能源成本, 碳權價值, 總效益)，萬元；參數可為任意可 broadcast 的陣列"""
+    energy_saving = np.multiply(energy_cost, efficiency)
+    carbon_saving = energy_saving * emission_factor * carbon_price / CARBON_VALUE_DIVISOR
+    return energy_saving, carbon_saving, energy_saving + carbon_saving
+
+
+def clip_values(name, values):
+    """各參數的合理範圍（節能率 0~1，其他不可為負）"""
+    upper = 1.0 if name == "efficiency" else np.inf
+    return np.clip(values, 0.0, upper)
+
+
+def value_range(name, base, spread, steps):
+    """base 上下 spread 比例內取 steps 個點"""
+    return clip_values(name, np.linspace(base * (1 - spread), base * (1 + spread), steps))
+
+
+def grid(base, axes):
+    """
+    axes：{參數名: 1D 陣列}，依序成為結果的各維度；未列出的參數固定在 base。
+    回傳總效益陣列，形狀為各軸長度（例如 100 x 100 x 100）
+    """
+    names = list(axes)
+    shaped = {}
+    for name in PARAMETERS:
+        if name in axes:
+            # 每個參數放在自己的維度上，其餘維度長度 1，交給 broadcasting 展開
+            shape = [1] * len(names)
+            shape[names.index(name)] = -1
+            shaped[name] = np.asarray(axes[name], dtype=float).reshape(shape)
+        else:
+            shaped[name] = float(base[name])
+    return benefit(**shaped)[2]
+
+
+def tornado(base, spread):
+    """
+    每個參數各自上下調 spread（其他固定），所有情境一次計算。
+    回傳 DataFrame：parameter、low、high、low_total、high_total、swing，依影響幅度由小到大排序（繪圖時最大的在上面）
+    """
+    n = len(PARAMETERS)
+    # 2n 個情境 x 4 個參數：先全部填 base，再把對角線換成調低 / 調高的值
+    scenarios = np.tile([float(base[name]) for name in PARAMETERS], (2 * n, 1))
+    lows = np.array([clip_values(name, base[name] * (1 - spread)) for name in PARAMETERS])
+    highs = np.array([clip_values(name, base[name] * (1 + spread)) for name in PARAMETERS])
+    scenarios[np.arange(n), np.arange(n)] = lows
+    scenarios[n + np.arange(n), np.arange(n)] = highs
+    totals = benefit(*scenarios.T)[2]
+    result = pd.DataFrame({
+        "parameter": PARAMETERS,
+        "low": lows,
+        "high": highs,
+        "low_total": totals[:n],
+        "high_total": totals[n:],
+    })
+    result["swing"] = (result["high_total"] - result["low_total"]).abs()
+    return result.sort_values("swing").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import time
+
+    base = {"energy_cost": 1000, "efficiency": 0.2, "emission_factor": 0.5, "carbon_price": 500}
+    axes = {
+        "energy_cost": value_range("energy_cost", 1000, 0.5, 100),
+        "efficiency": value_range("efficiency", 0.2, 0.5, 100),
+        "carbon_price": value_range("carbon_price", 500, 0.5, 100),
+    }
+    start = time.perf_counter()
+    cube = grid(base, axes)
+    print(f"{cube.shape} 網格：{(time.perf_counter() - start) * 1000:.1f} ms")
+    print(tornado(base, 0.2))
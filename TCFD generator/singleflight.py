@@ -0,0 +1,100 @@
+"""
+單飛（single-flight）- 同時進行的相同請求只執行一次，其他 session 等待並共用結果
+key 由模型、正規化後的 prompt 與參數組成；執行完成後即移除，不是長期快取
+"""
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+
+_SPACES = re.compile(r'\s+')
+
+POLL_INTERVAL = 0.5           # 等待時多久檢查一次排隊狀態
+
+_inflight = {}           # key -> _Flight
+_lock = threading.Lock()
+_stats = {"executed": 0, "shared": 0}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False      # fn 被 BaseException 中斷，等待者要重新來過
+        self.status = None          # 最近一次排隊狀態 (前面幾個請求, 預估秒數)
+
+    def report(self, position, eta):
+        """給 fn 回報排隊狀態；只記錄，畫面由各 session 自己更新"""
+        self.status = (position, eta)
+
+
+def normalize_prompt(prompt):
+    """全半形統一、空白收斂，避免只差空白的 prompt 被當成不同請求"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", prompt)).strip()
+
+
+def make_key(namespace, model, prompt, **params):
+    """namespace 區分不同頁面 / 回傳型態；params 為 max_tokens、temperature 等"""
+    payload = json.dumps(
+        [namespace, model, normalize_prompt(prompt), sorted(params.items())],
+        ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _run(key, flight, fn):
+    """在背景執行緒執行 fn；只有一般例外會分享給等待者"""
+    try:
+        flight.result = fn(flight.report)
+    except Exception as e:
+        flight.error = e
+    except BaseException:
+        flight.abandoned = True
+    finally:
+        with _lock:
+            del _inflight[key]
+        flight.done.set()
+
+
+def do(key, fn, on_wait=None):
+    """
+    執行 fn(report) 或加入正在執行的同一 key，回傳 (結果, 是否為共用)。
+    fn 在背景執行緒執行，不可呼叫 st.*；排隊時呼叫 report(前面幾個請求, 預估秒數)，
+    每個 session 再以自己的 on_wait 顯示（on_wait 不會傳進共用的 fn）。
+    fn 拋出一般例外時，所有等待者都會收到同一個例外；
+    呼叫端自己的 rerun / stop 只中斷自己的等待，不影響共用的請求。
+    """
+    while True:
+        with _lock:
+            flight = _inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _inflight[key] = _Flight()
+                _stats["executed"] += 1
+                threading.Thread(target=_run, args=(key, flight, fn), daemon=True).start()
+            else:
+                _stats["shared"] += 1
+
+        shown = None
+        while not flight.done.wait(POLL_INTERVAL):
+            status = flight.status
+            if on_wait is not None and status is not None and status != shown:
+                on_wait(*status)
+                shown = status
+
+        if flight.abandoned:
+            if leader:
+                raise RuntimeError("共用請求被中斷，請重試")
+            # 其他等待者之一會成為新的 leader 重跑
+            continue
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, not leader
+
+
+def stats():
+    """累計執行次數、共用次數與目前進行中的請求數（本程序啟動以來）"""
+    with _lock:
+        return {**_stats, "inflight": len(_inflight)}
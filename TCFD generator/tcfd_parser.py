@@ -0,0 +1,371 @@
+"""
+TCFD 回應解析 - 單次掃描的串流解析器
+依最先出現的內容判斷格式（HTML 表格 / Markdown 表格 / CSV / ||| 分隔），
+可邊串流邊餵入；都不符合時退回依標題分段的關鍵字解析。
+
+    parser = TCFDStreamParser()
+    for text in stream.text_stream:
+        parser.feed(text)
+    tcfd_items = parser.close()
+
+直接執行本檔可跑解析效能測試：python tcfd_parser.py [回應.txt | 對話.json ...]
+"""
+import csv
+import re
+from html.parser import HTMLParser
+
+FIELDS = ("description", "impact", "actions")
+HEADER_WORDS = ("description", "描述")
+
+_SECTION_START = re.compile(r'\d+\.|\*\*|###')
+_SECTION_MARK = re.compile(r'^[\d\.\*\#\s]+')
+_LABEL = re.compile(r'^[^:：\n]{0,30}[:：]\s*')
+_MD_SEPARATOR = re.compile(r':?-+:?')
+_BR = re.compile(r'<br\s*/?>', re.IGNORECASE)
+
+
+def _clean(text):
+    """去掉每行前後空白與空行"""
+    return "\n".join(line.strip() for line in text.split("\n") if line.strip())
+
+
+def _is_header(cells):
+    first = cells[0].replace("*", "").strip().lower()
+    return len(first) <= 12 and any(word in first for word in HEADER_WORDS)
+
+
+def _item(cells):
+    return {key: _clean(value) for key, value in zip(FIELDS, cells)}
+
+
+class _TableParser(HTMLParser):
+    """增量解析第一個 <table>；每完成一列就交給 on_row"""
+
+    def __init__(self, on_row):
+        super().__init__()
+        self.on_row = on_row
+        self.depth = 0
+        self.done = False
+        self.row = None
+        self.cell = None
+        self.has_th = False
+
+    def _close_cell(self):
+        if self.cell is not None:
+            self.row.append("".join(self.cell))
+            self.cell = None
+
+    def _close_row(self):
+        if self.row is not None:
+            self._close_cell()
+            self.on_row(self.row, self.has_th)
+            self.row = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "table":
+            self.depth += 1
+        elif tag == "tr":
+            self._close_row()
+            self.row = []
+            self.has_th = False
+        elif tag in ("td", "th"):
+            if self.row is None:
+                self.row = []
+            self._close_cell()
+            self.cell = []
+            self.has_th = self.has_th or tag == "th"
+        elif self.cell is not None:
+            self.cell.append("\n")
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag == "table":
+            self._close_row()
+            self.depth -= 1
+            self.done = self.depth <= 0
+        elif self.cell is not None:
+            self.cell.append("\n")
+
+    def handle_data(self, data):
+        if self.cell is not None and not self.done:
+            self.cell.append(data)
+
+
+class _SectionCollector:
+    """以 1. / ** / ### 開頭的行分段，依關鍵字歸到描述、影響或措施"""
+
+    def __init__(self):
+        self.items = []
+        self.current = {}
+        self.lines = []
+
+    def feed_line(self, line):
+        if _SECTION_START.match(line) and self.lines:
+            self._finish()
+        self.lines.append(line)
+
+    def _finish(self):
+        section = "\n".join(self.lines).strip()
+        self.lines = []
+        if not section:
+            return
+        lower = section.lower()
+        if 'description' in lower or '描述' in lower:
+            key = "description"
+            if "description" in self.current:
+                self.items.append(self.current)
+                self.current = {}
+        elif 'impact' in lower or '影響' in lower:
+            key = "impact"
+        elif 'action' in lower or '措施' in lower or '行動' in lower:
+            key = "actions"
+        else:
+            return
+        # 去掉編號與「**風險描述**：」這類標籤，只留內容
+        content = _SECTION_MARK.sub('', section).replace("**", "")
+        content = _LABEL.sub('', content, count=1).strip()
+        self.current[key] = _clean(content or section)
+
+    def close(self):
+        self._finish()
+        if len(self.current) >= 2:
+            self.items.append(self.current)
+            self.current = {}
+        return self.items
+
+
+class TCFDStreamParser:
+    """
+    逐段餵入 AI 回應，每列只掃描一次。
+    feed() 回傳這次新解析出的項目；close() 回傳全部項目
+    （每項為 {"description", "impact", "actions"}）。
+    """
+
+    def __init__(self):
+        self.format = None          # html / markdown / csv / pipes / sections
+        self.items = []
+        self._pending = ""
+        self._fence = None
+        self._html = None
+        self._html_rows = 0
+        self._md_held = None        # Markdown 最近一列：下一行是 |---| 時它是表頭
+        self._csv_active = False
+        self._csv_header = False    # CSV 區塊的第一列是表頭
+        self._csv_row = ""
+        self._sections = _SectionCollector()
+
+    # ---- 各格式的列處理 ----
+    def _html_row(self, cells, has_th):
+        # 第一列一律視為表頭（不論用 <th> 或 <td>、寫什麼字）
+        self._html_rows += 1
+        if self._html_rows > 1 and len(cells) >= 3 and not has_th:
+            self.items.append(_item(cells[:3]))
+
+    def _start_html(self, text):
+        self.format = "html"
+        self._html = _TableParser(self._html_row)
+        self._html.feed(text)
+
+    def _markdown_row(self, stripped):
+        body = stripped[1:-1] if stripped.endswith("|") else stripped[1:]
+        cells = [cell.strip() for cell in body.split("|")]
+        if all(not c or _MD_SEPARATOR.fullmatch(c) for c in cells):
+            # 分隔線上一列是表頭
+            self._md_held = None
+            return
+        self._flush_markdown()
+        if len(cells) >= 3:
+            self._md_held = cells
+
+    def _flush_markdown(self):
+        """確定上一列不是表頭後才加入"""
+        if self._md_held is not None and not _is_header(self._md_held):
+            self.items.append(_item(_BR.sub("\n", cell) for cell in self._md_held[:3]))
+            self._md_held = None
+
+    def _pipes_row(self, stripped):
+        parts = [part.strip() for part in stripped.split("|||")]
+        if len(parts) >= 3 and not _is_header(parts):
+            self.items.append(_item(parts[:3]))
+
+    def _csv_line(self, line):
+        row = self._csv_row + line
+        if row.count('"') % 2:
+            # 引號內換行，等下一行
+            self._csv_row = row + "\n"
+            return
+        self._csv_row = ""
+        cells = next(csv.reader([row]), [])
+        if self._csv_header:
+            self._csv_header = False
+            return
+        if len(cells) >= 3:
+            self.items.append(_item(cells[:3]))
+
+    def _line(self, line):
+        stripped = line.strip()
+        if self.format == "markdown":
+            if stripped.startswith("|"):
+                self._markdown_row(stripped)
+            else:
+                self._flush_markdown()
+            return
+        if self.format == "pipes":
+            if "|||" in stripped:
+                self._pipes_row(stripped)
+            return
+        if self.format == "csv":
+            if self._csv_active and not self._csv_row and (not stripped or stripped.startswith("```")):
+                self._csv_active = False
+            elif self._csv_active:
+                self._csv_line(line)
+            return
+
+        # 尚未決定格式：看這一行屬於哪一種
+        if stripped.startswith("```"):
+            self._fence = stripped[3:].strip().lower() or None
+            return
+        pos = line.lower().find("<table")
+        if pos != -1:
+            self._start_html(line[pos:] + "\n")
+        elif stripped.startswith("|") and stripped.count("|") >= 3:
+            self.format = "markdown"
+            self._markdown_row(stripped)
+        elif "|||" in stripped:
+            self.format = "pipes"
+            self._pipes_row(stripped)
+        elif stripped and (self._fence == "csv" or (stripped.count(",") >= 2 and _is_header(stripped.split(",")))):
+            self.format = "csv"
+            self._csv_active = True
+            self._csv_header = True
+            self._csv_line(line)
+
+    # ---- 對外介面 ----
+    def feed(self, chunk):
+        """餵入一段文字，回傳新完成的項目"""
+        before = len(self.items)
+        html_live = self.format == "html"
+        if html_live:
+            self._html.feed(chunk)
+
+        lines = (self._pending + chunk).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._sections.feed_line(line)
+            if self.format == "html":
+                if not html_live:
+                    self._html.feed(line + "\n")
+            else:
+                self._line(line)
+
+        if self.format == "html":
+            if not html_live:
+                self._html.feed(self._pending)
+        elif self.format is None:
+            # 表格可能和前文在同一行，不必等換行
+            pos = self._pending.lower().find("<table")
+            if pos != -1:
+                self._start_html(self._pending[pos:])
+        return self.items[before:]
+
+    def close(self):
+        """結束輸入，回傳全部項目；沒有表格時改用分段解析"""
+        if self._pending:
+            line, self._pending = self._pending, ""
+            self._sections.feed_line(line)
+            if self.format != "html":
+                self._line(line)
+        if self._html is not None:
+            self._html.close()
+        if self._csv_row:
+            self._csv_line('"')
+        self._flush_markdown()
+        section_items = self._sections.close()
+        if not self.items and section_items:
+            self.format = "sections"
+            self.items = section_items
+        return self.items
+
+
+def parse(text):
+    """一次解析完整回應"""
+    parser = TCFDStreamParser()
+    parser.feed(text)
+    return parser.close()
+
+
+# ============ 效能測試 ============
+def _sample_corpus():
+    """沒有錄製資料時使用的合成回應（各格式各一份）"""
+    rows = [
+        ("碳費與碳稅成本上升，影響原料與能源採購", "營運成本增加 3-5%；毛利率下降", "導入能源管理系統；採購再生電力；內部碳定價"),
+        ("極端降雨導致廠區淹水與停工", "停工損失與設備修復費用", "設置防洪閘門；建立營運持續計畫"),
+        ("客戶要求低碳產品與碳足跡揭露", "未達標恐失去訂單", "產品碳足跡盤查；開發低碳產品線"),
+    ] * 4
+    intro = "以下是針對鋁建材業的 TCFD 氣候風險分析：\n\n"
+    outro = "\n\n以上建議可依公司實際情況調整。"
+    html = intro + "<table border='1'>\n<tr><th>Description</th><th>Impact</th><th>Actions</th></tr>\n" + "".join(
+        f"<tr><td>{d}</td><td>{i.replace('；', '<br>')}</td><td>{a.replace('；', '<br>')}</td></tr>\n" for d, i, a in rows
+    ) + "</table>" + outro
+    markdown = intro + "| 風險描述 | 財務影響 | 因應措施 |\n|---|---|---|\n" + "".join(
+        f"| {d} | {i} | {a} |\n" for d, i, a in rows) + outro
+    csv_text = intro + "```csv\nDescription,Impact,Actions\n" + "".join(
+        f'"{d}","{i}","{a}"\n' for d, i, a in rows) + "```" + outro
+    pipes = "".join(f"{d}|||{i}|||{a}\n" for d, i, a in rows)
+    sections = intro + "".join(
+        f"{n}. **風險描述**：{d}\n**財務影響**：{i}\n**因應措施**：{a}\n\n" for n, (d, i, a) in enumerate(rows, 1)
+    ) + outro
+    return [html, markdown, csv_text, pipes, sections]
+
+
+def _load_corpus(paths):
+    """讀取 .txt 回應或「下載對話」的 JSON（取助手訊息）"""
+    import json
+    corpus = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                corpus.extend(m["content"] for m in json.load(f)
+                              if m.get("role") == "assistant" and isinstance(m.get("content"), str))
+            else:
+                corpus.append(f.read())
+    return corpus
+
+
+def _benchmark(corpus, repeat=200, chunk_size=16):
+    import time
+
+    total_chars = sum(len(text) for text in corpus)
+    print(f"語料 {len(corpus)} 份，共 {total_chars:,} 字")
+    for text in corpus:
+        parser = TCFDStreamParser()
+        parser.feed(text)
+        items = parser.close()
+        print(f"  {parser.format or '-':<9} {len(text):>7,} 字 → {len(items)} 項")
+
+    for label, size in (("整段", None), (f"串流 {chunk_size} 字/段", chunk_size)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in corpus:
+                parser = TCFDStreamParser()
+                if size is None:
+                    parser.feed(text)
+                else:
+                    for i in range(0, len(text), size):
+                        parser.feed(text[i:i + size])
+                parser.close()
+        elapsed = time.perf_counter() - start
+        per_response = elapsed / (repeat * len(corpus)) * 1000
+        print(f"{label}：每份 {per_response:.3f} ms，{total_chars * repeat / elapsed / 1e6:.2f} M 字/秒")
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(_load_corpus(sys.argv[1:]) if len(sys.argv) > 1 else _sample_corpus())
@@ -0,0 +1,162 @@
+"""
+TCFD 風險分析表資料 - 靜態資料集中於此，模組載入一次、DataFrame 以 cache_data 快取
+"""
+import pandas as pd
+import streamlit as st
+
+from html_table import Markup
+
+# ===== 大樓空調廠商 TCFD 風險數據 =====
+HVAC_RISK_DATA = [
+    {
+        "description": "極端高溫頻率增加",
+        "description_detail": "夏季溫度持續上升，熱浪天數增加，導致冷卻需求大幅提升",
+        "impact": "設備負荷過重",
+        "impact_detail": "空調系統長時間高負荷運轉，設備壽命縮短，維修成本增加",
+        "actions": "開發高效能產品",
+        "actions_detail": "投資研發更高 EER 值的空調系統，提升極端氣候適應能力"
+    },
+    {
+        "description": "碳稅及環保法規",
+        "description_detail": "政府實施碳稅制度，對高耗能設備課徵額外稅費",
+        "impact": "營運成本上升",
+        "impact_detail": "產品競爭力下降，客戶轉向選擇節能認證產品",
+        "actions": "取得綠色認證",
+        "actions_detail": "申請 ENERGY STAR、節能標章等認證，提升市場競爭力"
+    },
+    {
+        "description": "能源價格波動",
+        "description_detail": "電力成本不穩定，再生能源需求增加，影響營運策略",
+        "impact": "客戶需求轉變",
+        "impact_detail": "大樓業主要求智能化節能方案，傳統產品需求下降",
+        "actions": "發展智慧空調系統",
+        "actions_detail": "整合 IoT 技術，提供 AI 控制及遠端監控功能"
+    }
+]
+
+# 舊版風險數據 (保留兼容)
+RISK_CATEGORIES = ["大樓空調廠商 (新)", "設備營運風險", "員工健康風險", "能源供應風險"]
+
+RISK_DATA = {
+    "設備營運風險": [
+        {
+            "描述": "極端高溫導致設備過熱當機",
+            "影響": Markup("🔴 停機損失每小時50-200萬<br>設備壽命減少15-25%"),
+            "措施": Markup("部署 <span class='tech-highlight'>AI溫控系統</span><br>預防性維護，<span class='benefit'>降低30%故障率</span>")
+        },
+        {
+            "描述": "冷卻系統能耗激增",
+            "影響": Markup("🟠 能源成本增加40-60%<br>碳排放量上升35%"),
+            "措施": Markup("智能冷卻優化系統<br><span class='benefit'>節能25-40%</span>，ROI 2.5年")
+        },
+        {
+            "描述": "戶外設施材料老化加速",
+            "影響": Markup("維護成本增加2-3倍<br>更換週期縮短50%"),
+            "措施": Markup("採用耐候新材料<br>建立數位化巡檢系統")
+        }
+    ],
+    "員工健康風險": [
+        {
+            "描述": "高溫作業環境健康風險",
+            "影響": Markup("🔴 中暑事故增加3倍<br>勞動生產力下降20%"),
+            "措施": Markup("智能穿戴監測系統<br>動態調整作業時間")
+        },
+        {
+            "描述": "室內空氣品質惡化",
+            "影響": Markup("員工請病假增加15%<br>工作效率降低12%"),
+            "措施": Markup("<span class='tech-highlight'>AI空氣品質管理</span><br>即時調節通風系統")
+        },
+        {
+            "描述": "通勤交通受極端天氣影響",
+            "影響": Markup("遲到缺勤率上升25%<br>營運連續性風險"),
+            "措施": Markup("彈性工作制度<br>遠端辦公基礎設施")
+        }
+    ],
+    "能源供應風險": [
+        {
+            "描述": "尖峰用電需求暴增",
+            "影響": Markup("🔴 電費支出增加50-80%<br>限電風險提高"),
+            "措施": Markup("部署<span class='tech-highlight'>智能電網系統</span><br><span class='benefit'>削峰填谷30%</span>")
+        },
+        {
+            "描述": "再生能源供應不穩定",
+            "影響": Markup("供電中斷風險增加<br>備用電源成本上升"),
+            "措施": Markup("混合儲能系統<br>微電網建置，自給率達60%")
+        },
+        {
+            "描述": "傳統能源價格波動",
+            "影響": Markup("🟠 能源成本波動±30%<br>預算規劃困難"),
+            "措施": Markup("長期綠電採購合約<br>能源避險金融工具")
+        }
+    ]
+}
+
+# 節能技術對應節能率
+TECH_EFFICIENCY = {"AI能耗監控系統 (節能20%)": 0.20, "被動式建築設計 (節能35%)": 0.35, "智能樓宇管理 (節能30%)": 0.30}
+
+
+@st.cache_data
+def get_solution_df():
+    """解決方案數據（顯示用）"""
+    return pd.DataFrame({
+        "技術方案": ["🤖 AI能耗監控系統", "🏗️ 被動式建築設計", "🏢 智能樓宇管理"],
+        "技術特點": [
+            "機器學習預測用電模式，即時優化設備運行參數",
+            "自然通風、遮陽、保溫，減少機械空調依賴",
+            "IoT感測整合控制，人員密度動態調節"
+        ],
+        "節能效益": ["15-25%", "30-40%", "25-35%"],
+        "減碳效果": ["20%", "40%", "35%"],
+        "投資回收期": ["1.8年", "3.5年", "2.2年"],
+        "10年淨效益": ["+300萬", "+800萬", "+450萬"]
+    })
+
+
+@st.cache_data
+def get_export_df():
+    """風險數據 DataFrame（匯出用）"""
+    return pd.DataFrame({
+        "風險類別": ["設備", "設備", "設備", "員工", "員工", "員工", "能源", "能源", "能源"],
+        "風險描述": ["設備過熱", "冷卻能耗", "材料老化", "健康風險", "空氣品質", "通勤影響", "尖峰用電", "供應不穩", "價格波動"],
+        "影響描述": [
+            "停機損失每小時50-200萬，設備壽命減少15-25%",
+            "能源成本增加40-60%，碳排放量上升35%",
+            "維護成本增加2-3倍，更換週期縮短50%",
+            "中暑事故增加3倍，勞動生產力下降20%",
+            "員工請病假增加15%，工作效率降低12%",
+            "遲到缺勤率上升25%，營運連續性風險",
+            "電費支出增加50-80%，限電風險提高",
+            "供電中斷風險增加，備用電源成本上升",
+            "能源成本波動±30%，預算規劃困難"
+        ],
+        "適應措施": [
+            "部署AI溫控系統，預防性維護，降低30%故障率",
+            "智能冷卻優化系統，節能25-40%，ROI 2.5年",
+            "採用耐候新材料，建立數位化巡檢系統",
+            "智能穿戴監測系統，動態調整作業時間",
+            "AI空氣品質管理，即時調節通風系統",
+            "彈性工作制度，遠端辦公基礎設施",
+            "部署智能電網系統，削峰填谷30%",
+            "混合儲能系統，微電網建置，自給率達60%",
+            "長期綠電採購合約，能源避險金融工具"
+        ],
+        "影響程度": [9, 7, 6, 8, 5, 4, 9, 6, 7],
+        "潛在損失(百萬)": [150, 80, 50, 30, 15, 10, 200, 100, 60]
+    })
+
+
+@st.cache_data
+def get_solution_export_df():
+    """節能方案 DataFrame（匯出用）"""
+    return pd.DataFrame({
+        "技術方案": ["AI能耗監控系統", "被動式建築設計", "智能樓宇管理"],
+        "技術特點": [
+            "機器學習預測用電模式，即時優化設備運行參數",
+            "自然通風、遮陽、保溫，減少機械空調依賴",
+            "IoT感測整合控制，人員密度動態調節"
+        ],
+        "節能效益": ["15-25%", "30-40%", "25-35%"],
+        "減碳效果": ["20%", "40%", "35%"],
+        "投資回收期(年)": [1.8, 3.5, 2.2],
+        "10年淨效益(萬)": [300, 800, 450]
+    })
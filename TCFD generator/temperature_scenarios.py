@@ -0,0 +1,195 @@
+"""
+溫升情境財務影響 - 各事業單位 x 年度 x 情境的冷卻負載、生產力損失（實體衝擊）
+事業單位欄位：unit、revenue、energy_cost、labor_cost（百萬元/年）；
+cooling_share（能源用於空調冷卻的比例）、outdoor_share（戶外 / 高溫作業人力比例）為選填
+係數為試算假設：升溫幅度以基準年為 0，衝擊為相對基準年財務數字的增加成本
+實體衝擊一律以共同的能源價格路徑計價，情境間的差異只來自升溫；
+各情境的能源價格走勢屬轉型面，另列 energy_price，不計入實體衝擊合計
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = ["revenue", "energy_cost", "labor_cost"]
+BASE_YEAR = 2025
+BASE_WARMING = 1.2            # 基準年相對工業化前的升溫（°C）
+
+# 情境：warming 為 {年: 相對工業化前升溫 °C}，中間年度線性內插；
+# energy_price 為該情境能源實質價格年增率（轉型面：1.5°C 路徑的碳定價與能源轉型推升價格最多）
+SCENARIOS = [
+    {"name": "升溫1.5°C", "warming": {2025: 1.2, 2040: 1.5, 2100: 1.5}, "energy_price": 0.02},
+    {"name": "升溫2°C", "warming": {2025: 1.2, 2050: 1.8, 2100: 2.0}, "energy_price": 0.012},
+    {"name": "升溫3°C", "warming": {2025: 1.2, 2050: 2.1, 2100: 3.0}, "energy_price": 0.005},
+]
+SCENARIO_NAMES = [s["name"] for s in SCENARIOS]
+# 溫升風險表兩列各對應的情境
+TABLE_ROWS = {"升溫1.5°C情境": ["升溫1.5°C"], "升溫2°C以上情境": ["升溫2°C", "升溫3°C"]}
+
+REFERENCE_ENERGY_PRICE = 0.01  # 共同能源實質價格年增率，實體衝擊（冷卻用電）以此計價
+COOLING_PER_DEGREE = 0.10     # 每升溫 1°C，冷卻用電增加 10%
+PRODUCTIVITY_COEF = 0.02      # 高溫作業人力生產力損失 = 係數 x 升溫²
+INDOOR_EXPOSURE = 0.1         # 室內人力受影響程度（相對戶外）
+COMPONENTS = ["cooling", "productivity"]
+COMPONENT_LABELS = {"cooling": "冷卻負載", "productivity": "生產力損失"}
+TRANSITION_LABEL = "能源價格（轉型面）"
+
+
+def prepare(df):
+    """檢查欄位並補上選填欄位；缺少必要欄位時拋出 ValueError"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少欄位：{', '.join(missing)}")
+    df = df.copy()
+    for col in REQUIRED_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).clip(lower=0)
+    if "unit" not in df.columns:
+        df["unit"] = "事業單位 " + pd.Series(np.arange(1, len(df) + 1), index=df.index).astype(str)
+    for col, default in (("cooling_share", 0.3), ("outdoor_share", 0.1)):
+        if col not in df.columns:
+            df[col] = default
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(default).clip(0, 1)
+    return df.reset_index(drop=True)
+
+
+@lru_cache(maxsize=32)
+def scenario_table(start_year, years):
+    """
+    各情境逐年升溫增量（相對基準年 °C）與情境能源價格倍數，形狀皆為 (年數, 情境數)；
+    以及共同能源價格倍數 (年數,)。同一組年度只算一次，回傳唯讀陣列
+    """
+    year_axis = np.arange(start_year, start_year + years)
+    delta = np.empty((years, len(SCENARIOS)))
+    price = np.empty((years, len(SCENARIOS)))
+    for s, scenario in enumerate(SCENARIOS):
+        points = sorted(scenario["warming"].items())
+        warming = np.interp(year_axis, [y for y, _ in points], [w for _, w in points])
+        delta[:, s] = np.maximum(warming - BASE_WARMING, 0.0)
+        price[:, s] = (1 + scenario["energy_price"]) ** (year_axis - BASE_YEAR)
+    reference = (1 + REFERENCE_ENERGY_PRICE) ** (year_axis - BASE_YEAR)
+    for array in (delta, price, reference):
+        array.flags.writeable = False
+    return year_axis, delta, price, reference
+
+
+def project(units, start_year=2026, years=25):
+    """
+    回傳 dict：years (Y,)、scenarios、units（名稱）、revenue (U,)、
+    impact (U, Y, S, 2) 百萬元，最後一維依 COMPONENTS 排列（冷卻負載、生產力損失）；
+    energy_price (U, Y, S) 百萬元，情境能源價格的增加成本（轉型面，另列）
+    """
+    df = prepare(units)
+    year_axis, delta, price, reference = scenario_table(start_year, years)
+    energy = df["energy_cost"].to_numpy(dtype=float)[:, None, None]
+    labor = df["labor_cost"].to_numpy(dtype=float)[:, None, None]
+    cooling_share = df["cooling_share"].to_numpy(dtype=float)[:, None, None]
+    outdoor = df["outdoor_share"].to_numpy(dtype=float)[:, None, None]
+
+    # 冷卻負載：冷卻用電隨升溫增加，按共同能源價格計價
+    cooling = energy * cooling_share * COOLING_PER_DEGREE * delta * reference[:, None]
+    # 生產力損失：升溫的平方，戶外人力全額、室內人力部分受影響
+    exposure = outdoor + (1 - outdoor) * INDOOR_EXPOSURE
+    productivity = labor * exposure * PRODUCTIVITY_COEF * delta ** 2
+    return {
+        "years": year_axis,
+        "scenarios": list(SCENARIO_NAMES),
+        "units": df["unit"].astype(str).to_numpy(),
+        "revenue": df["revenue"].to_numpy(dtype=float),
+        "impact": np.stack([cooling, productivity], axis=-1),
+        # 轉型面：基準用量在情境價格下的增加成本
+        "energy_price": energy * (price - 1),
+    }
+
+
+def _year_index(result, year):
+    """年度 -> 索引；未指定為最後一年，超出試算期間的年度取最近的一端"""
+    if year is None:
+        return len(result["years"]) - 1
+    return int(np.clip(np.searchsorted(result["years"], year), 0, len(result["years"]) - 1))
+
+
+def scenario_totals(result):
+    """各情境逐年實體衝擊合計（百萬元），index 為年度、欄為情境"""
+    return pd.DataFrame(result["impact"].sum(axis=(0, 3)), index=result["years"], columns=result["scenarios"])
+
+
+def component_totals(result, year=None):
+    """指定年度（預設最後一年）各情境 x 實體衝擊項目合計（百萬元）"""
+    table = result["impact"][:, _year_index(result, year), :, :].sum(axis=0)
+    return pd.DataFrame(table, index=result["scenarios"], columns=[COMPONENT_LABELS[c] for c in COMPONENTS])
+
+
+def energy_price_totals(result, year=None):
+    """指定年度（預設最後一年）各情境能源價格增加成本（轉型面，百萬元）"""
+    table = result["energy_price"][:, _year_index(result, year), :].sum(axis=0)
+    return pd.Series(table, index=result["scenarios"], name=TRANSITION_LABEL)
+
+
+def unit_totals(result, scenario):
+    """單一情境下各事業單位最後一年實體衝擊與占營收比例；轉型面能源價格另列、不計入 total"""
+    s = result["scenarios"].index(scenario)
+    last = result["impact"][:, -1, s, :]
+    totals = pd.DataFrame(last, columns=[COMPONENT_LABELS[c] for c in COMPONENTS])
+    totals.insert(0, "unit", result["units"])
+    totals["total"] = last.sum(axis=1)
+    totals["revenue_share"] = np.divide(totals["total"], result["revenue"],
+                                        out=np.zeros(len(totals)), where=result["revenue"] > 0)
+    totals["transition"] = result["energy_price"][:, -1, s]
+    return totals.sort_values("total", ascending=False)
+
+
+def financial_notes(result):
+    """
+    溫升風險表各列的試算摘要：{列名: [摘要, ...]}。
+    每列先列實體衝擊，最後一點另列轉型面的能源價格（不加進增加成本）
+    """
+    last = result["years"][-1]
+    revenue = result["revenue"].sum()
+    components = component_totals(result)
+    cumulative = result["impact"].sum(axis=(0, 1, 3))
+    transition = energy_price_totals(result)
+    notes = {}
+    for row, scenarios in TABLE_ROWS.items():
+        points = []
+        for scenario in scenarios:
+            s = result["scenarios"].index(scenario)
+            parts = components.loc[scenario]
+            share = f"（營收 {parts.sum() / revenue:.1%}）" if revenue > 0 else ""
+            points.append(
+                f"{scenario}：{last} 年增加成本約 {parts.sum():,.1f} 百萬元{share}，"
+                + "、".join(f"{label} {value:,.1f}" for label, value in parts.items())
+                + f"；{result['years'][0]}~{last} 年累計 {cumulative[s]:,.0f} 百萬元"
+            )
+        points.append(
+            f"另計{TRANSITION_LABEL}，非升溫實體衝擊："
+            + "、".join(f"{scenario} {last} 年 {transition[scenario]:,.1f} 百萬元"
+                       f"（實質年增 {SCENARIOS[result['scenarios'].index(scenario)]['energy_price']:.1%}）"
+                       for scenario in scenarios)
+        )
+        notes[row] = points
+    return notes
+
+
+def sample_units(n, seed=0):
+    """產生 n 筆模擬事業單位財務資料"""
+    rng = np.random.default_rng(seed)
+    revenue = rng.lognormal(7, 0.8, n).round(0)
+    return pd.DataFrame({
+        "unit": np.char.add("事業單位-", np.arange(1, n + 1).astype(str)),
+        "revenue": revenue,
+        "energy_cost": (revenue * rng.uniform(0.02, 0.12, n)).round(1),
+        "labor_cost": (revenue * rng.uniform(0.1, 0.3, n)).round(1),
+        "cooling_share": rng.uniform(0.1, 0.5, n).round(2),
+        "outdoor_share": rng.uniform(0.0, 0.4, n).round(2),
+    })
+
+
+if __name__ == "__main__":
+    import time
+
+    units = sample_units(5000)
+    start = time.perf_counter()
+    result = project(units, years=30)
+    print(f"{result['impact'].shape} 單位 x 年 x 情境 x 項目：{(time.perf_counter() - start) * 1000:.0f} ms")
+    print(component_totals(result).round(1))
+    print(energy_price_totals(result).round(1))